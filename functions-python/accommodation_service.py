@@ -5,24 +5,17 @@ Accommodation Service - FIXED FOR TIMEOUTS
 ✅ Accurate Google Maps links
 """
 
-import requests
-import time
 import logging
 from typing import List, Dict
 import random
 from urllib.parse import quote, urlencode
+from candidate_pool import CandidatePool
+import trip_area
 
 logger = logging.getLogger(__name__)
 
-OVERPASS_SERVERS = [
-    "https://overpass-api.de/api/interpreter",
-    "https://overpass.kumi.systems/api/interpreter",
-    "https://maps.mail.ru/osm/tools/overpass/api/interpreter",
-    "https://overpass.openstreetmap.ru/api/interpreter",
-]
-
-REQUEST_TIMEOUT = 15
-QUERY_TIMEOUT = 12
+SEARCH_RADIUS = 5000   # Meters around the city center
+OSM_RESULT_LIMIT = 30  # Max hotels to consider
 
 
 def get_accommodation_recommendations(
@@ -33,13 +26,20 @@ def get_accommodation_recommendations(
     budget_level: str,
     num_nights: int,
     checkin_date: str = None,
-    checkout_date: str = None
+    checkout_date: str = None,
+    area_bundle: 'trip_area.TripAreaBundle' = None
 ) -> Dict:
-    """Get accommodation recommendations"""
+    """
+    Get accommodation recommendations
+
+    area_bundle: Optional trip_area.prefetch_trip_area() result - hotels are
+                 then read from it instead of the network
+    """
 
     logger.info(f"🏨 Accommodations in {city}, {country}")
 
-    accommodations = _fetch_accommodations(lat, lon, city, country, budget_level, checkin_date, checkout_date)
+    accommodations = _fetch_accommodations(lat, lon, city, country, budget_level, checkin_date, checkout_date,
+                                           area_bundle)
 
     if not accommodations:
         logger.warning("   No accommodations found")
@@ -81,75 +81,49 @@ def _fetch_accommodations(
     country: str,
     budget_level: str,
     checkin_date: str,
-    checkout_date: str
+    checkout_date: str,
+    area_bundle: 'trip_area.TripAreaBundle' = None
 ) -> List[Dict]:
-    """Fetch hotels from OSM"""
-
-    query = f'''
-[out:json][timeout:{QUERY_TIMEOUT}];
-node["tourism"~"hotel|hostel|guest_house"]["name"](around:5000,{lat},{lon});
-out 30;
-'''
+    """Fetch hotels from OSM (or the prefetched trip area)"""
 
     accommodations = []
 
-    for i, server in enumerate(OVERPASS_SERVERS):
-        try:
-            response = requests.post(
-                server,
-                data=query,
-                headers={'Content-Type': 'application/x-www-form-urlencoded'},
-                timeout=REQUEST_TIMEOUT
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                elements = data.get('elements', [])
-                logger.info(f"   Server {i+1}: {len(elements)} hotels")
-
-                for el in elements:
-                    acc = _parse_accommodation(el, city, country, lat, lon, budget_level, checkin_date, checkout_date)
-                    if acc:
-                        accommodations.append(acc)
-
-                break
-
-            elif response.status_code in [429, 503, 504]:
-                logger.info(f"   Server {i+1} busy, trying next...")
-                continue
-
-        except requests.exceptions.Timeout:
-            logger.info(f"   Server {i+1} timeout, trying next...")
-            continue
-        except Exception as e:
-            logger.info(f"   Server {i+1} error, trying next...")
-            continue
-
-    # Sort by distance
-    accommodations.sort(key=lambda x: x['distance_km'])
-
-    # Filter by budget
+    elements = trip_area.get_elements(
+        'lodging', lat, lon, SEARCH_RADIUS,
+        limit=OSM_RESULT_LIMIT,
+        element_filter=_has_usable_name,
+        area_bundle=area_bundle
+    ) or []
+    logger.info(f"   OSM: {len(elements)} hotels")
+
+    for el in elements:
+        acc = _parse_accommodation(el, country, budget_level)
+        if acc:
+            accommodations.append(acc)
+
+    # Budget filter + nearest 10 on columns; full dicts only for those 10
+    pool = CandidatePool(accommodations, cost_key='price_per_night_myr')
     if budget_level == 'Low':
-        avg = sum(a['price_per_night_myr'] for a in accommodations) / max(len(accommodations), 1)
-        accommodations = [a for a in accommodations if a['price_per_night_myr'] <= avg]
+        in_budget = pool.cost_mask(max_cost=pool.mean_cost())
     elif budget_level == 'High':
-        avg = sum(a['price_per_night_myr'] for a in accommodations) / max(len(accommodations), 1)
-        accommodations = [a for a in accommodations if a['price_per_night_myr'] >= avg * 0.8]
+        in_budget = pool.cost_mask(min_cost=pool.mean_cost() * 0.8)
+    else:
+        in_budget = None
 
-    return accommodations[:10]
+    distances = pool.distances_km(lat, lon)
+    nearest = pool.top_k(distances, 10, mask=in_budget, descending=False)
 
+    # Same for every hotel of this trip
+    booking_links = _generate_booking_links(city, country, checkin_date, checkout_date)
+
+    return [
+        _build_accommodation(acc, float(distances[i]), city, country, booking_links, checkin_date, checkout_date)
+        for i, acc in zip(nearest, pool.items(nearest))
+    ]
 
-def _parse_accommodation(
-    el: Dict,
-    city: str,
-    country: str,
-    center_lat: float,
-    center_lon: float,
-    budget_level: str,
-    checkin_date: str,
-    checkout_date: str
-) -> Dict:
-    """Parse OSM element"""
+
+def _parse_accommodation(el: Dict, country: str, budget_level: str) -> Dict:
+    """Parse OSM element into a light candidate (what filtering needs)"""
 
     try:
         tags = el.get('tags', {})
@@ -163,7 +137,6 @@ def _parse_accommodation(
         if not lat or not lon:
             return None
 
-        osm_id = str(el.get('id', ''))
         acc_type = tags.get('tourism', 'hotel')
 
         # Stars
@@ -174,54 +147,68 @@ def _parse_accommodation(
             except:
                 pass
 
-        # Distance
-        dist = _haversine(center_lat, center_lon, lat, lon)
-
-        # Price
-        price = _estimate_price(country, acc_type, stars, budget_level)
-
-        # Maps link
-        encoded = quote(f"{name} hotel {city} {country}")
-        maps_link = f"https://www.google.com/maps/search/?api=1&query={encoded}"
-
-        # Booking links
-        booking_links = _generate_booking_links(city, country, checkin_date, checkout_date)
-
         return {
-            'id': f"acc_{osm_id}",
-            'osm_id': osm_id,
+            'osm_id': str(el.get('id', '')),
             'name': name.strip(),
-            'type': acc_type.replace('_', ' ').title(),
+            'acc_type': acc_type,
             'stars': stars,
-            'rating': round(random.uniform(3.8, 4.7), 1),
-            'address': city,
-            'city': city,
-            'country': country,
             'coordinates': {'lat': lat, 'lng': lon},
-            'distance_km': round(dist, 2),
-            'price_per_night_myr': price,
-            'amenities': ['WiFi', 'Air conditioning'],
-            'phone': tags.get('phone', ''),
-            'website': tags.get('website', ''),
-            'booking_links': booking_links,
-            'maps_link': maps_link,
-            'maps_link_direct': f"https://www.google.com/maps?q={lat},{lon}",
-            'data_source': 'OpenStreetMap',
-            'checkin_date': checkin_date,
-            'checkout_date': checkout_date,
+            'price_per_night_myr': _estimate_price(country, acc_type, stars, budget_level),
+            'tags': tags,
         }
 
     except Exception:
         return None
 
 
-def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Distance in km"""
-    from math import radians, cos, sin, asin, sqrt
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat, dlon = lat2 - lat1, lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    return 2 * asin(sqrt(a)) * 6371
+def _build_accommodation(
+    acc: Dict,
+    distance_km: float,
+    city: str,
+    country: str,
+    booking_links: Dict,
+    checkin_date: str,
+    checkout_date: str
+) -> Dict:
+    """Full accommodation dict for a hotel that made the cut"""
+
+    tags = acc['tags']
+    lat, lon = acc['coordinates']['lat'], acc['coordinates']['lng']
+
+    # Maps link
+    encoded = quote(f"{acc['name']} hotel {city} {country}")
+    maps_link = f"https://www.google.com/maps/search/?api=1&query={encoded}"
+
+    return {
+        'id': f"acc_{acc['osm_id']}",
+        'osm_id': acc['osm_id'],
+        'name': acc['name'],
+        'type': acc['acc_type'].replace('_', ' ').title(),
+        'stars': acc['stars'],
+        'rating': round(random.uniform(3.8, 4.7), 1),
+        'address': city,
+        'city': city,
+        'country': country,
+        'coordinates': acc['coordinates'],
+        'distance_km': round(distance_km, 2),
+        'price_per_night_myr': acc['price_per_night_myr'],
+        'amenities': ['WiFi', 'Air conditioning'],
+        'phone': tags.get('phone', ''),
+        'website': tags.get('website', ''),
+        'booking_links': dict(booking_links),
+        'maps_link': maps_link,
+        'maps_link_direct': f"https://www.google.com/maps?q={lat},{lon}",
+        'data_source': 'OpenStreetMap',
+        'checkin_date': checkin_date,
+        'checkout_date': checkout_date,
+    }
+
+
+def _has_usable_name(el: Dict) -> bool:
+    """Skip unnamed / one-letter hotels before they count towards the limit"""
+    tags = el.get('tags', {})
+    name = tags.get('name:en') or tags.get('name')
+    return bool(name) and len(name) >= 3
 
 
 def _estimate_price(country: str, acc_type: str, stars: int, budget: str) -> float:
@@ -0,0 +1,167 @@
+"""
+Benchmark - Firestore reads to match OSM candidates with destinationData
+
+SIMPLE EXPLANATION:
+- get_destinations_near_location checks ~200 OSM candidates against the
+  'destinationData' collection
+- The old loop ran one osm_id query per candidate, plus a 100-document
+  city scan for every miss
+- The batched matcher (_match_in_firestore) uses one get_all of the
+  deterministic document IDs, chunked `in` queries for older documents and
+  the city's name index (name_index.py), built from one city read and
+  reused by the next request on a warm instance ("warm" row)
+- Both run against an in-memory fake Firestore that counts queries and
+  document reads (Firestore bills one read per returned document, and at
+  least one per query)
+
+USAGE (from functions-python/):
+    python benchmarks/firestore_match_benchmark.py
+    python benchmarks/firestore_match_benchmark.py --candidates 200 --known 0.3
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import destination_cache  # noqa: E402
+from destination_service import _match_in_firestore, destination_doc_id  # noqa: E402
+
+# Measure the Firestore read paths (a live city cache would answer from memory)
+destination_cache.DESTINATION_CACHE_ENABLED = False
+
+
+class CountingFirestore:
+    """Just enough of the Firestore client API for the matchers, with counters"""
+
+    def __init__(self, docs):
+        self.docs = docs  # {doc_id: data}
+        self.queries = 0
+        self.reads = 0
+
+    def collection(self, name):
+        return _Query(self, [])
+
+    def get_all(self, refs, field_paths=None):
+        for ref in refs:
+            self.reads += 1  # Billed per requested document, found or not
+            data = self.docs.get(ref.id)
+            yield _Doc(ref.id, data or {}, exists=data is not None)
+
+
+class _Doc:
+    def __init__(self, doc_id, data, exists=True):
+        self.id = doc_id
+        self._data = data
+        self.exists = exists
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _Query:
+    def __init__(self, db, filters, limit=None):
+        self.db = db
+        self.filters = filters
+        self._limit = limit
+
+    def document(self, doc_id):
+        return _Doc(doc_id, None)
+
+    def where(self, field, op, value):
+        return _Query(self.db, self.filters + [(field, op, value)], self._limit)
+
+    def select(self, fields):
+        return self
+
+    def limit(self, n):
+        return _Query(self.db, self.filters, n)
+
+    def stream(self):
+        self.db.queries += 1
+        found = []
+        for doc_id, data in self.db.docs.items():
+            if all(
+                (data.get(f) in v) if op == 'in' else (data.get(f) == v)
+                for f, op, v in self.filters
+            ):
+                found.append(_Doc(doc_id, data))
+                if self._limit and len(found) >= self._limit:
+                    break
+        self.db.reads += max(1, len(found))  # An empty query still costs one read
+        return iter(found)
+
+
+def _legacy_find(db, dest, city):
+    """The previous per-candidate lookup (kept here for comparison)"""
+    osm_id = dest.get('osm_id', '')
+    name = dest.get('name', '').lower().strip()
+
+    if osm_id:
+        docs = list(db.collection('destinationData').where('osm_id', '==', osm_id).limit(1).stream())
+        if docs:
+            return docs[0].id
+
+    if name and len(name) > 3:
+        docs = list(db.collection('destinationData').where('city', '==', city).limit(100).stream())
+        for doc in docs:
+            doc_name = doc.to_dict().get('name', '').lower().strip()
+            if doc_name == name or name in doc_name or doc_name in name:
+                return doc.id
+
+    return None
+
+
+def _dataset(candidates: int, known: float, city_docs: int):
+    random.seed(11)
+    dests = [{'osm_id': str(1000 + i), 'name': f'Place number {i}'} for i in range(candidates)]
+    docs = {}
+
+    for i in range(city_docs):
+        docs[f'doc{i}'] = {'city': 'Kuala Lumpur', 'name': f'Stored place {i}', 'osm_id': str(900000 + i)}
+    for n, dest in enumerate(random.sample(dests, int(candidates * known))):
+        # Half saved with deterministic IDs, half by older code with random IDs
+        doc_id = destination_doc_id(dest['osm_id']) if n % 2 else f"legacy{dest['osm_id']}"
+        docs[doc_id] = {'city': 'Kuala Lumpur', 'name': dest['name'], 'osm_id': dest['osm_id']}
+
+    return dests, docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candidates', type=int, default=200, help='OSM candidates per request (count * 2)')
+    parser.add_argument('--known', type=float, default=0.3, help='Share of candidates already in Firestore')
+    parser.add_argument('--city-docs', type=int, default=500, help='Other destinationData docs in the city')
+    args = parser.parse_args()
+
+    dests, docs = _dataset(args.candidates, args.known, args.city_docs)
+
+    legacy_db = CountingFirestore(docs)
+    start = time.perf_counter()
+    legacy = {d['osm_id']: _legacy_find(legacy_db, d, 'Kuala Lumpur') for d in dests}
+    legacy_ms = (time.perf_counter() - start) * 1000
+
+    batched_db = CountingFirestore(docs)
+    start = time.perf_counter()
+    batched = _match_in_firestore(batched_db, dests, 'Kuala Lumpur')
+    batched_ms = (time.perf_counter() - start) * 1000
+
+    # Same request again on this (now warm) instance: the city name index is cached
+    warm_db = CountingFirestore(docs)
+    start = time.perf_counter()
+    warm = _match_in_firestore(warm_db, dests, 'Kuala Lumpur')
+    warm_ms = (time.perf_counter() - start) * 1000
+
+    legacy_found = sum(1 for v in legacy.values() if v)
+    print(f"{args.candidates} candidates, {args.known:.0%} already stored, {args.city_docs} other city docs\n")
+    print(f"{'matcher':<10} {'queries':>8} {'doc reads':>10} {'matched':>8} {'cpu ms':>8}")
+    print(f"{'legacy':<10} {legacy_db.queries:>8} {legacy_db.reads:>10} {legacy_found:>8} {legacy_ms:>8.1f}")
+    print(f"{'batched':<10} {batched_db.queries:>8} {batched_db.reads:>10} {len(batched):>8} {batched_ms:>8.1f}")
+    print(f"{'warm':<10} {warm_db.queries:>8} {warm_db.reads:>10} {len(warm):>8} {warm_ms:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
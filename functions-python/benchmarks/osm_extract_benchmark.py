@@ -0,0 +1,76 @@
+"""
+Benchmark - "around" queries against the local OSM extract index
+
+SIMPLE EXPLANATION:
+- Builds an OsmExtractIndex from synthetic places (or a real extract with
+  --extract) and times the same class + radius lookups the services make:
+    attractions 15km, eating 2km/5km/8km, lodging 5km
+- Prints build time and microseconds per query
+
+USAGE (from functions-python/):
+    python benchmarks/osm_extract_benchmark.py
+    python benchmarks/osm_extract_benchmark.py --extract malaysia.geojson --lat 3.1478 --lon 101.6953
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from osm_extract import OsmExtractIndex, load_extract  # noqa: E402
+
+QUERIES = [
+    ('attractions', 15000),
+    ('eating', 2000),
+    ('eating', 5000),
+    ('eating', 8000),
+    ('lodging', 5000),
+]
+
+SAMPLE_TAGS = [
+    {'tourism': 'museum'}, {'leisure': 'park'}, {'historic': 'monument'},
+    {'amenity': 'restaurant', 'cuisine': 'malaysian'}, {'amenity': 'cafe'},
+    {'amenity': 'fast_food'}, {'tourism': 'hotel', 'stars': '4'}, {'tourism': 'hostel'},
+]
+
+
+def _synthetic_nodes(count: int, lat: float, lon: float):
+    random.seed(7)
+    for i in range(count):
+        tags = {'name': f'Place {i}', **random.choice(SAMPLE_TAGS)}
+        yield i, lat + random.uniform(-1, 1), lon + random.uniform(-1, 1), tags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--extract', help='GeoJSON or PBF file (default: synthetic data)')
+    parser.add_argument('--places', type=int, default=200000, help='Synthetic places')
+    parser.add_argument('--lat', type=float, default=3.1478)
+    parser.add_argument('--lon', type=float, default=101.6953)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.extract:
+        index = load_extract(args.extract)
+    else:
+        index = OsmExtractIndex(_synthetic_nodes(args.places, args.lat, args.lon))
+    print(f"Index: {len(index)} places, built in {time.perf_counter() - start:.2f} s\n")
+
+    random.seed(1)
+    for query_class, radius in QUERIES:
+        found = 0
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            lat = args.lat + random.uniform(-0.3, 0.3)
+            lon = args.lon + random.uniform(-0.3, 0.3)
+            found += len(index.around(query_class, lat, lon, radius))
+        per_query = (time.perf_counter() - start) / args.rounds * 1e6
+        print(f"{query_class:>11} {radius:6d}m: {per_query:9.1f} µs/query, avg {found / args.rounds:7.1f} results")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark - Peak memory of response.json() vs streaming element decoding
+
+SIMPLE EXPLANATION:
+- Builds a synthetic Overpass answer shaped like a 15km dense-city query
+  (many elements, each with a couple of dozen tags)
+- "json"   = old path: load the whole document, keep full tags per record
+- "stream" = osm_stream: decode element by element, keep only KEEP_TAGS,
+             filter on the fly and stop after --keep candidates
+- Each mode runs in its own subprocess so peak RSS is measured cleanly
+  (streaming mode needs `pip install ijson`, otherwise it falls back to json)
+
+USAGE (from functions-python/):
+    python benchmarks/overpass_parse_memory.py
+    python benchmarks/overpass_parse_memory.py --elements 50000 --keep 160
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _make_payload(path: str, count: int):
+    """Write a fake Overpass JSON answer to disk"""
+    random.seed(42)
+    extra_tags = [f'addr:field{i}' for i in range(15)] + ['wikidata', 'wikipedia', 'source', 'check_date']
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"version":0.6,"generator":"Overpass API","elements":[')
+        for i in range(count):
+            tags = {tag: f'value {random.random():.12f}' for tag in extra_tags}
+            tags['name'] = f'Place {i % (count // 2)}'  # Some duplicate names
+            tags['tourism'] = random.choice(['museum', 'attraction', 'hotel', 'viewpoint'])
+            el = {'type': 'node', 'id': i, 'lat': 3.1 + random.random() / 10,
+                  'lon': 101.6 + random.random() / 10, 'tags': tags}
+            if i:
+                f.write(',')
+            f.write(json.dumps(el))
+        f.write(']}')
+
+
+def _run_mode(mode: str, path: str, keep: int):
+    """Decode the payload one way and print timing + memory"""
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    if mode == 'json':
+        with open(path, 'rb') as f:
+            data = json.load(f)
+        records = []
+        for el in data.get('elements', []):
+            tags = el.get('tags', {})
+            if tags.get('name') and tags.get('tourism') != 'hotel':
+                records.append({'id': el['id'], 'name': tags['name'], 'tags': tags})
+        kept = len(records[:keep])
+    else:
+        from osm_stream import iter_elements, collect_elements, STREAMING_AVAILABLE
+        if not STREAMING_AVAILABLE:
+            print("   (ijson not installed - stream mode is using json.load)")
+        with open(path, 'rb') as f:
+            records = collect_elements(
+                iter_elements(f),
+                element_filter=lambda el: el['tags'].get('tourism') != 'hotel',
+                dedup_key=lambda el: el['tags'].get('name'),
+                max_elements=keep,
+            )
+        kept = len(records)
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux
+
+    print(f"{mode:>6}: kept {kept:5d} | {elapsed * 1000:8.1f} ms | "
+          f"tracemalloc peak {peak / 1e6:7.1f} MB | peak RSS {rss_kb / 1024:7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--elements', type=int, default=20000)
+    parser.add_argument('--keep', type=int, default=320, help='Candidates the service needs')
+    parser.add_argument('--mode', choices=['json', 'stream'], help=argparse.SUPPRESS)
+    parser.add_argument('--payload', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        _run_mode(args.mode, args.payload, args.keep)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'overpass.json')
+        _make_payload(path, args.elements)
+        print(f"Payload: {args.elements} elements, {os.path.getsize(path) / 1e6:.1f} MB\n")
+
+        for mode in ['json', 'stream']:
+            subprocess.run([sys.executable, __file__, '--mode', mode, '--payload', path,
+                            '--keep', str(args.keep)], check=True)
+
+
+if __name__ == '__main__':
+    main()
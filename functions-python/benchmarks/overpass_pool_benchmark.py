@@ -0,0 +1,91 @@
+"""
+Benchmark - Pooled keep-alive sessions vs bare requests.post
+
+SIMPLE EXPLANATION:
+- "cold" = what the services used to do: requests.post() opens a brand new
+  TCP + TLS connection for every query
+- "warm" = overpass_client: one pooled session per server, connection reused
+- One trip generation makes roughly QUERIES_PER_TRIP Overpass calls
+  (radius tiers for destinations, 3 meals x radius tiers, hotels)
+- Difference between the two = handshake time saved per trip
+
+USAGE (from functions-python/):
+    python benchmarks/overpass_pool_benchmark.py
+    python benchmarks/overpass_pool_benchmark.py --server https://overpass.kumi.systems/api/interpreter --rounds 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import overpass_client  # noqa: E402
+
+QUERIES_PER_TRIP = 12
+
+# Tiny query: the server answers almost instantly, so the timing is
+# dominated by connection setup rather than query work
+PING_QUERY = '[out:json][timeout:5];node(1);out ids;'
+
+
+def _time_cold(server: str) -> float:
+    """One query on a brand new connection"""
+    start = time.perf_counter()
+    requests.post(
+        server,
+        data=PING_QUERY,
+        headers=overpass_client.HEADERS,
+        timeout=(overpass_client.CONNECT_TIMEOUT, overpass_client.REQUEST_TIMEOUT)
+    ).content
+    return time.perf_counter() - start
+
+
+def _time_warm(server: str) -> float:
+    """One query on the pooled session (connection already open)"""
+    start = time.perf_counter()
+    overpass_client.get_session(server).post(
+        server,
+        data=PING_QUERY,
+        timeout=(overpass_client.CONNECT_TIMEOUT, overpass_client.REQUEST_TIMEOUT)
+    ).content
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', default=overpass_client.OVERPASS_SERVERS[0])
+    parser.add_argument('--rounds', type=int, default=3, help='How many simulated trips to run')
+    parser.add_argument('--queries', type=int, default=QUERIES_PER_TRIP, help='Overpass calls per trip')
+    args = parser.parse_args()
+
+    print(f"Server: {args.server}")
+    print(f"Trips: {args.rounds} x {args.queries} queries\n")
+
+    # Open the pooled connection once, like a warm function instance would have
+    _time_warm(args.server)
+
+    cold, warm = [], []
+    for _ in range(args.rounds):
+        for _ in range(args.queries):
+            cold.append(_time_cold(args.server))
+            warm.append(_time_warm(args.server))
+            time.sleep(0.2)  # Be nice to the public servers
+
+    cold_ms = statistics.median(cold) * 1000
+    warm_ms = statistics.median(warm) * 1000
+    saved_ms = (cold_ms - warm_ms) * args.queries
+
+    print(f"cold (new connection) median: {cold_ms:8.1f} ms/query")
+    print(f"warm (pooled session)  median: {warm_ms:8.1f} ms/query")
+    print(f"handshake saved per trip:      {saved_ms:8.1f} ms ({args.queries} queries)")
+
+    overpass_client.close_sessions()
+
+
+if __name__ == '__main__':
+    main()
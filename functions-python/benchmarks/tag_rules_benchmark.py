@@ -0,0 +1,214 @@
+"""
+Benchmark - per-element cost of the OSM tag rules (old if-chains vs tag_rules)
+
+SIMPLE EXPLANATION:
+- Generates synthetic attraction and restaurant elements with realistic tags
+- "legacy" = the rule code as it was in destination_service /
+  restaurant_service (keyword loops, if-chains, any() cuisine scans,
+  linear country search, `import re` per call)
+- "compiled" = the same decisions through tag_rules (one regex per keyword
+  family, dict lookups, cached country lookup, batch classification)
+- Checks both give the same answers, then prints microseconds per element
+
+USAGE (from functions-python/):
+    python benchmarks/tag_rules_benchmark.py
+    python benchmarks/tag_rules_benchmark.py --elements 20000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tag_rules  # noqa: E402
+from osm_queries import EXCLUDE_TYPES  # noqa: E402
+from restaurant_service import _extract_price_from_osm  # noqa: E402
+
+ATTRACTION_TAGS = [
+    {'tourism': 'museum'}, {'tourism': 'viewpoint'}, {'tourism': 'zoo'}, {'tourism': 'attraction'},
+    {'leisure': 'park'}, {'leisure': 'garden'}, {'natural': 'waterfall'}, {'natural': 'beach'},
+    {'amenity': 'place_of_worship'}, {'historic': 'monument'}, {'shop': 'mall'},
+    {'tourism': 'hotel'}, {'tourism': 'guest_house'}, {'tourism': 'artwork'},
+]
+NAMES = ['Central Market', 'Batu Caves', 'Grand Hyatt Hotel', 'Sunway Lagoon', 'Petaling Street',
+         'Villa Sentosa', 'Thean Hou Temple', 'KL Tower Viewpoint', 'Backpackers Inn', 'Lake Gardens']
+RESTAURANT_TAGS = [
+    {'cuisine': 'burger'}, {'cuisine': 'malaysian;chinese'}, {'cuisine': 'sushi'}, {'cuisine': 'coffee_shop'},
+    {'cuisine': 'street_food'}, {'cuisine': 'indian'}, {'cuisine': 'regional'}, {'price_level': '$$'},
+    {'cost': 'RM 12.50'}, {'price_range': 'expensive'}, {},
+]
+AMENITIES = ['restaurant', 'restaurant', 'cafe', 'fast_food', 'bakery']
+COUNTRIES = ['Malaysia', 'Japan', 'United Kingdom', 'Thailand', 'France']
+
+
+# ---------- legacy rules (as they were in the services) ----------
+
+_LEGACY_HOTEL_KEYWORDS = ['hotel', 'hostel', 'inn', 'motel', 'resort', 'lodge', 'guesthouse',
+                          'homestay', 'chalet', 'villa', 'apartment', 'airbnb', 'penginapan']
+
+
+def _legacy_is_accommodation(name, category):
+    name_lower = name.lower()
+    category_lower = category.lower() if category else ''
+    if category_lower in EXCLUDE_TYPES:
+        return True
+    for keyword in _LEGACY_HOTEL_KEYWORDS:
+        if keyword in name_lower:
+            return True
+    return False
+
+
+def _legacy_infer_category(tags):
+    tourism = tags.get('tourism', '')
+    leisure = tags.get('leisure', '')
+    amenity = tags.get('amenity', '')
+    historic = tags.get('historic', '')
+    natural = tags.get('natural', '')
+    if tourism == 'museum':
+        return 'museum'
+    elif tourism == 'viewpoint':
+        return 'viewpoint'
+    elif tourism in ['theme_park', 'zoo', 'aquarium']:
+        return 'entertainment'
+    elif leisure in ['park', 'garden', 'nature_reserve']:
+        return 'park'
+    elif natural in ['peak', 'beach', 'cave_entrance', 'waterfall']:
+        return 'nature'
+    elif amenity == 'place_of_worship':
+        return 'temple'
+    elif historic:
+        return 'cultural'
+    elif tags.get('shop'):
+        return 'shopping'
+    else:
+        return 'attraction'
+
+
+def _legacy_price(tags, country, budget_level, meal_type, amenity):
+    country_lower = country.lower()
+    base_prices = tag_rules.DEFAULT_PRICES.copy()
+    for key, prices in tag_rules.COUNTRY_BASE_PRICES.items():
+        if key in country_lower:
+            base_prices = prices
+            break
+    meal_multipliers = {'breakfast': 0.6, 'lunch': 1.0, 'dinner': 1.3, 'snack': 0.4, 'cafe': 0.5}
+    meal_mult = meal_multipliers.get(meal_type, 1.0)
+    verified, source, price_level, cost_myr = False, 'estimated', None, None
+
+    if tags.get('cost') or tags.get('price'):
+        cost_str = tags.get('cost') or tags.get('price')
+        import re
+        numbers = re.findall(r'[\d.]+', str(cost_str))
+        if numbers:
+            try:
+                cost_myr = float(numbers[0])
+                if cost_myr < 5:
+                    cost_myr = cost_myr * 4.5
+                verified = True
+                source = 'osm_cost_tag'
+            except ValueError:
+                pass
+
+    if not verified:
+        osm_price = tags.get('price_level') or tags.get('price_range') or tags.get('price')
+        if osm_price:
+            s = str(osm_price).lower()
+            if s in ['$', 'cheap', 'budget', 'low', '1', 'inexpensive']:
+                price_level, cost_myr, verified, source = 'cheap', base_prices['cheap'] * meal_mult, True, 'osm_price_level'
+            elif s in ['$$', 'moderate', 'medium', 'mid', '2', 'average']:
+                price_level, cost_myr, verified, source = 'moderate', base_prices['moderate'] * meal_mult, True, 'osm_price_level'
+            elif s in ['$$$', '$$$$', 'expensive', 'high', 'luxury', '3', '4', 'upscale']:
+                price_level, cost_myr, verified, source = 'expensive', base_prices['expensive'] * meal_mult, True, 'osm_price_level'
+
+    if not verified:
+        cuisine = tags.get('cuisine', '').lower()
+        if amenity == 'fast_food' or any(x in cuisine for x in ['fast_food', 'burger', 'pizza', 'kebab', 'sandwich']):
+            price_level, source = 'cheap', 'cuisine_fast_food'
+            cost_myr = base_prices['cheap'] * meal_mult * random.uniform(0.8, 1.1)
+        elif any(x in cuisine for x in ['street_food', 'hawker', 'food_court']):
+            price_level, source = 'cheap', 'cuisine_street_food'
+            cost_myr = base_prices['cheap'] * meal_mult * random.uniform(0.7, 1.0)
+        elif any(x in cuisine for x in ['fine_dining', 'french', 'italian', 'japanese', 'sushi', 'seafood', 'steakhouse']):
+            price_level, source = 'expensive', 'cuisine_fine_dining'
+            cost_myr = base_prices['expensive'] * meal_mult * random.uniform(0.8, 1.2)
+        elif any(x in cuisine for x in ['chinese', 'thai', 'vietnamese', 'indian', 'korean']):
+            price_level, source = 'moderate', 'cuisine_asian'
+            cost_myr = base_prices['moderate'] * meal_mult * random.uniform(0.7, 1.1)
+        elif amenity == 'cafe' or 'coffee' in cuisine or 'cafe' in cuisine:
+            price_level, source = 'cheap', 'amenity_cafe'
+            cost_myr = base_prices['cheap'] * meal_mult * random.uniform(0.8, 1.2)
+        elif amenity == 'bakery' or 'bakery' in cuisine:
+            price_level, source = 'cheap', 'amenity_bakery'
+            cost_myr = base_prices['cheap'] * meal_mult * random.uniform(0.5, 0.8)
+
+    if cost_myr is None:
+        budget_mult = {'Low': 0.7, 'Medium': 1.0, 'High': 1.5}.get(budget_level, 1.0)
+        cost_myr = base_prices['moderate'] * meal_mult * budget_mult * random.uniform(0.85, 1.15)
+        price_level, source = 'moderate', 'budget_estimate'
+
+    cost_myr = round(cost_myr, 2)
+    display = f"RM {cost_myr:.0f} ✓" if verified else f"~RM {cost_myr:.0f}"
+    return {'cost_myr': cost_myr, 'display': display, 'verified': verified,
+            'source': source, 'price_level': price_level}
+
+
+# ---------- benchmark ----------
+
+def _elements(count: int):
+    random.seed(17)
+    attractions = [(random.choice(NAMES), dict(random.choice(ATTRACTION_TAGS))) for _ in range(count)]
+    restaurants = [(dict(random.choice(RESTAURANT_TAGS)), random.choice(AMENITIES), random.choice(COUNTRIES))
+                   for _ in range(count)]
+    return attractions, restaurants
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--elements', type=int, default=10000, help='Elements per rule family')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    attractions, restaurants = _elements(args.elements)
+
+    # Same answers (random price multipliers replayed with the same seed)
+    legacy_classes = [None if _legacy_is_accommodation(n, t.get('tourism', '')) else _legacy_infer_category(t)
+                      for n, t in attractions]
+    assert legacy_classes == tag_rules.classify_attractions(attractions), 'attraction rules differ'
+    for tags, amenity, country in restaurants[:2000]:
+        random.seed(hash((country, amenity, str(tags))))
+        old = _legacy_price(tags, country, 'Medium', 'lunch', amenity)
+        random.seed(hash((country, amenity, str(tags))))
+        assert old == _extract_price_from_osm(tags, country, 'Medium', 'lunch', amenity), (tags, amenity)
+
+    rows = [
+        ('attractions', 'legacy', lambda: [
+            None if _legacy_is_accommodation(n, t.get('tourism', '')) else _legacy_infer_category(t)
+            for n, t in attractions]),
+        ('attractions', 'compiled', lambda: tag_rules.classify_attractions(attractions)),
+        ('restaurants', 'legacy', lambda: [
+            _legacy_price(t, c, 'Medium', 'lunch', a) for t, a, c in restaurants]),
+        ('restaurants', 'compiled', lambda: [
+            _extract_price_from_osm(t, c, 'Medium', 'lunch', a) for t, a, c in restaurants]),
+    ]
+
+    print(f"{args.elements} elements per family, best of {args.repeat} (answers identical)\n")
+    print(f"{'family':<12} {'rules':<10} {'µs/element':>11}")
+    for family, label, fn in rows:
+        seconds = _best_of(args.repeat, fn)
+        print(f"{family:<12} {label:<10} {seconds / args.elements * 1e6:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Candidate Pool - Score, filter and pick the best places BEFORE building output
+
+SIMPLE EXPLANATION:
+- The services used to build a big dict for every OSM place (raw tags,
+  Google Maps links, description, tips, price info...), then sort them
+  and keep only the first 10-100
+- Now candidates go into a compact "struct of arrays" first:
+    lat, lon, category code, rating, cost   → one NumPy array each
+    names, categories                       → interned tables (stored once)
+- Distance, scores, budget filters and top-k run on whole arrays at once
+- Only the survivors are turned into full output dicts
+
+NumPy is optional: without it the same operations run as plain Python
+loops (slower on big pools, identical results).
+
+USAGE:
+    pool = CandidatePool(places, rating_key='rating')
+    dist = pool.distances_km(lat, lon)
+    best = pool.top_k(scores, 10)                 # indices, best first
+    survivors = pool.items(best)
+"""
+
+from math import radians, cos
+from typing import Dict, List, Sequence
+
+from geo import EARTH_RADIUS_KM, haversine
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:  # Fall back to plain Python loops
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+class CandidatePool:
+    """
+    Columns of parsed candidates (each needs 'coordinates' {lat, lng})
+
+    Args:
+        items: Light candidate dicts - kept as-is, returned by items()
+        category_key, rating_key, cost_key: Dict keys to copy into columns
+                                            (None = column not needed)
+    """
+
+    def __init__(self, items: List[Dict], category_key: str = None, rating_key: str = None,
+                 cost_key: str = None, default_rating: float = 0.0, default_cost: float = 0.0):
+        self._items = items
+        self.categories: List[str] = []      # Interned: code → category
+        self.names: List[str] = []           # Interned: id → name
+        category_codes: Dict[str, int] = {}
+        name_ids: Dict[str, int] = {}
+
+        lat, lon, cat, rating, cost, name = [], [], [], [], [], []
+        for item in items:
+            coords = item['coordinates']
+            lat.append(coords['lat'])
+            lon.append(coords['lng'])
+
+            if category_key:
+                value = item.get(category_key) or ''
+                code = category_codes.get(value)
+                if code is None:
+                    code = category_codes[value] = len(self.categories)
+                    self.categories.append(value)
+                cat.append(code)
+
+            if rating_key:
+                rating.append(item.get(rating_key, default_rating))
+            if cost_key:
+                cost.append(item.get(cost_key, default_cost))
+
+            value = item.get('name') or ''
+            name_id = name_ids.get(value)
+            if name_id is None:
+                name_id = name_ids[value] = len(self.names)
+                self.names.append(value)
+            name.append(name_id)
+
+        self.lat = _array(lat, 'float64')
+        self.lon = _array(lon, 'float64')
+        self.category = _array(cat, 'int16')
+        self.rating = _array(rating, 'float64')
+        self.cost = _array(cost, 'float64')
+        self.name_id = _array(name, 'int32')
+
+    def __len__(self):
+        return len(self._items)
+
+    def items(self, indices: Sequence[int]) -> List[Dict]:
+        """The original candidate dicts at `indices`, in that order"""
+        return [self._items[i] for i in indices]
+
+    def distances_km(self, lat: float, lon: float):
+        """Great-circle distance of every candidate to (lat, lon)"""
+        if not NUMPY_AVAILABLE:
+            return [haversine(lat, lon, a, b) for a, b in zip(self.lat, self.lon)]
+
+        lat1, lon1 = radians(lat), radians(lon)
+        lat2, lon2 = np.radians(self.lat), np.radians(self.lon)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+
+    def category_values(self, values: Dict[str, float], default: float):
+        """Per-candidate value looked up by category (one lookup per distinct category)"""
+        table = [values.get(c, default) for c in self.categories]
+        if not NUMPY_AVAILABLE:
+            return [table[code] for code in self.category]
+        return np.asarray(table, dtype='float64')[self.category] if table else np.zeros(0)
+
+    def mean_cost(self) -> float:
+        if not len(self._items):
+            return 0.0
+        return float(np.mean(self.cost)) if NUMPY_AVAILABLE else sum(self.cost) / len(self.cost)
+
+    def cost_mask(self, min_cost: float = None, max_cost: float = None):
+        """True where min_cost <= cost <= max_cost (either bound optional)"""
+        if not NUMPY_AVAILABLE:
+            return [(min_cost is None or c >= min_cost) and (max_cost is None or c <= max_cost) for c in self.cost]
+
+        mask = np.ones(len(self.cost), dtype=bool)
+        if min_cost is not None:
+            mask &= self.cost >= min_cost
+        if max_cost is not None:
+            mask &= self.cost <= max_cost
+        return mask
+
+    def mask_where(self, predicate) -> Sequence[bool]:
+        """True where predicate(item) - for rules that aren't a column (e.g. "already used")"""
+        values = [bool(predicate(item)) for item in self._items]
+        return np.asarray(values, dtype=bool) if NUMPY_AVAILABLE else values
+
+    def top_k(self, scores, k: int, mask=None, descending: bool = True) -> List[int]:
+        """
+        Indices of the best `k` candidates by score (optionally only where
+        `mask` is True). Ties keep the original order, like a stable sort.
+        """
+        if not NUMPY_AVAILABLE:
+            idx = [i for i in range(len(self._items)) if mask is None or mask[i]]
+            idx.sort(key=lambda i: -scores[i] if descending else scores[i])
+            return idx[:k]
+
+        keys = -np.asarray(scores, dtype='float64') if descending else np.asarray(scores, dtype='float64')
+        idx = np.arange(len(keys)) if mask is None else np.flatnonzero(mask)
+        if k <= 0 or not len(idx):
+            return []
+
+        if k < len(idx):
+            # Partition to the k-th key, keep everything up to it (ties included)
+            kth = np.partition(keys[idx], k - 1)[k - 1]
+            idx = idx[keys[idx] <= kth]
+
+        order = np.argsort(keys[idx], kind='stable')
+        return idx[order][:k].tolist()
+
+
+def _array(values: List, dtype: str):
+    if NUMPY_AVAILABLE:
+        return np.asarray(values, dtype=dtype)
+    return values
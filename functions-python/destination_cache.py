@@ -0,0 +1,258 @@
+"""
+Destination Cache - Hot cities' destinationData documents, kept live in memory
+
+SIMPLE EXPLANATION:
+- Destination matching, the name index and cold-start recommendations all
+  read 'destinationData' for the same few popular cities on every request
+- The first request for a city loads its documents AND attaches a Firestore
+  snapshot listener (on_snapshot) to that city's query
+- Firestore then pushes every add / change / delete to this instance, so
+  the cached city is always current - no TTL, no polling, no re-reads
+- Capped by number of cities (MAX_CITIES) and memory (MAX_CACHE_BYTES):
+  the least recently used city is dropped and its listener detached
+- get_cache_stats() reports hit ratio, active listeners and memory
+
+SETTINGS (env):
+    DESTINATION_CACHE=0                  → disabled (every caller reads Firestore)
+    DESTINATION_CACHE_MAX_CITIES=20
+    DESTINATION_CACHE_MAX_MB=32
+
+USAGE:
+    docs = get_city_docs(db, 'Kuala Lumpur')   # {doc_id: data}, or None → read Firestore yourself
+"""
+
+import json
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DESTINATION_CACHE_ENABLED = os.environ.get('DESTINATION_CACHE', '1') != '0'
+MAX_CITIES = int(os.environ.get('DESTINATION_CACHE_MAX_CITIES', '20'))
+MAX_CACHE_BYTES = int(os.environ.get('DESTINATION_CACHE_MAX_MB', '32')) * 1024 * 1024
+FIRST_SNAPSHOT_TIMEOUT = 10.0  # Seconds to wait for a city's initial load
+RESUBSCRIBE_AFTER = 3600       # Re-attach listeners this old (guards against a silently dead stream)
+
+
+class CityEntry:
+    """One cached city: its documents plus the listener keeping them current"""
+
+    def __init__(self, city: str, lock: threading.Lock):
+        self.city = city
+        self.lock = lock                  # The cache's lock: guards docs / sizes / bytes
+        self.docs: Dict[str, Dict] = {}   # Replaced (never mutated) on every snapshot
+        self.sizes: Dict[str, int] = {}
+        self.bytes = 0
+        self.watch = None
+        self.ready = threading.Event()
+        self.subscribed_at = time.time()
+        self.events = 0
+
+    def is_live(self) -> bool:
+        if self.watch is None or getattr(self.watch, '_closed', False):
+            return False
+        return time.time() - self.subscribed_at < RESUBSCRIBE_AFTER
+
+    def apply(self, changes):
+        """
+        Apply one snapshot's document changes (runs on the listener thread).
+        Built on copies, then swapped in under the cache lock.
+        """
+        docs, sizes, size_delta = dict(self.docs), dict(self.sizes), 0
+        for change in changes:
+            doc = change.document
+            size_delta -= sizes.pop(doc.id, 0)
+
+            if change.type.name == 'REMOVED':
+                docs.pop(doc.id, None)
+                continue
+
+            data = doc.to_dict() or {}
+            size = _estimate_size(data)
+            docs[doc.id] = data
+            sizes[doc.id] = size
+            size_delta += size
+
+        with self.lock:
+            self.docs, self.sizes = docs, sizes
+            self.bytes += size_delta
+            self.events += 1
+
+
+class DestinationCache:
+    """LRU of CityEntry objects, bounded by city count and bytes"""
+
+    def __init__(self, max_cities: int = MAX_CITIES, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_cities = max_cities
+        self.max_bytes = max_bytes
+        self._cities: 'OrderedDict[str, CityEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Event] = {}   # Cities being subscribed right now
+        self._stats = {'hits': 0, 'misses': 0, 'fallbacks': 0, 'evictions': 0, 'subscriptions': 0}
+
+    def get(self, db, city: str) -> Optional[Dict[str, Dict]]:
+        """The city's documents {doc_id: data}, or None if they couldn't be loaded"""
+        while True:
+            with self._lock:
+                entry = self._cities.get(city)
+                if entry is not None and entry.is_live() and entry.ready.is_set():
+                    self._cities.move_to_end(city)
+                    self._stats['hits'] += 1
+                    return entry.docs
+                loading = self._loading.get(city)
+                if loading is None:
+                    # This thread subscribes; others for the same city wait for it
+                    self._stats['misses'] += 1
+                    self._loading[city] = threading.Event()
+                    stale = self._cities.pop(city, None)
+                    break
+
+            if not loading.wait(FIRST_SNAPSHOT_TIMEOUT + 1):
+                with self._lock:
+                    self._stats['fallbacks'] += 1
+                return None
+            with self._lock:
+                if city not in self._cities:
+                    self._stats['fallbacks'] += 1
+                    return None   # The subscribing thread failed: don't retry in a loop
+
+        try:
+            if stale is not None:
+                _unsubscribe(stale)
+
+            entry = self._subscribe(db, city)
+            if entry is None:
+                with self._lock:
+                    self._stats['fallbacks'] += 1
+                return None
+
+            with self._lock:
+                loser = self._cities.pop(city, None)
+                self._cities[city] = entry
+                dropped = self._enforce_limits()
+            if loser is not None and loser is not entry:
+                dropped.append(loser)
+
+            for old in dropped:
+                _unsubscribe(old)
+            return entry.docs
+        finally:
+            with self._lock:
+                self._loading.pop(city).set()
+
+    def _subscribe(self, db, city: str) -> Optional[CityEntry]:
+        """Attach a listener and wait for its first (full) snapshot"""
+        entry = CityEntry(city, self._lock)
+
+        def on_snapshot(doc_snapshots, changes, read_time):
+            try:
+                entry.apply(changes)
+            except Exception as e:
+                logger.warning(f"Destination cache update error ({city}): {e}")
+            entry.ready.set()
+            self._after_update()
+
+        try:
+            entry.watch = db.collection('destinationData').where('city', '==', city).on_snapshot(on_snapshot)
+        except Exception as e:
+            logger.warning(f"Destination cache listener failed for {city}: {e}")
+            return None
+
+        if not entry.ready.wait(FIRST_SNAPSHOT_TIMEOUT):
+            logger.warning(f"Destination cache: no snapshot for {city} within {FIRST_SNAPSHOT_TIMEOUT:.0f}s")
+            _unsubscribe(entry)
+            return None
+
+        with self._lock:
+            self._stats['subscriptions'] += 1
+        logger.info(f"   📌 Destination cache: {city} live ({len(entry.docs)} places)")
+        return entry
+
+    def _after_update(self):
+        with self._lock:
+            dropped = self._enforce_limits()
+        for old in dropped:
+            _unsubscribe(old)
+
+    def _enforce_limits(self) -> list:
+        """
+        Remove least recently used cities until under both caps (lock held).
+        Returns them - detach their listeners AFTER releasing the lock, as
+        unsubscribe waits for the listener thread.
+        """
+        dropped = []
+        while self._cities and (
+            len(self._cities) > self.max_cities
+            or sum(e.bytes for e in self._cities.values()) > self.max_bytes
+        ):
+            if len(self._cities) == 1:
+                break  # Keep the city being served even if it alone is over budget
+            _, oldest = self._cities.popitem(last=False)
+            dropped.append(oldest)
+            self._stats['evictions'] += 1
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._cities.values())
+            self._cities.clear()
+        for entry in entries:
+            _unsubscribe(entry)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_ratio': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                'cities': len(self._cities),
+                'listeners': sum(1 for e in self._cities.values() if e.is_live()),
+                'documents': sum(len(e.docs) for e in self._cities.values()),
+                'bytes': sum(e.bytes for e in self._cities.values()),
+                'max_bytes': self.max_bytes,
+                'snapshot_events': sum(e.events for e in self._cities.values()),
+            }
+
+
+_cache = DestinationCache()
+
+
+def get_city_docs(db, city: str) -> Optional[Dict[str, Dict]]:
+    """
+    Cached destinationData documents of one city, {doc_id: data}
+
+    Returns None when the cache is disabled or the listener couldn't be
+    attached - the caller then reads Firestore directly. Treat the
+    returned dict as read-only.
+    """
+    if not DESTINATION_CACHE_ENABLED or not city:
+        return None
+    return _cache.get(db, city)
+
+
+def get_cache_stats() -> Dict:
+    """Hit ratio, active listeners, cities, documents and bytes"""
+    return _cache.stats()
+
+
+def clear_cache():
+    """Drop every city and detach all listeners"""
+    _cache.clear()
+
+
+def _unsubscribe(entry: CityEntry):
+    try:
+        if entry.watch is not None:
+            entry.watch.unsubscribe()
+    except Exception:
+        pass
+    entry.watch = None
+
+
+def _estimate_size(data: Dict) -> int:
+    """Rough memory cost of a document (compact JSON length)"""
+    return len(json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=str)) + 100
@@ -10,32 +10,34 @@ This version:
 REPLACE your existing destination_service.py with this file.
 """
 
-import requests
-import time
 import logging
+import os
 from typing import List, Dict, Optional
 import random
-import hashlib
 from urllib.parse import quote
 from firebase_admin import firestore
-from math import radians, cos, sin, asin, sqrt
+from google.api_core.exceptions import AlreadyExists
+from candidate_pool import CandidatePool, NUMPY_AVAILABLE, np
+import destination_cache
+import firestore_metrics
+import geo
+import ml_helper
+import name_index
+import radius_search
+import tag_rules
+import trip_area
+import write_behind
 
 logger = logging.getLogger(__name__)
 
-# Overpass servers
-OVERPASS_SERVERS = [
-    "https://overpass-api.de/api/interpreter",
-    "https://overpass.kumi.systems/api/interpreter",
-    "https://maps.mail.ru/osm/tools/overpass/api/interpreter",
-]
+RADIUS_TIERS = [2000, 5000, 10000, 15000]  # Search circles in meters
+OSM_RESULT_LIMIT = 80                      # Max elements per circle
+FIRESTORE_IN_LIMIT = 30                    # Max values in one Firestore `in` query
+FIRESTORE_BATCH_LIMIT = 500                # Max writes in one Firestore batch
 
-REQUEST_TIMEOUT = 15
-QUERY_TIMEOUT = 12
-
-# Hotels to exclude
-EXCLUDE_TYPES = ['hotel', 'hostel', 'guest_house', 'motel', 'apartment', 'camp_site']
-HOTEL_KEYWORDS = ['hotel', 'hostel', 'inn', 'motel', 'resort', 'lodge', 'guesthouse',
-                  'homestay', 'chalet', 'villa', 'apartment', 'airbnb', 'penginapan']
+# New destinations written by a background worker (env DESTINATION_WRITE_BEHIND=1); off by
+# default because its spool needs a persistent WRITE_BEHIND_SPOOL_DIR (see write_behind.py)
+WRITE_BEHIND_ENABLED = os.environ.get('DESTINATION_WRITE_BEHIND', '0') == '1'
 
 DEFAULT_WEIGHTS = {
     'museum': 1.0, 'entertainment': 1.0, 'viewpoint': 1.0,
@@ -43,13 +45,7 @@ DEFAULT_WEIGHTS = {
     'temple': 1.0, 'shopping': 1.0, 'attraction': 1.0,
 }
 
-
-def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance in km between two points"""
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat, dlon = lat2 - lat1, lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    return 2 * asin(sqrt(a)) * 6371
+haversine = geo.haversine   # Distance in km (kept importable from here)
 
 
 def get_destinations_near_location(
@@ -59,7 +55,8 @@ def get_destinations_near_location(
     lon: float,
     count: int = 100,
     category_weights: Dict[str, float] = None,
-    preferred_categories: List[str] = None
+    preferred_categories: List[str] = None,
+    area_bundle: 'trip_area.TripAreaBundle' = None
 ) -> List[Dict]:
     """
     Get REAL destinations from OpenStreetMap, with ML score lookup.
@@ -70,6 +67,9 @@ def get_destinations_near_location(
     3. If exists → use Firestore ID for ML lookup
     4. If new → save to Firestore for future ML training
     5. Return real destinations with ML scores
+
+    area_bundle: Optional trip_area.prefetch_trip_area() result - OSM data
+                 is then read from it instead of the network
     """
 
     if category_weights is None:
@@ -80,7 +80,7 @@ def get_destinations_near_location(
     logger.info(f"\n🔍 DESTINATIONS: {city}, {country}")
     logger.info(f"📍 Coords: ({lat:.4f}, {lon:.4f})")
 
-    db = firestore.client()
+    db = firestore_metrics.metered(firestore.client())
     all_destinations = []
     seen_ids = set()
 
@@ -89,7 +89,8 @@ def get_destinations_near_location(
     # ========================================
     logger.info(f"\n📡 STEP 1: Fetching REAL destinations from OpenStreetMap...")
 
-    osm_destinations = _fetch_from_osm(city, country, lat, lon, count * 2, category_weights, preferred_categories)
+    osm_destinations = _fetch_from_osm(city, country, lat, lon, count * 2, category_weights, preferred_categories,
+                                       area_bundle)
     logger.info(f"   Found {len(osm_destinations)} real destinations from OSM")
 
     # ========================================
@@ -100,58 +101,81 @@ def get_destinations_near_location(
     ml_matched = 0
     new_saved = 0
 
+    # Unique candidates, in OSM order
     for dest in osm_destinations:
         if dest['osm_id'] in seen_ids:
             continue
         seen_ids.add(dest['osm_id'])
+        all_destinations.append(dest)
+
+    # All candidates resolved in a few batched reads (not one query per place)
+    with firestore_metrics.operation('destinations.match'):
+        firestore_ids = _match_in_firestore(db, all_destinations, city)
 
-        # Try to find this destination in Firestore (by OSM ID or name+city)
-        firestore_id = _find_in_firestore(db, dest, city)
+    # New destinations saved in bulk for future ML, under deterministic IDs
+    new_dests = [d for d in all_destinations if d['osm_id'] not in firestore_ids]
+    with firestore_metrics.operation('destinations.save'):
+        saved_ids = _save_many_to_firestore(db, new_dests, city, country)
+
+    for dest in all_destinations:
+        firestore_id = firestore_ids.get(dest['osm_id'])
 
         if firestore_id:
             # Found in Firestore - use that ID for ML lookup
             dest['id'] = firestore_id
             dest['ml_source'] = 'firestore_match'
             ml_matched += 1
+        elif dest['osm_id'] in saved_ids:
+            dest['id'] = saved_ids[dest['osm_id']]
+            dest['ml_source'] = 'newly_saved'
+            new_saved += 1
         else:
-            # New destination - save to Firestore for future ML
-            new_id = _save_to_firestore(db, dest, city, country)
-            if new_id:
-                dest['id'] = new_id
-                dest['ml_source'] = 'newly_saved'
-                new_saved += 1
-            else:
-                # Fallback: use OSM-based ID
-                dest['id'] = dest['osm_id']
-                dest['ml_source'] = 'osm_only'
-
-        all_destinations.append(dest)
+            # Fallback: use OSM-based ID
+            dest['id'] = dest['osm_id']
+            dest['ml_source'] = 'osm_only'
 
     logger.info(f"   ✅ ML matched: {ml_matched}")
     logger.info(f"   ✅ Newly saved: {new_saved}")
     logger.info(f"   📡 OSM only: {len(all_destinations) - ml_matched - new_saved}")
 
     # ========================================
-    # STEP 3: Score and sort
+    # STEP 3: Score and sort (columnar - full dicts only for the top `count`)
     # ========================================
-    for dest in all_destinations:
-        cat = dest.get('category', 'attraction')
-        weight = category_weights.get(cat, 0.5)
+    pool = CandidatePool(all_destinations, category_key='category', rating_key='rating', default_rating=4.0)
+    scores, preferred = _preference_scores(pool, category_weights, preferred_categories)
+    best = pool.top_k(scores, count)
 
-        if cat in preferred_categories:
-            weight = min(weight * 1.5, 1.0)
-            dest['is_preferred'] = True
-        else:
-            dest['is_preferred'] = False
+    results = []
+    for i, dest in zip(best, pool.items(best)):
+        dest = _build_destination(dest)
+        dest['is_preferred'] = bool(preferred[i])
+        dest['preference_score'] = float(scores[i])
+        results.append(dest)
+
+    logger.info(f"\n✅ Returning {len(results)} real destinations")
 
-        dest['preference_score'] = round(weight * (dest.get('rating', 4.0) / 5.0), 3)
+    return results
 
-    # Sort by preference score
-    all_destinations.sort(key=lambda x: -x.get('preference_score', 0))
 
-    logger.info(f"\n✅ Returning {min(len(all_destinations), count)} real destinations")
+def _preference_scores(pool: CandidatePool, category_weights: Dict[str, float], preferred_categories: List[str]):
+    """
+    preference_score of every candidate, and whether its category is preferred
+
+    score = category weight (x1.5 for preferred categories, max 1.0) x rating / 5
+    """
+    weights = pool.category_values(category_weights, 0.5)
+    preferred = pool.category_values({cat: 1.0 for cat in preferred_categories}, 0.0)
 
-    return all_destinations[:count]
+    if not NUMPY_AVAILABLE:
+        scores = [
+            round((min(w * 1.5, 1.0) if p else w) * (r / 5.0), 3)
+            for w, p, r in zip(weights, preferred, pool.rating)
+        ]
+        return scores, [bool(p) for p in preferred]
+
+    preferred = preferred > 0
+    weights = np.where(preferred, np.minimum(weights * 1.5, 1.0), weights)
+    return np.round(weights * (pool.rating / 5.0), 3), preferred
 
 
 def _find_in_firestore(db, dest: Dict, city: str) -> Optional[str]:
@@ -159,70 +183,169 @@ def _find_in_firestore(db, dest: Dict, city: str) -> Optional[str]:
     Try to find this destination in Firestore.
     Returns Firestore document ID if found, None otherwise.
     """
-    try:
-        osm_id = dest.get('osm_id', '')
-        name = dest.get('name', '').lower().strip()
-
-        # Method 1: Search by OSM ID
-        if osm_id:
-            docs = list(db.collection('destinationData')
-                .where('osm_id', '==', osm_id)
-                .limit(1)
-                .stream())
-            if docs:
-                return docs[0].id
-
-        # Method 2: Search by name and city (fuzzy match)
-        if name and len(name) > 3:
-            docs = list(db.collection('destinationData')
-                .where('city', '==', city)
-                .limit(100)
-                .stream())
-
-            for doc in docs:
-                data = doc.to_dict()
-                doc_name = data.get('name', '').lower().strip()
-
-                # Exact or close match
-                if doc_name == name or name in doc_name or doc_name in name:
-                    return doc.id
+    return _match_in_firestore(db, [dest], city).get(dest.get('osm_id', ''))
 
-        return None
 
+def destination_doc_id(osm_id: str) -> str:
+    """Deterministic destinationData document ID for an OSM place"""
+    return f"osm_{osm_id}"
+
+
+def _match_in_firestore(db, dests: List[Dict], city: str) -> Dict[str, str]:
+    """
+    Find many destinations in Firestore at once.
+    Returns {osm_id: Firestore document ID} for the ones that exist.
+
+    Reads per call (instead of 1-2 queries for EVERY destination):
+    0. None for places found in the live destination cache of the city -
+       only the others go through steps 1-2
+    1. ONE get_all of the deterministic IDs (destination_doc_id)
+    2. Older documents with random IDs: OSM IDs in chunks of
+       FIRESTORE_IN_LIMIT with `in` queries
+    3. The city's name index (name_index.py), only if some are still
+       unmatched - built from Firestore once, then reused while warm
+    """
+    matches = {}
+
+    try:
+        osm_ids = list(dict.fromkeys(d['osm_id'] for d in dests if d.get('osm_id')))
+        city_docs = destination_cache.get_city_docs(db, city)
+
+        if city_docs is not None:
+            # Live city cache (destination_cache.py): OSM IDs matched in memory, no reads
+            by_osm_id = {data.get('osm_id'): doc_id for doc_id, data in city_docs.items() if data.get('osm_id')}
+            matches.update({i: by_osm_id[i] for i in osm_ids if i in by_osm_id})
+            # The rest may be stored under another city name: still looked up by ID
+            osm_ids = [i for i in osm_ids if i not in matches]
+
+        # Method 1: Deterministic document IDs (batched)
+        if osm_ids:
+            refs = [db.collection('destinationData').document(destination_doc_id(i)) for i in osm_ids]
+            for doc in db.get_all(refs, field_paths=['osm_id']):
+                if doc.exists:
+                    matches[doc.id[len('osm_'):]] = doc.id
+
+        # Method 2: Search by OSM ID (batched)
+        legacy_ids = [i for i in osm_ids if i not in matches]
+
+        for i in range(0, len(legacy_ids), FIRESTORE_IN_LIMIT):
+            chunk = legacy_ids[i:i + FIRESTORE_IN_LIMIT]
+            for doc in (db.collection('destinationData')
+                        .where('osm_id', 'in', chunk)
+                        .select(['osm_id'])
+                        .stream()):
+                matches.setdefault(doc.to_dict().get('osm_id'), doc.id)
+
+        # Method 3: Search by name and city (per-city name index, cached per process)
+        unmatched = [d for d in dests if d.get('osm_id', '') not in matches]
+        if unmatched:
+            matches.update(name_index.get_city_index(db, city).match_many(unmatched))
+
+    except firestore_metrics.ReadBudgetExceeded:
+        raise
     except Exception as e:
         logger.warning(f"Firestore lookup error: {e}")
-        return None
+
+    return matches
 
 
-def _save_to_firestore(db, dest: Dict, city: str, country: str) -> Optional[str]:
+def _save_many_to_firestore(db, dests: List[Dict], city: str, country: str) -> Dict[str, str]:
     """
-    Save new destination to Firestore for future ML training.
-    Returns the new document ID.
+    Save new destinations to Firestore for future ML training.
+    Returns {osm_id: document ID} for the ones written (or queued).
+
+    - Document ID comes from the OSM ID, so two trips saving the same
+      place write the SAME document instead of creating duplicates
+    - Create only: a place that is already stored is left as it is
+      (created_at, rating and description aren't rewritten)
+    - Written in batches of FIRESTORE_BATCH_LIMIT (one commit per batch)
+    - WRITE_BEHIND_ENABLED: only queued here, a background worker writes
+      them (write_behind.py) - the IDs are known already, so the trip
+      doesn't wait for Firestore
     """
-    try:
-        doc_ref = db.collection('destinationData').document()
+    items = [
+        {'doc_id': destination_doc_id(d['osm_id']), 'osm_id': d['osm_id'], 'city': city,
+         'data': _destination_record(d, city, country)}
+        for d in dests if d.get('osm_id')
+    ]
+    if not items:
+        return {}
+
+    if WRITE_BEHIND_ENABLED:
+        write_behind.get_queue('destinations', _write_queued_destinations).submit(items)
+        written = items
+    else:
+        failed = {item['doc_id'] for item in _write_destination_records(db, items)}
+        written = [item for item in items if item['doc_id'] not in failed]
+
+    for item in written:
+        # Keep this warm instance's name index current
+        name_index.add_document(city, item['doc_id'], item['data'])
+
+    return {item['osm_id']: item['doc_id'] for item in written}
+
+
+def _destination_record(dest: Dict, city: str, country: str) -> Dict:
+    """The destinationData fields for a new OSM destination"""
+    return {
+        'name': dest.get('name', 'Unknown'),
+        'name_local': dest.get('name_local'),
+        'city': city,
+        'country': country,
+        'category': dest.get('category', 'attraction'),
+        'latitude': dest['coordinates']['lat'],
+        'longitude': dest['coordinates']['lng'],
+        'coordinates': dest['coordinates'],
+        'osm_id': dest.get('osm_id'),
+        'rating': dest.get('rating', 4.0),
+        'description': _description(dest),
+        'data_source': 'OpenStreetMap',
+        **ml_helper.search_fields({'city': city, 'country': country, 'category': dest.get('category', 'attraction')}),
+    }
 
-        doc_ref.set({
-            'name': dest.get('name', 'Unknown'),
-            'name_local': dest.get('name_local'),
-            'city': city,
-            'country': country,
-            'category': dest.get('category', 'attraction'),
-            'latitude': dest['coordinates']['lat'],
-            'longitude': dest['coordinates']['lng'],
-            'coordinates': dest['coordinates'],
-            'osm_id': dest.get('osm_id'),
-            'rating': dest.get('rating', 4.0),
-            'description': dest.get('description', ''),
-            'data_source': 'OpenStreetMap',
-            'created_at': firestore.SERVER_TIMESTAMP,
-        })
 
-        return doc_ref.id
+def _write_destination_records(db, items: List[Dict]) -> List[Dict]:
+    """
+    Create {'doc_id', 'data'} items that don't exist yet, in batches.
+    Returns the items that failed. Saving a stored place again costs
+    one read and no write.
+    """
+    failed = []
 
-    except Exception as e:
-        logger.warning(f"Failed to save to Firestore: {e}")
-        return None
+    for i in range(0, len(items), FIRESTORE_BATCH_LIMIT):
+        chunk = items[i:i + FIRESTORE_BATCH_LIMIT]
+        refs = {item['doc_id']: db.collection('destinationData').document(item['doc_id']) for item in chunk}
+        try:
+            existing = {doc.id for doc in db.get_all(list(refs.values()), field_paths=['osm_id']) if doc.exists}
+            new = [item for item in chunk if item['doc_id'] not in existing]
+            if not new:
+                continue
+
+            batch = db.batch()
+            for item in new:
+                batch.create(refs[item['doc_id']], {**item['data'], 'created_at': firestore.SERVER_TIMESTAMP})
+            try:
+                batch.commit()
+            except AlreadyExists:
+                # Another instance created some of them meanwhile: one by one
+                for item in new:
+                    try:
+                        refs[item['doc_id']].create({**item['data'], 'created_at': firestore.SERVER_TIMESTAMP})
+                    except AlreadyExists:
+                        pass
+        except firestore_metrics.ReadBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to save to Firestore: {e}")
+            failed.extend(chunk)
+
+    return failed
+
+
+def _write_queued_destinations(items: List[Dict]) -> List[Dict]:
+    """write_behind worker callback (counted in the process totals, not a request)"""
+    with firestore_metrics.operation('destinations.write_behind'):
+        return _write_destination_records(firestore_metrics.metered(firestore.client()), items)
 
 
 def _fetch_from_osm(
@@ -232,191 +355,157 @@ def _fetch_from_osm(
     lon: float,
     count: int,
     category_weights: Dict[str, float],
-    preferred_categories: List[str]
+    preferred_categories: List[str],
+    area_bundle: 'trip_area.TripAreaBundle' = None
 ) -> List[Dict]:
     """
     Fetch real destinations from OpenStreetMap.
-    """
-    all_destinations = []
-    seen_ids = set()
 
-    for radius in [2000, 5000, 10000, 15000]:
-        destinations = _execute_osm_query(lat, lon, radius, city, country)
+    Uses radius_search: one query at the predicted radius when we know the
+    area's density, otherwise the classic 2km → 5km → 10km → 15km circles.
+    """
+    destinations = radius_search.search(
+        lambda radius, tiers_covered: _execute_osm_query(
+            lat, lon, radius, city, country,
+            limit=OSM_RESULT_LIMIT * tiers_covered, area_bundle=area_bundle
+        ),
+        'attractions',
+        lat, lon,
+        count,
+        RADIUS_TIERS,
+    )
+
+    return destinations[:count]
+
+
+def _execute_osm_query(lat: float, lon: float, radius: int, city: str, country: str,
+                       limit: int = None, area_bundle: 'trip_area.TripAreaBundle' = None) -> Optional[List[Dict]]:
+    """Execute OSM Overpass query (or read the prefetched trip area). None if Overpass failed."""
+
+    limit = limit or OSM_RESULT_LIMIT
+
+    # Name / hotel / duplicate checks run while the answer is decoded,
+    # so rejected elements never count towards `limit`
+    elements = trip_area.get_elements(
+        'attractions', lat, lon, radius,
+        limit=limit,
+        element_filter=_is_attraction_candidate,
+        dedup_key=_name_key,
+        hedge=True,
+        area_bundle=area_bundle
+    )
+    if elements is None:
+        return None
+    if not elements:
+        return []
 
-        for dest in destinations:
-            if dest['osm_id'] not in seen_ids:
-                seen_ids.add(dest['osm_id'])
-                all_destinations.append(dest)
+    return _parse_osm_elements(elements, city, country)
 
-        logger.info(f"   Radius {radius}m: found {len(destinations)}, total: {len(all_destinations)}")
 
-        if len(all_destinations) >= count:
-            break
+def _parse_osm_elements(elements: List[Dict], city: str, country: str) -> List[Dict]:
+    """Parse OSM elements into light candidates (what matching and scoring need)"""
 
-        time.sleep(0.3)
+    named = []
+    seen_names = set()
 
-    return all_destinations[:count]
+    for el in elements:
+        tags = el.get('tags', {})
 
+        # Get name (prefer English)
+        name = _display_name(tags)
+        if not name or len(name) < 2:
+            continue
 
-def _execute_osm_query(lat: float, lon: float, radius: int, city: str, country: str) -> List[Dict]:
-    """Execute OSM Overpass query"""
+        # Skip duplicates by name
+        name_lower = name.lower().strip()
+        if name_lower in seen_names:
+            continue
+        seen_names.add(name_lower)
 
-    exclude = ''.join([f'["tourism"!="{t}"]' for t in EXCLUDE_TYPES])
+        if el.get('lat') and el.get('lon'):
+            named.append((name, tags, el))
 
-    query = f'''
-[out:json][timeout:{QUERY_TIMEOUT}];
-(
-  node["tourism"]["name"]{exclude}(around:{radius},{lat},{lon});
-  node["leisure"~"park|garden"]["name"](around:{radius},{lat},{lon});
-  node["amenity"="place_of_worship"]["name"](around:{radius},{lat},{lon});
-  node["historic"]["name"](around:{radius},{lat},{lon});
-  node["natural"~"peak|beach|cave_entrance"]["name"](around:{radius},{lat},{lon});
-);
-out 80;
-'''
+    # Hotels/accommodations → None, everything else → its category (one pass)
+    categories = tag_rules.classify_attractions([(name, tags) for name, tags, _ in named])
 
-    for server in OVERPASS_SERVERS:
-        try:
-            response = requests.post(
-                server,
-                data=query,
-                headers={'Content-Type': 'application/x-www-form-urlencoded'},
-                timeout=REQUEST_TIMEOUT
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                elements = data.get('elements', [])
-                return _parse_osm_elements(elements, city, country)
-
-        except Exception:
+    places = []
+    for (name, tags, el), category in zip(named, categories):
+        if category is None:
             continue
 
-    return []
+        # Light candidate - _build_destination() adds the rest for survivors
+        places.append({
+            'osm_id': str(el.get('id', '')),
+            'name': name.strip(),
+            'name_local': tags.get('name') if tags.get('name') != name else None,
+            'city': city,
+            'country': country,
+            'category': category,
+            'rating': round(random.uniform(4.0, 4.8), 1),
+            'coordinates': {'lat': el['lat'], 'lng': el['lon']},
+            'tags': tags,
+        })
 
+    return places
 
-def _parse_osm_elements(elements: List[Dict], city: str, country: str) -> List[Dict]:
-    """Parse OSM elements into destination format"""
 
-    places = []
-    seen_names = set()
+def _build_destination(dest: Dict) -> Dict:
+    """Full destination dict for a candidate that made the cut"""
+    name, city = dest['name'], dest['city']
+    lat, lon = dest['coordinates']['lat'], dest['coordinates']['lng']
+    tags = dest.get('tags', {})
+
+    encoded = quote(f"{name} {city}")
+
+    return {
+        **dest,
+        'avg_cost': _estimate_cost(dest['country']),
+        'description': _description(dest),
+        'opening_hours': tags.get('opening_hours', 'Check locally'),
+        'tips': ['Check opening hours before visiting', 'Arrive early to avoid crowds'],
+        'maps_link': f"https://www.google.com/maps/search/?api=1&query={encoded}",
+        'maps_link_direct': f"https://www.google.com/maps?q={lat},{lon}",
+        'website': tags.get('website', ''),
+        'phone': tags.get('phone', ''),
+        'data_source': 'OpenStreetMap',
+    }
 
-    for el in elements:
-        try:
-            tags = el.get('tags', {})
 
-            # Get name (prefer English)
-            name = tags.get('name:en') or tags.get('name') or tags.get('int_name')
-            if not name or len(name) < 2:
-                continue
+def _description(dest: Dict) -> str:
+    return dest.get('tags', {}).get(
+        'description', f"{dest['name']} is a popular {dest['category']} in {dest['city']}."
+    )
 
-            # Skip duplicates by name
-            name_lower = name.lower().strip()
-            if name_lower in seen_names:
-                continue
-            seen_names.add(name_lower)
 
-            # Skip hotels/accommodations
-            if _is_accommodation(name, tags.get('tourism', '')):
-                continue
+def _display_name(tags: Dict) -> Optional[str]:
+    """Name we show for a place (prefer English)"""
+    return tags.get('name:en') or tags.get('name') or tags.get('int_name')
 
-            lat = el.get('lat')
-            lon = el.get('lon')
-            if not lat or not lon:
-                continue
 
-            osm_id = str(el.get('id', ''))
-
-            # Create unique ID based on OSM ID
-            dest_id = hashlib.md5(f"osm_{osm_id}".encode()).hexdigest()[:16]
-
-            encoded = quote(f"{name} {city}")
-            maps_link = f"https://www.google.com/maps/search/?api=1&query={encoded}"
-
-            category = _infer_category(tags)
-
-            places.append({
-                'id': dest_id,
-                'osm_id': osm_id,
-                'name': name.strip(),
-                'name_local': tags.get('name') if tags.get('name') != name else None,
-                'city': city,
-                'country': country,
-                'category': category,
-                'rating': round(random.uniform(4.0, 4.8), 1),
-                'avg_cost': _estimate_cost(country),
-                'description': tags.get('description', f"{name} is a popular {category} in {city}."),
-                'opening_hours': tags.get('opening_hours', 'Check locally'),
-                'tips': ['Check opening hours before visiting', 'Arrive early to avoid crowds'],
-                'coordinates': {'lat': lat, 'lng': lon},
-                'maps_link': maps_link,
-                'maps_link_direct': f"https://www.google.com/maps?q={lat},{lon}",
-                'website': tags.get('website', ''),
-                'phone': tags.get('phone', ''),
-                'tags': tags,
-                'data_source': 'OpenStreetMap',
-            })
-
-        except Exception:
-            continue
+def _is_attraction_candidate(el: Dict) -> bool:
+    """Cheap checks on a raw element: has a usable name and is not a hotel"""
+    tags = el.get('tags', {})
+    name = _display_name(tags)
+    if not name or len(name) < 2:
+        return False
+    return not _is_accommodation(name, tags.get('tourism', ''))
 
-    return places
+
+def _name_key(el: Dict) -> str:
+    """Duplicate key of a raw element (same name = same place)"""
+    return (_display_name(el.get('tags', {})) or '').lower().strip()
 
 
 def _is_accommodation(name: str, category: str) -> bool:
     """Check if this is an accommodation (should be excluded)"""
-    name_lower = name.lower()
-    category_lower = category.lower() if category else ''
-
-    if category_lower in EXCLUDE_TYPES:
-        return True
-
-    for keyword in HOTEL_KEYWORDS:
-        if keyword in name_lower:
-            return True
-
-    return False
+    return tag_rules.is_accommodation(name, category)
 
 
 def _infer_category(tags: Dict) -> str:
     """Infer category from OSM tags"""
-
-    tourism = tags.get('tourism', '')
-    leisure = tags.get('leisure', '')
-    amenity = tags.get('amenity', '')
-    historic = tags.get('historic', '')
-    natural = tags.get('natural', '')
-
-    if tourism == 'museum':
-        return 'museum'
-    elif tourism == 'viewpoint':
-        return 'viewpoint'
-    elif tourism in ['theme_park', 'zoo', 'aquarium']:
-        return 'entertainment'
-    elif leisure in ['park', 'garden', 'nature_reserve']:
-        return 'park'
-    elif natural in ['peak', 'beach', 'cave_entrance', 'waterfall']:
-        return 'nature'
-    elif amenity == 'place_of_worship':
-        return 'temple'
-    elif historic:
-        return 'cultural'
-    elif tags.get('shop'):
-        return 'shopping'
-    else:
-        return 'attraction'
+    return tag_rules.infer_category(tags)
 
 
 def _estimate_cost(country: str) -> float:
     """Estimate entrance cost based on country"""
-    costs = {
-        'japan': 50, 'usa': 60, 'singapore': 45, 'thailand': 15,
-        'malaysia': 20, 'indonesia': 12, 'vietnam': 10, 'korea': 35,
-        'china': 25, 'uk': 50, 'france': 45,
-    }
-
-    for key, cost in costs.items():
-        if key in country.lower():
-            return round(cost * random.uniform(0.8, 1.2), 2)
-
-    return round(30 * random.uniform(0.8, 1.2), 2)
\ No newline at end of file
+    return round(tag_rules.country_entrance_cost(country) * random.uniform(0.8, 1.2), 2)
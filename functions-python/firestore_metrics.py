@@ -0,0 +1,380 @@
+"""
+Firestore Metrics - Count reads, writes, queries and latency per request
+
+SIMPLE EXPLANATION:
+- Firestore bills per document read and written, and a few call patterns
+  (one query per candidate, one get() per ML score...) make the bill hard
+  to predict
+- metered(db) wraps the Firestore client: every query, get, get_all and
+  write goes through it and is counted:
+    * reads    → documents returned (at least 1 per query, 1 per get_all ref)
+    * writes   → create / set / update / delete / batch operations
+    * queries  → round trips
+    * latency  → ms spent waiting on Firestore
+- Counts are grouped by logical OPERATION (e.g. 'destinations.match',
+  'ml.rank_destinations') and by REQUEST (request_scope()), and every
+  request ends with one structured log line
+- Optional read budget per request (env or request_scope argument):
+    FIRESTORE_BUDGET_MODE=warn    → log a warning once the budget is passed
+    FIRESTORE_BUDGET_MODE=enforce → further reads raise ReadBudgetExceeded
+
+SETTINGS (env):
+    FIRESTORE_READ_BUDGET=0         → no budget (default)
+    FIRESTORE_BUDGET_MODE=warn
+
+USAGE:
+    db = metered(firestore.client())
+
+    with request_scope('plan_trip') as usage:
+        with operation('destinations.match'):
+            db.collection('destinationData').where(...).stream()
+    usage.summary()   # {'reads': 42, 'writes': 3, 'queries': 5, 'operations': {...}}
+
+    @tracked('ml.get_ml_score')        # Names the operation, meters the `db` argument
+    def get_ml_score(db, user_id, destination_id): ...
+
+Snapshot listeners (destination_cache) are passed through uncounted.
+"""
+
+import os
+import time
+import inspect
+import threading
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FIRESTORE_READ_BUDGET = int(os.environ.get('FIRESTORE_READ_BUDGET', '0'))   # Reads per request, 0 = no budget
+FIRESTORE_BUDGET_MODE = os.environ.get('FIRESTORE_BUDGET_MODE', 'warn')    # 'warn' or 'enforce'
+DEFAULT_OPERATION = 'other'
+
+
+class ReadBudgetExceeded(Exception):
+    """
+    Raised (budget mode 'enforce') when a request has used up its read budget.
+    Readers re-raise it ahead of their broad `except Exception` fallbacks,
+    so it stops the request instead of passing for "nothing found".
+    """
+
+
+class UsageStats:
+    """Firestore usage of one request (or of the whole process)"""
+
+    def __init__(self, name: str, read_budget: int = 0, budget_mode: str = 'warn'):
+        self.name = name
+        self.read_budget = read_budget
+        self.budget_mode = budget_mode
+        self.started = time.perf_counter()
+        self.totals = _empty_counts()
+        self.operations: Dict[str, Dict] = {}
+        self.budget_exceeded = False
+        self._lock = threading.Lock()
+
+    def record(self, op: str, reads: int = 0, writes: int = 0, queries: int = 0, latency_ms: float = 0.0):
+        with self._lock:
+            for counts in (self.totals, self.operations.setdefault(op, _empty_counts())):
+                counts['reads'] += reads
+                counts['writes'] += writes
+                counts['queries'] += queries
+                counts['latency_ms'] += latency_ms
+
+            over = self.read_budget and self.totals['reads'] > self.read_budget
+            warn = over and not self.budget_exceeded
+            if over:
+                self.budget_exceeded = True
+
+        if warn:
+            logger.warning(f"⚠️ Firestore read budget passed in '{self.name}': "
+                           f"{self.totals['reads']} reads > {self.read_budget} (during {op})")
+
+    def check_budget(self, op: str):
+        """Before a read: stop here if the budget is used up and enforced"""
+        if (self.budget_mode == 'enforce' and self.read_budget
+                and self.totals['reads'] >= self.read_budget):
+            raise ReadBudgetExceeded(
+                f"'{self.name}' used {self.totals['reads']} of {self.read_budget} reads (blocked: {op})"
+            )
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                'request': self.name,
+                **_rounded(self.totals),
+                'read_budget': self.read_budget or None,
+                'budget_exceeded': self.budget_exceeded,
+                'elapsed_ms': round((time.perf_counter() - self.started) * 1000, 1),
+                'operations': {op: _rounded(counts) for op, counts in self.operations.items()},
+            }
+
+
+_current_request: ContextVar[Optional[UsageStats]] = ContextVar('firestore_request', default=None)
+_current_operation: ContextVar[str] = ContextVar('firestore_operation', default=DEFAULT_OPERATION)
+
+
+# ============================================================
+# REQUESTS + OPERATIONS
+# ============================================================
+
+@contextmanager
+def request_scope(name: str, read_budget: int = None, budget_mode: str = None):
+    """
+    Count Firestore usage of everything inside (this thread, its asyncio
+    tasks, and executor calls that copy the context). Logs a summary at the end.
+    """
+    stats = UsageStats(
+        name,
+        FIRESTORE_READ_BUDGET if read_budget is None else read_budget,
+        budget_mode or FIRESTORE_BUDGET_MODE,
+    )
+    token = _current_request.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_request.reset(token)
+        _log_summary(stats)
+
+
+def current_request() -> Optional[UsageStats]:
+    return _current_request.get()
+
+
+@contextmanager
+def operation(name: str):
+    """Name the logical operation Firestore calls inside are counted under"""
+    token = _current_operation.set(name)
+    try:
+        yield
+    finally:
+        _current_operation.reset(token)
+
+
+def tracked(name: str):
+    """
+    Decorator: run the function as operation `name`, with its `db` argument
+    (positional or keyword) metered. Called from inside another operation,
+    it counts toward that one (get_ml_score inside rank_destinations_by_ml
+    counts as 'ml.rank_destinations').
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        db_param = 'db' if 'db' in signature.parameters else next(iter(signature.parameters))
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            if db_param in bound.arguments:
+                bound.arguments[db_param] = metered(bound.arguments[db_param])
+            if _current_operation.get() != DEFAULT_OPERATION:
+                return fn(*bound.args, **bound.kwargs)
+            with operation(name):
+                return fn(*bound.args, **bound.kwargs)
+        return wrapper
+    return decorator
+
+
+def get_process_stats() -> Dict:
+    """Totals since the instance started (all requests + background work)"""
+    return _process.summary()
+
+
+def _record(**counts):
+    op = _current_operation.get()
+    request = _current_request.get()
+    if request is not None:
+        request.record(op, **counts)
+    _process.record(op, **counts)
+
+
+def _before_read():
+    request = _current_request.get()
+    if request is not None:
+        request.check_budget(_current_operation.get())
+
+
+def _log_summary(stats: UsageStats):
+    summary = stats.summary()
+    logger.info(
+        f"🔥 Firestore [{stats.name}]: {summary['reads']} reads, {summary['writes']} writes, "
+        f"{summary['queries']} queries, {summary['latency_ms']:.0f}ms",
+        extra={'json_fields': {'firestore': summary}},   # Structured fields for Cloud Logging
+    )
+
+
+# ============================================================
+# CLIENT WRAPPERS
+# ============================================================
+
+def metered(db):
+    """Counting wrapper around a Firestore client (returns `db` if already wrapped)"""
+    if db is None or isinstance(db, MeteredClient):
+        return db
+    return MeteredClient(db)
+
+
+class _Wrapper:
+    """Passes anything not overridden straight to the wrapped object"""
+
+    def __init__(self, wrapped):
+        self._wrapped = wrapped
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+
+class MeteredClient(_Wrapper):
+
+    def collection(self, *path):
+        return MeteredQuery(self._wrapped.collection(*path))
+
+    def document(self, *path):
+        return MeteredDocument(self._wrapped.document(*path))
+
+    def get_all(self, references, field_paths=None, **kwargs):
+        refs = [_unwrap(ref) for ref in references]
+        _before_read()
+        start = time.perf_counter()
+        try:
+            yield from self._wrapped.get_all(refs, field_paths=field_paths, **kwargs)
+        finally:
+            # Billed per requested document, found or not
+            _record(reads=len(refs), queries=1, latency_ms=_ms_since(start))
+
+    def batch(self):
+        return MeteredBatch(self._wrapped.batch())
+
+
+class MeteredQuery(_Wrapper):
+    """A CollectionReference or Query; chained calls stay metered"""
+
+    def where(self, *args, **kwargs):
+        return MeteredQuery(self._wrapped.where(*args, **kwargs))
+
+    def select(self, *args, **kwargs):
+        return MeteredQuery(self._wrapped.select(*args, **kwargs))
+
+    def order_by(self, *args, **kwargs):
+        return MeteredQuery(self._wrapped.order_by(*args, **kwargs))
+
+    def limit(self, *args, **kwargs):
+        return MeteredQuery(self._wrapped.limit(*args, **kwargs))
+
+    def offset(self, *args, **kwargs):
+        return MeteredQuery(self._wrapped.offset(*args, **kwargs))
+
+    def start_after(self, *args, **kwargs):
+        return MeteredQuery(self._wrapped.start_after(*args, **kwargs))
+
+    def start_at(self, *args, **kwargs):
+        return MeteredQuery(self._wrapped.start_at(*args, **kwargs))
+
+    def document(self, *args, **kwargs):
+        return MeteredDocument(self._wrapped.document(*args, **kwargs))
+
+    def add(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._wrapped.add(*args, **kwargs)
+        finally:
+            _record(writes=1, latency_ms=_ms_since(start))
+
+    def stream(self, *args, **kwargs):
+        _before_read()
+        start = time.perf_counter()
+        returned = 0
+        try:
+            for doc in self._wrapped.stream(*args, **kwargs):
+                returned += 1
+                yield doc
+        finally:
+            # A query costs at least one read, even with no results
+            _record(reads=max(1, returned), queries=1, latency_ms=_ms_since(start))
+
+    def get(self, *args, **kwargs):
+        return list(self.stream(*args, **kwargs))
+
+
+class MeteredDocument(_Wrapper):
+
+    def collection(self, *path):
+        return MeteredQuery(self._wrapped.collection(*path))
+
+    def get(self, *args, **kwargs):
+        _before_read()
+        start = time.perf_counter()
+        try:
+            return self._wrapped.get(*args, **kwargs)
+        finally:
+            _record(reads=1, queries=1, latency_ms=_ms_since(start))
+
+    def create(self, *args, **kwargs):
+        return self._write('create', *args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        return self._write('set', *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._write('update', *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._write('delete', *args, **kwargs)
+
+    def _write(self, method: str, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return getattr(self._wrapped, method)(*args, **kwargs)
+        finally:
+            _record(writes=1, queries=1, latency_ms=_ms_since(start))
+
+
+class MeteredBatch(_Wrapper):
+    """Counts operations as they are added, records them on commit()"""
+
+    def __init__(self, wrapped):
+        super().__init__(wrapped)
+        self._operations = 0
+
+    def create(self, reference, *args, **kwargs):
+        self._operations += 1
+        return self._wrapped.create(_unwrap(reference), *args, **kwargs)
+
+    def set(self, reference, *args, **kwargs):
+        self._operations += 1
+        return self._wrapped.set(_unwrap(reference), *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs):
+        self._operations += 1
+        return self._wrapped.update(_unwrap(reference), *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        self._operations += 1
+        return self._wrapped.delete(_unwrap(reference), *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._wrapped.commit(*args, **kwargs)
+        finally:
+            _record(writes=self._operations, queries=1, latency_ms=_ms_since(start))
+
+
+def _unwrap(obj):
+    return obj._wrapped if isinstance(obj, _Wrapper) else obj
+
+
+def _empty_counts() -> Dict:
+    return {'reads': 0, 'writes': 0, 'queries': 0, 'latency_ms': 0.0}
+
+
+def _rounded(counts: Dict) -> Dict:
+    return {**counts, 'latency_ms': round(counts['latency_ms'], 1)}
+
+
+def _ms_since(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+_process = UsageStats('process')   # Everything, including background writes
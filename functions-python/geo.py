@@ -0,0 +1,26 @@
+"""
+Geo - Distance between two points on Earth
+
+SIMPLE EXPLANATION:
+- Every service needs "how far apart are these two places?"
+- haversine() is the ONE implementation: the others import it, so a fix
+  to the distance math applies everywhere
+- Uses the Haversine formula (accounts for the Earth's curvature)
+
+USAGE:
+    from geo import haversine
+    haversine(3.1478, 101.6953, 3.1579, 101.7116)   # → ~2.1 (km)
+"""
+
+from math import radians, cos, sin, asin, sqrt
+
+EARTH_RADIUS_KM = 6371
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate distance in km between two points"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat, dlon = lat2 - lat1, lon2 - lon1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    return 2 * asin(sqrt(a)) * EARTH_RADIUS_KM
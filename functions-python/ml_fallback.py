@@ -0,0 +1,117 @@
+"""
+ML Fallback - Scores for destinations the offline model hasn't scored yet
+
+SIMPLE EXPLANATION:
+- Freshly saved OSM places have no mlPredictions document, so they all got
+  a flat 0.5 and ranked in arbitrary order
+- This scorer gives them a real score from things we already have in memory:
+    * does the user like this CATEGORY? (their category affinity, from
+      the recency-decayed weights in their userCategoryAffinity document)
+    * the place's RATING
+    * DISTANCE from the trip origin (closer = better)
+  score = AFFINITY_WEIGHT x affinity + RATING_WEIGHT x rating + DISTANCE_WEIGHT x closeness
+  (each part 0-1, so the score is 0-1 like the model's)
+- Places that DO have a model score keep it, blended with the fallback:
+  ML_WEIGHT x model score + (1 - ML_WEIGHT) x fallback score
+- The whole batch is scored at once with NumPy arrays (CandidatePool),
+  plain Python loops without NumPy - no Firestore reads either way
+
+USAGE:
+    affinity = category_affinity({'museum': 12, 'park': 3})
+    scores, sources = blend_scores(destinations, known_scores, affinity, origin=(lat, lon))
+"""
+
+import logging
+from math import exp
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from candidate_pool import CandidatePool, NUMPY_AVAILABLE, np
+
+logger = logging.getLogger(__name__)
+
+AFFINITY_WEIGHT = 0.5
+RATING_WEIGHT = 0.3
+DISTANCE_WEIGHT = 0.2
+ML_WEIGHT = 0.8             # Share of a model score when blending
+DISTANCE_SCALE_KM = 5.0     # Closeness = exp(-km / scale): 1 at the origin, ~0.37 at 5km
+RATING_FLOOR, RATING_CEIL = 3.0, 5.0  # Ratings mapped to 0-1 across this range
+NEUTRAL = 0.5               # Feature value when unknown (no history, no coordinates)
+DEFAULT_RATING = 4.0
+
+
+def category_affinity(category_counts: Dict[str, float]) -> Dict[str, float]:
+    """{'museum': 12, 'park': 3} → {'museum': 1.0, 'park': 0.25} (empty = no history)"""
+    top = max(category_counts.values(), default=0)
+    if top <= 0:
+        return {}
+    return {category: count / top for category, count in category_counts.items()}
+
+
+def fallback_scores(items: List[Dict], affinity: Dict[str, float], origin: Tuple[float, float] = None):
+    """Fallback score of every item (array, or list without NumPy)"""
+    if not items:
+        return np.zeros(0) if NUMPY_AVAILABLE else []
+
+    has_coords = [_has_coords(item) for item in items]
+    if origin is None:
+        origin = _centroid([item for item, ok in zip(items, has_coords) if ok])
+
+    # The pool needs coordinates: items without any sit at the origin, their closeness is set to NEUTRAL below
+    anchor = {'lat': origin[0], 'lng': origin[1]} if origin else {'lat': 0.0, 'lng': 0.0}
+    pool = CandidatePool(
+        [item if ok else {**item, 'coordinates': anchor} for item, ok in zip(items, has_coords)],
+        category_key='category', rating_key='rating', default_rating=DEFAULT_RATING,
+    )
+    affinity_values = pool.category_values(affinity, 0.0) if affinity else None
+
+    if not NUMPY_AVAILABLE:
+        distances = pool.distances_km(*origin) if origin else [0.0] * len(items)
+        scores = []
+        for i in range(len(items)):
+            aff = affinity_values[i] if affinity_values is not None else NEUTRAL
+            rating = min(1.0, max(0.0, ((pool.rating[i] or DEFAULT_RATING) - RATING_FLOOR) / (RATING_CEIL - RATING_FLOOR)))
+            close = exp(-distances[i] / DISTANCE_SCALE_KM) if origin and has_coords[i] else NEUTRAL
+            scores.append(AFFINITY_WEIGHT * aff + RATING_WEIGHT * rating + DISTANCE_WEIGHT * close)
+        return scores
+
+    aff = affinity_values if affinity_values is not None else np.full(len(items), NEUTRAL)
+    rating = np.clip((np.nan_to_num(pool.rating, nan=DEFAULT_RATING) - RATING_FLOOR) / (RATING_CEIL - RATING_FLOOR), 0.0, 1.0)
+    if origin:
+        close = np.where(np.asarray(has_coords), np.exp(-pool.distances_km(*origin) / DISTANCE_SCALE_KM), NEUTRAL)
+    else:
+        close = np.full(len(items), NEUTRAL)
+    return AFFINITY_WEIGHT * aff + RATING_WEIGHT * rating + DISTANCE_WEIGHT * close
+
+
+def blend_scores(items: List[Dict], known: Sequence[Optional[float]], affinity: Dict[str, float],
+                 origin: Tuple[float, float] = None) -> Tuple[List[float], List[str]]:
+    """
+    Final score per item, and where it came from ('blended' or 'fallback')
+
+    Args:
+        known: Model score per item (same order), None where there is none
+    """
+    fallback = fallback_scores(items, affinity, origin)
+
+    if NUMPY_AVAILABLE and len(items):
+        has_model = np.asarray([k is not None for k in known], dtype=bool)
+        model = np.asarray([k if k is not None else 0.0 for k in known], dtype='float64')
+        scores = np.where(has_model, ML_WEIGHT * model + (1 - ML_WEIGHT) * fallback, fallback).tolist()
+    else:
+        scores = [ML_WEIGHT * k + (1 - ML_WEIGHT) * f if k is not None else f for k, f in zip(known, fallback)]
+
+    sources = ['blended' if k is not None else 'fallback' for k in known]
+    return [round(float(s), 4) for s in scores], sources
+
+
+def _has_coords(item: Dict) -> bool:
+    coords = item.get('coordinates') or {}
+    return coords.get('lat') is not None and coords.get('lng') is not None
+
+
+def _centroid(items: List[Dict]) -> Optional[Tuple[float, float]]:
+    if not items:
+        return None
+    lats = [item['coordinates']['lat'] for item in items]
+    lons = [item['coordinates']['lng'] for item in items]
+    return sum(lats) / len(lats), sum(lons) / len(lons)
@@ -19,15 +19,38 @@ WHY PRE-COMPUTE?
 """
 
 from firebase_admin import firestore
+import base64
+import heapq
+import json
 import logging
+import os
+from typing import Dict, Iterable
+import destination_cache
+import firestore_metrics
+import ml_fallback
+import ml_score_cache
+import ml_topn
+import user_affinity
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_ML_SCORE = 0.5       # Neutral score when a pair has no prediction
+ML_SCORE_BATCH = 300         # mlPredictions documents per get_all call
+RECOMMENDATION_FIELDS = ['destinationID', 'destinationName', 'category', 'city', 'country', 'mlScore']
+# Lowercased copies the indexed queries filter on (the scoring job writes them, see search_fields)
+SEARCH_FIELDS = {'city': 'city_lc', 'country': 'country_lc', 'category': 'category_lc'}
+FIRESTORE_BATCH_LIMIT = 500
+# No aggregate doc → read userInteractions (env AFFINITY_SCAN_FALLBACK=1, until backfilled);
+# off, such users get the neutral prior (no category preference)
+AFFINITY_SCAN_FALLBACK = os.environ.get('AFFINITY_SCAN_FALLBACK', '0') == '1'
+
+
 def get_firestore_client():
-    """Get Firestore database connection"""
-    return firestore.client()
+    """Get Firestore database connection (reads/writes counted by firestore_metrics)"""
+    return firestore_metrics.metered(firestore.client())
 
 
+@firestore_metrics.tracked('ml.get_ml_score')
 def get_ml_score(db, user_id: str, destination_id: str) -> float:
     """
     Get the ML recommendation score for a specific user-destination pair
@@ -48,7 +71,16 @@ def get_ml_score(db, user_id: str, destination_id: str) -> float:
     1. Creates lookup key: "user_abc123_tokyo_tower"
     2. Checks Firestore collection 'mlPredictions' for this document
     3. Returns the mlScore field, or 0.5 if not found
+    (Steps 2-3 are skipped when the user's scores are already cached in
+    memory - a single score never loads a snapshot, that could be thousands of reads)
     """
+    # Served from the user's score snapshot when cached (see ml_score_cache)
+    snapshot = ml_score_cache.get_snapshot(db, user_id, load=False)
+    if snapshot is not None:
+        found, missing = snapshot.resolve([destination_id])
+        if not missing:
+            return found.get(destination_id, DEFAULT_ML_SCORE)
+
     try:
         # Create document ID by combining user and destination IDs
         doc_id = f"{user_id}_{destination_id}"
@@ -57,19 +89,66 @@ def get_ml_score(db, user_id: str, destination_id: str) -> float:
         doc = db.collection('mlPredictions').document(doc_id).get()
 
         if doc.exists:
-            score = doc.to_dict().get('mlScore', 0.5)
-            logger.info(f"ML score for {destination_id}: {score:.3f}")
+            score = ml_score_cache.score_of(doc.to_dict() or {})
+            logger.debug(f"ML score for {destination_id}: {score:.3f}")
             return float(score)
         else:
             # No score found - return neutral default
             logger.debug(f"No ML score found for {doc_id}, using default")
             return 0.5
 
+    except firestore_metrics.ReadBudgetExceeded:
+        raise
     except Exception as e:
         logger.warning(f"Error getting ML score: {e}")
         return 0.5  # Safe default on error
 
 
+@firestore_metrics.tracked('ml.get_ml_scores')
+def get_ml_scores(db, user_id: str, destination_ids: Iterable[str], city: str = None) -> Dict[str, float]:
+    """
+    ML scores for many destinations at once: {destination_id: score}
+
+    Answered from the user's cached score snapshot (ml_score_cache) where
+    possible. A snapshot is only loaded for a `city`: without one the user's
+    whole prediction set would be streamed for a handful of IDs, so an
+    all-cities snapshot is used only if it is already cached. The rest are
+    fetched with get_all (ML_SCORE_BATCH per call) instead of one round trip each.
+    Missing documents, missing IDs and failed chunks get DEFAULT_ML_SCORE.
+    """
+    ids = list(dict.fromkeys(d for d in destination_ids if d))
+    return {**{dest_id: DEFAULT_ML_SCORE for dest_id in ids}, **get_known_ml_scores(db, user_id, ids, city)}
+
+
+@firestore_metrics.tracked('ml.get_ml_scores')
+def get_known_ml_scores(db, user_id: str, destination_ids: Iterable[str], city: str = None) -> Dict[str, float]:
+    """Like get_ml_scores(), but only destinations that HAVE a prediction (no defaults)"""
+    ids = list(dict.fromkeys(d for d in destination_ids if d))
+    scores = {}
+
+    snapshot = ml_score_cache.get_snapshot(db, user_id, city, load=bool(city))
+    if snapshot is not None:
+        found, ids = snapshot.resolve(ids)
+        scores.update(found)
+
+    for i in range(0, len(ids), ML_SCORE_BATCH):
+        chunk = ids[i:i + ML_SCORE_BATCH]
+        doc_to_dest = {f"{user_id}_{dest_id}": dest_id for dest_id in chunk}
+        try:
+            refs = [db.collection('mlPredictions').document(doc_id) for doc_id in doc_to_dest]
+            for doc in db.get_all(refs, field_paths=['mlScore']):
+                if doc.exists:
+                    scores[doc_to_dest[doc.id]] = ml_score_cache.score_of(doc.to_dict() or {})
+        except firestore_metrics.ReadBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Error getting ML scores ({len(chunk)} destinations): {e}")
+
+    logger.debug(f"ML scores: {len(scores)} found ({len(ids)} looked up in Firestore)")
+    return scores
+
+
+@firestore_metrics.tracked('ml.get_recommendations')
 def get_ml_recommendations(db, user_id: str, city: str = None, country: str = None,
                            category: str = None, limit: int = 50) -> list:
     """
@@ -94,52 +173,198 @@ def get_ml_recommendations(db, user_id: str, city: str = None, country: str = No
         get_ml_recommendations(db, 'user123', city='Tokyo', category='museum', limit=10)
         → Top 10 museums in Tokyo for this user
 
-    Note: Filters are applied in Python (not Firestore query)
-          because Firestore limits complex queries
+    Filtering, ordering and the limit run in Firestore (composite indexes
+    in firestore.indexes.json), so only `limit` documents are read.
+    Use get_ml_recommendations_page() for the following pages.
+    """
+    return get_ml_recommendations_page(db, user_id, city, country, category, limit)['items']
+
+
+@firestore_metrics.tracked('ml.get_recommendations')
+def get_ml_recommendations_page(db, user_id: str, city: str = None, country: str = None,
+                                category: str = None, limit: int = 50, cursor: str = None) -> dict:
+    """
+    One page of get_ml_recommendations()
+
+    Returns:
+        {'items': [...], 'next_cursor': str or None}
+        Pass next_cursor back to get the next page (None = no more results).
+
+    Indexed query: userID (+ city_lc / country_lc / category_lc, so matching
+    is case-insensitive like the fallback and the top-N document) ordered
+    by mlScore desc, then document ID, with limit and start_after(cursor). If the
+    query fails (e.g. an index is still building) the fallback streams
+    only the needed fields and keeps the top `limit` with heapq.
     """
     try:
-        # Start with query for this user
-        query = db.collection('mlPredictions').where('userID', '==', user_id)
+        after = _decode_cursor(cursor)
 
-        # Note: Can't filter by multiple fields in Firestore query
-        # We'll filter in Python after retrieving
+        # Precomputed (user, city) top-N document: one read, when it covers this page
+        page = None
+        if city:
+            top = ml_topn.get_top_n(db, user_id, city)
+            if top is not None:
+                page = _page_from_top_n(top, user_id, country, category, limit, after)
+
+        if page is not None:
+            items, last = page
+        else:
+            items, last = _fetch_recommendations(db, user_id, city, country, category, limit, after)
 
-        docs = list(query.stream())
+        logger.info(f"Found {len(items)} ML recommendations for user {user_id[:20]}...")
+
+        return {
+            'items': items,
+            'next_cursor': _encode_cursor(last) if last and len(items) == limit else None,
+        }
+
+    except firestore_metrics.ReadBudgetExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting ML recommendations: {e}")
+        return {'items': [], 'next_cursor': None}
+
+
+def _fetch_recommendations(db, user_id, city, country, category, limit, after):
+    """Indexed query, or the fallback scan if it fails"""
+    try:
+        return _query_recommendations(db, user_id, city, country, category, limit, after)
+    except firestore_metrics.ReadBudgetExceeded:
+        raise
+    except Exception as e:
+        logger.warning(f"Indexed ML recommendation query failed ({e}), using fallback scan")
+        return _scan_recommendations(db, user_id, city, country, category, limit, after)
 
-        recommendations = []
+
+def _page_from_top_n(top, user_id, country, category, limit, after):
+    """
+    The page from a top-N document, or None if the document can't answer it
+    (it ran out of entries and doesn't hold every prediction of the city)
+    """
+    if country and ml_topn.search_key(top.country) != ml_topn.search_key(country):
+        return ([], None) if top.complete else None
+
+    items, last = [], None
+    for rec in top.recommendations():
+        if category and ml_topn.search_key(rec['category']) != ml_topn.search_key(category):
+            continue
+        key = (rec['mlScore'], f"{user_id}_{rec['destinationID']}")
+        if after and key >= after:
+            continue  # Already on an earlier page
+        items.append(rec)
+        last = key
+        if len(items) == limit:
+            return items, last
+
+    return (items, last) if top.complete else None
+
+
+def _recommendation_filters(city, country, category) -> list:
+    """[(field, normalized value)] of the filters that are set (matching is case-insensitive)"""
+    return [(field, ml_topn.search_key(value))
+            for field, value in (('city', city), ('country', country), ('category', category)) if value]
+
+
+def search_fields(data: dict) -> dict:
+    """
+    The lowercased filter fields of an mlPredictions document
+    ({'city_lc': 'tokyo', ...}) - write them with every prediction
+    """
+    return {lc_field: ml_topn.search_key(data.get(field)) for field, lc_field in SEARCH_FIELDS.items()}
+
+
+def backfill_search_fields(db, collection: str = 'mlPredictions') -> int:
+    """
+    Add / correct the lowercased filter fields on every document of
+    `collection` (run once before the indexed queries rely on them).
+    Returns documents updated.
+    """
+    updated, batch, pending = 0, db.batch(), 0
+    for doc in db.collection(collection).select(list(SEARCH_FIELDS) + list(SEARCH_FIELDS.values())).stream():
+        data = doc.to_dict() or {}
+        fields = search_fields(data)
+        if all(data.get(k) == v for k, v in fields.items()):
+            continue
+        batch.update(doc.reference, fields)
+        pending += 1
+        if pending == FIRESTORE_BATCH_LIMIT:
+            batch.commit()
+            updated, batch, pending = updated + pending, db.batch(), 0
+    if pending:
+        batch.commit()
+        updated += pending
+
+    logger.info(f"🔤 Search fields backfilled on {updated} {collection} documents")
+    return updated
+
+
+def _query_recommendations(db, user_id, city, country, category, limit, after):
+    """Server-side: filters, order and limit in one indexed query"""
+    query = db.collection('mlPredictions').where('userID', '==', user_id)
+    for field, value in _recommendation_filters(city, country, category):
+        query = query.where(SEARCH_FIELDS[field], '==', value)
+
+    query = (query.order_by('mlScore', direction=firestore.Query.DESCENDING)
+             .order_by('__name__', direction=firestore.Query.DESCENDING))
+    if after:
+        query = query.start_after({'mlScore': after[0], '__name__': after[1]})
+
+    docs = list(query.select(RECOMMENDATION_FIELDS).limit(limit).stream())
+    items = [_recommendation(doc.to_dict()) for doc in docs]
+    last = (items[-1]['mlScore'], docs[-1].id) if docs else None
+    return items, last
+
+
+def _scan_recommendations(db, user_id, city, country, category, limit, after):
+    """
+    Fallback: stream the user's predictions (needed fields only), filter in
+    Python (case-insensitive, like before) and keep the top `limit` with a heap
+    """
+    filters = _recommendation_filters(city, country, category)
+    docs = (db.collection('mlPredictions')
+            .where('userID', '==', user_id)
+            .select(RECOMMENDATION_FIELDS)
+            .stream())
+
+    def candidates():
         for doc in docs:
             data = doc.to_dict()
-
-            # Apply filters in Python
-            if city and data.get('city', '').lower() != city.lower():
-                continue  # Skip if city doesn't match
-            if country and data.get('country', '').lower() != country.lower():
-                continue
-            if category and data.get('category', '').lower() != category.lower():
+            if any(ml_topn.search_key(data.get(field)) != value for field, value in filters):
                 continue
+            key = (ml_score_cache.score_of(data), doc.id)   # null scores sort as the default
+            if after and key >= after:
+                continue  # Already on an earlier page (same order as the indexed query)
+            yield key, data
 
-            # Add to results
-            recommendations.append({
-                'destinationID': data.get('destinationID'),
-                'destinationName': data.get('destinationName'),
-                'category': data.get('category'),
-                'city': data.get('city'),
-                'country': data.get('country'),
-                'mlScore': data.get('mlScore', 0.5),
-            })
+    top = heapq.nlargest(limit, candidates(), key=lambda pair: pair[0])
+    items = [_recommendation(data) for _, data in top]
+    return items, (top[-1][0] if top else None)
 
-        # Sort by ML score (highest first)
-        recommendations.sort(key=lambda x: x['mlScore'], reverse=True)
 
-        logger.info(f"Found {len(recommendations)} ML recommendations for user {user_id[:20]}...")
+def _recommendation(data: dict) -> dict:
+    return {
+        'destinationID': data.get('destinationID'),
+        'destinationName': data.get('destinationName'),
+        'category': data.get('category'),
+        'city': data.get('city'),
+        'country': data.get('country'),
+        'mlScore': ml_score_cache.score_of(data),
+    }
 
-        return recommendations[:limit]
 
-    except Exception as e:
-        logger.error(f"Error getting ML recommendations: {e}")
-        return []
+def _encode_cursor(last) -> str:
+    """(mlScore, document ID) of the last item → opaque page token"""
+    return base64.urlsafe_b64encode(json.dumps(list(last)).encode('utf-8')).decode('ascii')
+
 
+def _decode_cursor(cursor: str):
+    if not cursor:
+        return None
+    score, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return score, doc_id
 
+
+@firestore_metrics.tracked('ml.preferred_categories')
 def get_user_preferred_categories(db, user_id: str) -> list:
     """
     Figure out what types of places a user likes
@@ -161,32 +386,54 @@ def get_user_preferred_categories(db, user_id: str) -> list:
     - Personalizing recommendations
     - Understanding user preferences
     - Cold start (when we don't have ML scores yet)
+
+    One read: the user's userCategoryAffinity document (see user_affinity),
+    recently liked categories first.
     """
     try:
-        # Get user's positive interactions (things they liked)
-        interactions = db.collection('userInteractions')\
-            .where('userID', '==', user_id)\
-            .where('interactionType', 'in', ['add_to_trip', 'save'])\
-            .stream()
-
-        # Count how many times each category appears
-        category_counts = {}
-        for doc in interactions:
-            cat = doc.to_dict().get('category', 'attraction')
-            category_counts[cat] = category_counts.get(cat, 0) + 1
-
-        # Sort by count (most popular first)
-        sorted_cats = sorted(category_counts.items(), key=lambda x: x[1], reverse=True)
-
-        # Return top 5 categories
-        return [cat for cat, count in sorted_cats[:5]]
+        return _category_profile(db, user_id).preferred(5)
 
+    except firestore_metrics.ReadBudgetExceeded:
+        raise
     except Exception as e:
         logger.warning(f"Error getting preferred categories: {e}")
         # Safe defaults
         return ['attraction', 'cultural', 'museum']
 
 
+@firestore_metrics.tracked('ml.preferred_categories')
+def get_user_category_counts(db, user_id: str) -> Dict[str, int]:
+    """
+    How many times the user added / saved each category: {'museum': 12, ...}
+    (the data behind get_user_preferred_categories)
+    """
+    return _category_profile(db, user_id).counts
+
+
+def _category_profile(db, user_id: str) -> user_affinity.CategoryAffinity:
+    """
+    The user's aggregate document. Users without one yet (not backfilled)
+    get an empty profile (neutral prior), or - with AFFINITY_SCAN_FALLBACK -
+    one computed from their interactions, like before the aggregate.
+    """
+    profile = user_affinity.get_affinity(db, user_id)
+    if profile is not None:
+        return profile
+    if not AFFINITY_SCAN_FALLBACK:
+        return user_affinity.CategoryAffinity({'userID': user_id})
+
+    logger.debug(f"No affinity document for user {user_id[:20]}, reading interactions")
+    # Get user's positive interactions (things they liked)
+    interactions = db.collection('userInteractions')\
+        .where('userID', '==', user_id)\
+        .where('interactionType', 'in', user_affinity.POSITIVE_TYPES)\
+        .stream()
+    return user_affinity.CategoryAffinity(
+        user_affinity.build_affinity_doc(user_id, (doc.to_dict() for doc in interactions))
+    )
+
+
+@firestore_metrics.tracked('ml.add_ml_score')
 def add_ml_score_to_item(db, user_id: str, item: dict) -> dict:
     """
     Add ML score to a single itinerary item
@@ -206,7 +453,7 @@ def add_ml_score_to_item(db, user_id: str, item: dict) -> dict:
         → {name: 'Tokyo Tower', locationID: 'tower123', mlScore: 0.85}
     """
     # Find the destination ID (might be stored under different field names)
-    dest_id = item.get('locationID') or item.get('destinationID') or item.get('id')
+    dest_id = _item_destination_id(item)
 
     if dest_id:
         item['mlScore'] = get_ml_score(db, user_id, dest_id)
@@ -216,7 +463,29 @@ def add_ml_score_to_item(db, user_id: str, item: dict) -> dict:
     return item
 
 
-def rank_destinations_by_ml(db, user_id: str, destinations: list) -> list:
+@firestore_metrics.tracked('ml.add_ml_scores')
+def add_ml_score_to_items(db, user_id: str, items: list) -> list:
+    """
+    List form of add_ml_score_to_item(): every item gets 'mlScore',
+    fetched in one batched read (see get_ml_scores)
+    """
+    dest_ids = [_item_destination_id(item) for item in items]
+    scores = get_ml_scores(db, user_id, [d for d in dest_ids if d])
+
+    for item, dest_id in zip(items, dest_ids):
+        item['mlScore'] = scores.get(dest_id, DEFAULT_ML_SCORE) if dest_id else DEFAULT_ML_SCORE
+
+    return items
+
+
+def _item_destination_id(item: dict):
+    """Destination ID of an itinerary item (stored under different field names)"""
+    return item.get('locationID') or item.get('destinationID') or item.get('id')
+
+
+@firestore_metrics.tracked('ml.rank_destinations')
+def rank_destinations_by_ml(db, user_id: str, destinations: list, origin: tuple = None,
+                            category_affinity: dict = None) -> list:
     """
     Sort a list of destinations by how well they match user preferences
 
@@ -224,23 +493,62 @@ def rank_destinations_by_ml(db, user_id: str, destinations: list) -> list:
         db: Firestore client
         user_id: User's ID
         destinations: List of destination dicts
+        origin: Optional (lat, lon) the trip starts from (default: their center)
+        category_affinity: Optional ml_fallback.category_affinity() of the
+                           user (from their recency-decayed category
+                           weights in Firestore when not given)
 
     Returns:
         Same list, sorted by ML score (best matches first)
-        Also adds 'mlScore' and 'is_ml_recommended' fields
+        Also adds 'mlScore', 'mlScoreSource' ('blended' / 'fallback') and
+        'is_ml_recommended' fields (only model-backed scores can be recommended)
+
+    Places without a model score (e.g. just saved from OSM) get a score
+    from ml_fallback (category affinity, rating, distance) instead of a
+    flat 0.5; places with one get it blended with the same features.
 
     Example:
         destinations = [{name: 'Museum A'}, {name: 'Park B'}, {name: 'Museum C'}]
         ranked = rank_destinations_by_ml(db, 'user123', destinations)
         → If user loves museums: [{Museum A, score: 0.9}, {Museum C, score: 0.85}, {Park B, score: 0.6}]
     """
-    for dest in destinations:
-        # Get destination ID (might be stored as 'id' or 'osm_id')
-        dest_id = dest.get('id') or dest.get('osm_id')
-        dest['mlScore'] = get_ml_score(db, user_id, dest_id)
-
-        # Mark strong recommendations
-        dest['is_ml_recommended'] = dest['mlScore'] > 0.6
+    # Get destination IDs (might be stored as 'id' or 'osm_id')
+    dest_ids = [dest.get('id') or dest.get('osm_id') for dest in destinations]
+    cities = {dest.get('city') for dest in destinations}
+    city = cities.pop() if len(cities) == 1 else None   # One-city trip
+
+    # Just saved from OSM = can't have a model score yet: don't look them up
+    lookup = [dest_id for dest, dest_id in zip(destinations, dest_ids)
+              if dest_id and dest.get('ml_source') != 'newly_saved']
+
+    # The city's precomputed top-N document first (one read), then the
+    # rest in one batched lookup (not one document get per destination)
+    known, missing = {}, lookup
+    top = ml_topn.get_top_n(db, user_id, city) if city and lookup else None
+    if top is not None:
+        known, missing = top.resolve(lookup)
+    if missing:
+        known.update(get_known_ml_scores(db, user_id, missing, city))
+
+    if category_affinity is None:
+        try:
+            category_affinity = ml_fallback.category_affinity(_category_profile(db, user_id).weights())
+        except firestore_metrics.ReadBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Error getting category affinity: {e}")
+            category_affinity = {}
+
+    scores, sources = ml_fallback.blend_scores(
+        destinations, [known.get(dest_id) for dest_id in dest_ids], category_affinity, origin
+    )
+
+    for dest, score, source in zip(destinations, scores, sources):
+        dest['mlScore'] = score
+        dest['mlScoreSource'] = source
+
+        # Mark strong recommendations - the model's, not the fallback's guesses
+        dest['is_ml_recommended'] = source == 'blended' and score > 0.6
 
     # Sort by ML score (highest first)
     destinations.sort(key=lambda x: x.get('mlScore', 0), reverse=True)
@@ -252,6 +560,7 @@ def rank_destinations_by_ml(db, user_id: str, destinations: list) -> list:
 # COLD START HANDLING
 # ============================================================
 
+@firestore_metrics.tracked('ml.cold_start')
 def get_cold_start_recommendations(db, city: str = None, country: str = None,
                                     category: str = None, limit: int = 20) -> list:
     """
@@ -274,42 +583,56 @@ def get_cold_start_recommendations(db, city: str = None, country: str = None,
     This ensures new users still get good recommendations!
     """
     try:
-        # Query general destination database
-        query = db.collection('destinationData')
+        city_docs = destination_cache.get_city_docs(db, city) if city else None
 
-        # Apply filters if provided
-        if city:
-            query = query.where('city', '==', city)
-        if country:
-            query = query.where('country', '==', country)
-        if category:
-            query = query.where('category', '==', category)
+        filters = _recommendation_filters(city, country, category)
 
-        # Get more than we need (we'll filter/sort)
-        docs = list(query.limit(limit * 2).stream())
+        if city_docs:
+            # Hot city: already in memory, kept current by a snapshot listener
+            docs = [
+                (doc_id, data) for doc_id, data in city_docs.items()
+                if all(ml_topn.search_key(data.get(field)) == value for field, value in filters)
+            ]
+            return _rank_cold_start(docs, limit)
 
-        destinations = []
-        for doc in docs:
-            data = doc.to_dict()
-            destinations.append({
-                'id': doc.id,
-                'name': data.get('name'),
-                'category': data.get('category'),
-                'rating': data.get('rating', 4.0),
-                'popularity': data.get('popularity', 50),
-                'mlScore': 0.5,  # Neutral score (no personalization)
-            })
+        # Query general destination database
+        query = db.collection('destinationData')
 
-        # Sort by rating and popularity (best first)
-        destinations.sort(key=lambda x: (x.get('rating', 0), x.get('popularity', 0)), reverse=True)
+        # Apply filters if provided (lowercased copies: case-insensitive)
+        for field, value in filters:
+            query = query.where(SEARCH_FIELDS[field], '==', value)
 
-        return destinations[:limit]
+        # Get more than we need (we'll filter/sort)
+        docs = [(doc.id, doc.to_dict()) for doc in query.limit(limit * 2).stream()]
+        return _rank_cold_start(docs, limit)
 
+    except firestore_metrics.ReadBudgetExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error getting cold start recommendations: {e}")
         return []
 
 
+def _rank_cold_start(docs: list, limit: int) -> list:
+    """(doc_id, data) pairs → cold start items, best rated / most popular first"""
+    destinations = []
+    for doc_id, data in docs:
+        destinations.append({
+            'id': doc_id,
+            'name': data.get('name'),
+            'category': data.get('category'),
+            'rating': data.get('rating', 4.0),
+            'popularity': data.get('popularity', 50),
+            'mlScore': 0.5,  # Neutral score (no personalization)
+        })
+
+    # Sort by rating and popularity (best first)
+    destinations.sort(key=lambda x: (x.get('rating', 0), x.get('popularity', 0)), reverse=True)
+
+    return destinations[:limit]
+
+
+@firestore_metrics.tracked('ml.is_cold_start_user')
 def is_cold_start_user(db, user_id: str) -> bool:
     """
     Check if user is new (has no interaction history)
@@ -325,9 +648,17 @@ def is_cold_start_user(db, user_id: str) -> bool:
     Used to decide:
     - Show personalized recommendations? (if False)
     - Show popular recommendations? (if True)
+
+    One read: the interaction count in the user's userCategoryAffinity document.
     """
     try:
-        # Check if user has ANY interactions
+        profile = user_affinity.get_affinity(db, user_id)
+        if profile is not None:
+            return profile.interaction_count == 0
+        if not AFFINITY_SCAN_FALLBACK:
+            return True
+
+        # No aggregate yet: check if user has ANY interactions
         interactions = db.collection('userInteractions')\
             .where('userID', '==', user_id)\
             .limit(1)\
@@ -336,6 +667,8 @@ def is_cold_start_user(db, user_id: str) -> bool:
         has_interactions = len(list(interactions)) > 0
         return not has_interactions  # True if NO interactions
 
+    except firestore_metrics.ReadBudgetExceeded:
+        raise
     except Exception as e:
         logger.warning(f"Error checking cold start: {e}")
         return True  # Assume cold start on error (safer)
\ No newline at end of file
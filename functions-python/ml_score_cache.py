@@ -0,0 +1,217 @@
+"""
+ML Score Cache - Per-user snapshots of mlPredictions, kept across warm invocations
+
+SIMPLE EXPLANATION:
+- A user regenerating a trip or editing an itinerary asks for the same ML
+  scores again minutes later, and every ask used to go to Firestore
+- On the first touch we load the user's mlPredictions for the trip's city
+  (or all of them, when a caller asks for that explicitly) in one query into a compact {destination_id: score}
+  map - a "snapshot"
+- Later lookups for that user are answered from memory:
+    * destination in the snapshot     → its score
+    * not in the snapshot             → the caller reads Firestore for it
+      (batched; it may have been scored after the snapshot was loaded)
+- Snapshots expire when the offline model publishes new scores: every
+  ML_MODEL_REFRESH_HOURS, aligned to ML_MODEL_REFRESH_OFFSET_HOURS (UTC)
+- Bounded by memory (ML_SCORE_CACHE_MAX_MB): least recently used users
+  are dropped first
+- get_cache_stats() reports the hit ratio
+
+SETTINGS (env):
+    ML_SCORE_CACHE=0                   → disabled
+    ML_SCORE_CACHE_MAX_MB=16
+    ML_MODEL_REFRESH_HOURS=24          → how often the offline job rewrites scores
+    ML_MODEL_REFRESH_OFFSET_HOURS=0    → UTC hour its run finishes
+
+USAGE:
+    snapshot = get_snapshot(db, user_id, city='Kuala Lumpur')   # None = read Firestore yourself
+    snapshot = get_snapshot(db, user_id, load=False)            # Only if already cached
+    scores, missing = snapshot.resolve(destination_ids)
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import firestore_metrics
+
+logger = logging.getLogger(__name__)
+
+ML_SCORE_CACHE_ENABLED = os.environ.get('ML_SCORE_CACHE', '1') != '0'
+MAX_CACHE_BYTES = int(os.environ.get('ML_SCORE_CACHE_MAX_MB', '16')) * 1024 * 1024
+REFRESH_SECONDS = float(os.environ.get('ML_MODEL_REFRESH_HOURS', '24')) * 3600
+REFRESH_OFFSET_SECONDS = float(os.environ.get('ML_MODEL_REFRESH_OFFSET_HOURS', '0')) * 3600
+SNAPSHOT_MAX_DOCS = 5000     # Predictions loaded per snapshot (more = incomplete snapshot)
+ENTRY_BYTES = 120            # Rough memory of one {destination_id: score} entry, plus the key length
+DEFAULT_ML_SCORE = 0.5
+
+
+class ScoreSnapshot:
+    """One user's scores (all cities, or one city) at load time"""
+
+    def __init__(self, user_id: str, city: Optional[str], scores: Dict[str, float], complete: bool):
+        self.user_id = user_id
+        self.city = city
+        self.scores = scores
+        self.complete = complete
+        self.loaded_at = time.time()
+        self.expires_at = next_model_refresh(self.loaded_at)
+        self.bytes = sum(len(k) + ENTRY_BYTES for k in scores) + 200
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def resolve(self, destination_ids: Iterable[str]) -> Tuple[Dict[str, float], List[str]]:
+        """
+        ({destination_id: score} answered from memory, [ids still unknown]).
+        Ids it doesn't hold are always unknown, complete or not.
+        """
+        found, missing = {}, []
+        for dest_id in destination_ids:
+            score = self.scores.get(dest_id)
+            if score is not None:
+                found[dest_id] = score
+            else:
+                missing.append(dest_id)
+        return found, missing
+
+
+class MLScoreCache:
+    """LRU of ScoreSnapshot, keyed by (user_id, city or None), bounded by bytes"""
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._snapshots: 'OrderedDict[Tuple[str, Optional[str]], ScoreSnapshot]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'loads': 0, 'load_failures': 0, 'evictions': 0, 'expired': 0}
+
+    def get(self, db, user_id: str, city: str = None, load: bool = True) -> Optional[ScoreSnapshot]:
+        with self._lock:
+            # A complete all-cities snapshot also answers any single city
+            for key in ((user_id, city), (user_id, None)):
+                snapshot = self._snapshots.get(key)
+                if snapshot is None:
+                    continue
+                if not snapshot.is_fresh():
+                    self._drop(key)
+                    self._stats['expired'] += 1
+                    continue
+                if key[1] is None and city is not None and not snapshot.complete:
+                    continue
+                self._snapshots.move_to_end(key)
+                self._stats['hits'] += 1
+                return snapshot
+            self._stats['misses'] += 1
+
+        if not load:
+            return None
+        snapshot = _load_snapshot(db, user_id, city)
+
+        with self._lock:
+            if snapshot is None:
+                self._stats['load_failures'] += 1
+                return None
+            self._stats['loads'] += 1
+            key = (user_id, city)
+            if key in self._snapshots:
+                self._drop(key)
+            self._snapshots[key] = snapshot
+            self._bytes += snapshot.bytes
+            while self._bytes > self.max_bytes and len(self._snapshots) > 1:
+                self._drop(next(iter(self._snapshots)))
+                self._stats['evictions'] += 1
+        return snapshot
+
+    def invalidate(self, user_id: str = None):
+        with self._lock:
+            for key in [k for k in self._snapshots if user_id is None or k[0] == user_id]:
+                self._drop(key)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_ratio': round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                'snapshots': len(self._snapshots),
+                'scores': sum(len(s.scores) for s in self._snapshots.values()),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _drop(self, key):
+        snapshot = self._snapshots.pop(key)
+        self._bytes -= snapshot.bytes
+
+
+_cache = MLScoreCache()
+
+
+def get_snapshot(db, user_id: str, city: str = None, load: bool = True) -> Optional[ScoreSnapshot]:
+    """
+    The user's score snapshot (loaded from Firestore on first touch).
+    None when the cache is disabled or loading failed.
+
+    load=False only returns a snapshot that is already cached: single
+    lookups use it, so one score never costs a whole snapshot load.
+    """
+    if not ML_SCORE_CACHE_ENABLED or not user_id:
+        return None
+    return _cache.get(db, user_id, city, load)
+
+
+def invalidate(user_id: str = None):
+    """Forget one user's snapshots (or all), e.g. right after new scores are written"""
+    _cache.invalidate(user_id)
+
+
+def get_cache_stats() -> Dict:
+    """Hit ratio, snapshots, scores and bytes"""
+    return _cache.stats()
+
+
+def score_of(data: Dict) -> float:
+    """mlScore of a prediction as a float (DEFAULT_ML_SCORE when missing or null)"""
+    score = data.get('mlScore')
+    return DEFAULT_ML_SCORE if score is None else float(score)
+
+
+def next_model_refresh(now: float) -> float:
+    """Time the offline model next publishes scores (snapshots expire then)"""
+    periods = (now - REFRESH_OFFSET_SECONDS) // REFRESH_SECONDS + 1
+    return periods * REFRESH_SECONDS + REFRESH_OFFSET_SECONDS
+
+
+def _load_snapshot(db, user_id: str, city: Optional[str]) -> Optional[ScoreSnapshot]:
+    """One query: the user's predictions (destinationID + mlScore only)"""
+    start = time.perf_counter()
+    try:
+        query = db.collection('mlPredictions').where('userID', '==', user_id)
+        if city:
+            query = query.where('city', '==', city)
+        docs = query.select(['destinationID', 'mlScore']).limit(SNAPSHOT_MAX_DOCS + 1).stream()
+
+        prefix = f"{user_id}_"
+        scores = {}
+        streamed = 0
+        for doc in docs:
+            streamed += 1
+            data = doc.to_dict() or {}
+            dest_id = doc.id[len(prefix):] if doc.id.startswith(prefix) else data.get('destinationID')
+            if dest_id:
+                scores[dest_id] = score_of(data)
+    except firestore_metrics.ReadBudgetExceeded:
+        raise
+    except Exception as e:
+        logger.warning(f"ML score snapshot failed for user {user_id[:20]}: {e}")
+        return None
+
+    complete = streamed <= SNAPSHOT_MAX_DOCS   # Documents, not scores: some may have no ID
+    logger.info(f"   🧠 ML score snapshot: {len(scores)} scores for user {user_id[:20]}"
+                f"{' in ' + city if city else ''} in {(time.perf_counter() - start) * 1000:.0f}ms"
+                f"{'' if complete else ' (incomplete)'}")
+    return ScoreSnapshot(user_id, city, scores, complete)
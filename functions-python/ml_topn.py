@@ -0,0 +1,243 @@
+"""
+ML Top-N - One precomputed "best destinations" document per (user, city)
+
+SIMPLE EXPLANATION:
+- Ranking at request time means reading many mlPredictions documents
+- The offline scoring job now ALSO writes, for every user and city, one
+  small document in 'mlTopRecommendations' with that user's best TOP_N
+  destinations in the city, as parallel arrays:
+      ids:        ['dest1', 'dest2', ...]     (best first)
+      scores:     [0.93, 0.91, ...]
+      names:      ['Petronas Towers', ...]
+      categories: ['attraction', ...]
+- Requests read that ONE document first (1 read instead of dozens), and
+  only look up destinations that aren't in it
+- complete=True means every prediction of the city fit in the document
+  (recommendation pages can be served from it alone); destinations missing
+  from it are still confirmed with one batched lookup, since predictions
+  written after the document was built aren't in it
+- Cities are grouped case-insensitively (search_key), the same key the
+  document ID is made from
+- The document is kept under MAX_DOC_BYTES (Firestore's limit is 1 MiB)
+  by dropping the lowest scores
+- Versioning:
+    schemaVersion → layout of the document (readers skip other layouts)
+    modelVersion  → scoring run that produced it; with env ML_MODEL_VERSION
+                    set, documents from other runs are ignored (stale)
+
+OFFLINE JOB:
+    write_top_n(db, user_id, city, predictions, model_version)   # one (user, city)
+    rebuild_user(db, user_id, model_version)                     # from the user's mlPredictions
+
+REQUEST SIDE:
+    top = get_top_n(db, user_id, city)    # TopN, or None → look up per pair
+"""
+
+import os
+import re
+import heapq
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from firebase_admin import firestore
+
+import firestore_metrics
+from ml_score_cache import score_of
+
+logger = logging.getLogger(__name__)
+
+TOPN_COLLECTION = 'mlTopRecommendations'
+TOPN_SCHEMA_VERSION = 1
+TOP_N = 200                              # Destinations kept per (user, city)
+MAX_DOC_BYTES = 900 * 1024               # Stay well under Firestore's 1 MiB document limit
+CURRENT_MODEL_VERSION = os.environ.get('ML_MODEL_VERSION') or None
+FIRESTORE_BATCH_LIMIT = 500
+
+_UNSAFE_ID = re.compile(r'[^a-z0-9_-]+')
+
+
+class TopN:
+    """A user's best destinations in one city (parallel arrays, best first)"""
+
+    def __init__(self, data: Dict):
+        self.user_id = data.get('userID')
+        self.city = data.get('city')
+        self.country = data.get('country')
+        self.ids: List[str] = data.get('ids') or []
+        self.scores: List[float] = data.get('scores') or []
+        self.names: List[str] = data.get('names') or []
+        self.categories: List[str] = data.get('categories') or []
+        self.complete = bool(data.get('complete'))
+        self.model_version = data.get('modelVersion')
+        self._score_of = dict(zip(self.ids, self.scores))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def resolve(self, destination_ids) -> Tuple[Dict[str, float], List[str]]:
+        """
+        ({destination_id: score} answered by this document, [ids to look up]).
+        Ids it doesn't hold are always returned to look up, complete or not.
+        """
+        found, missing = {}, []
+        for dest_id in destination_ids:
+            score = self._score_of.get(dest_id)
+            if score is not None:
+                found[dest_id] = score
+            else:
+                missing.append(dest_id)
+        return found, missing
+
+    def recommendations(self) -> List[Dict]:
+        """Entries in the get_ml_recommendations() format, best first"""
+        return [
+            {
+                'destinationID': dest_id,
+                'destinationName': self.names[i] if i < len(self.names) else None,
+                'category': self.categories[i] if i < len(self.categories) else None,
+                'city': self.city,
+                'country': self.country,
+                'mlScore': self.scores[i],
+            }
+            for i, dest_id in enumerate(self.ids)
+        ]
+
+
+def search_key(value: Optional[str]) -> str:
+    """Case-insensitive form of a city / country / category ('Kuala Lumpur ' → 'kuala lumpur')"""
+    return (value or '').strip().lower()
+
+
+def topn_doc_id(user_id: str, city: str) -> str:
+    """Deterministic document ID for (user, city): readable city slug + short hash of the normalized name"""
+    city = search_key(city)
+    slug = _UNSAFE_ID.sub('_', city).strip('_')
+    return f"{user_id}__{slug}_{hashlib.sha1(city.encode('utf-8')).hexdigest()[:8]}"
+
+
+# ============================================================
+# REQUEST SIDE
+# ============================================================
+
+def get_top_n(db, user_id: str, city: str) -> Optional[TopN]:
+    """The (user, city) top-N document - one read. None if absent, stale or unreadable."""
+    if not user_id or not city:
+        return None
+    try:
+        doc = db.collection(TOPN_COLLECTION).document(topn_doc_id(user_id, city)).get()
+    except firestore_metrics.ReadBudgetExceeded:
+        raise
+    except Exception as e:
+        logger.warning(f"Top-N read failed for user {user_id[:20]} in {city}: {e}")
+        return None
+
+    if not doc.exists:
+        return None
+    data = doc.to_dict() or {}
+    if data.get('schemaVersion') != TOPN_SCHEMA_VERSION:
+        return None
+    if CURRENT_MODEL_VERSION and data.get('modelVersion') != CURRENT_MODEL_VERSION:
+        logger.debug(f"Top-N for {user_id[:20]} in {city} is from model {data.get('modelVersion')}, skipping")
+        return None
+    return TopN(data)
+
+
+# ============================================================
+# OFFLINE JOB SIDE
+# ============================================================
+
+def build_top_n_doc(user_id: str, city: str, predictions: List[Dict], model_version: str,
+                    top_n: int = TOP_N) -> Dict:
+    """
+    The document for one (user, city) from its predictions
+    ({destinationID, destinationName, category, country, mlScore} dicts)
+
+    Order matches the indexed mlPredictions query: mlScore desc, then
+    document ID desc - so cursors work across both.
+    """
+    def key(p):
+        return score_of(p), f"{user_id}_{p.get('destinationID')}"
+
+    ranked = heapq.nlargest(top_n, (p for p in predictions if p.get('destinationID')), key=key)
+    country = next((p.get('country') for p in ranked if p.get('country')), None)
+
+    doc = {
+        'schemaVersion': TOPN_SCHEMA_VERSION,
+        'modelVersion': model_version,
+        'userID': user_id,
+        'city': city,
+        'country': country,
+        'ids': [], 'scores': [], 'names': [], 'categories': [],
+        'count': 0, 'complete': False,
+        'generatedAt': firestore.SERVER_TIMESTAMP,
+    }
+
+    # Everything but the entries, then add entries while under MAX_DOC_BYTES
+    size = _doc_name_size(topn_doc_id(user_id, city)) + 32
+    size += sum(_string_size(field) + 8 for field in doc)   # Field names + numbers/flags/timestamp (upper bound)
+    size += sum(_string_size(v) for v in (user_id, city, country, model_version) if v)
+
+    for p in ranked:
+        entry = (_string_size(p['destinationID']) + 8
+                 + _string_size(p.get('destinationName') or '') + _string_size(p.get('category') or ''))
+        if size + entry > MAX_DOC_BYTES:
+            break
+        size += entry
+        doc['ids'].append(p['destinationID'])
+        doc['scores'].append(score_of(p))
+        doc['names'].append(p.get('destinationName') or '')
+        doc['categories'].append(p.get('category') or '')
+
+    doc['count'] = len(doc['ids'])
+    doc['complete'] = doc['count'] == sum(1 for p in predictions if p.get('destinationID'))
+    return doc
+
+
+def write_top_n(db, user_id: str, city: str, predictions: List[Dict], model_version: str,
+                top_n: int = TOP_N) -> Dict:
+    """Build and write one (user, city) document. Returns it."""
+    doc = build_top_n_doc(user_id, city, predictions, model_version, top_n)
+    db.collection(TOPN_COLLECTION).document(topn_doc_id(user_id, city)).set(doc)
+    return doc
+
+
+def rebuild_user(db, user_id: str, model_version: str, top_n: int = TOP_N) -> int:
+    """
+    Regenerate every city document of a user from their mlPredictions
+    (run after the scoring job has written new scores). Returns documents written.
+
+    'Kuala Lumpur' and 'kuala lumpur ' share one document (topn_doc_id
+    normalizes the city), so predictions are grouped by search_key(city);
+    the first spelling seen is the one stored.
+    """
+    by_city: Dict[str, Tuple[str, List[Dict]]] = {}
+    for doc in (db.collection('mlPredictions')
+                .where('userID', '==', user_id)
+                .select(['destinationID', 'destinationName', 'category', 'city', 'country', 'mlScore'])
+                .stream()):
+        data = doc.to_dict() or {}
+        if search_key(data.get('city')):
+            by_city.setdefault(search_key(data['city']), (data['city'], []))[1].append(data)
+
+    docs = [(topn_doc_id(user_id, city), build_top_n_doc(user_id, city, predictions, model_version, top_n))
+            for city, predictions in by_city.values()]
+
+    for i in range(0, len(docs), FIRESTORE_BATCH_LIMIT):
+        batch = db.batch()
+        for doc_id, doc in docs[i:i + FIRESTORE_BATCH_LIMIT]:
+            batch.set(db.collection(TOPN_COLLECTION).document(doc_id), doc)
+        batch.commit()
+
+    logger.info(f"🏆 Top-N rebuilt for user {user_id[:20]}: {len(docs)} cities (model {model_version})")
+    return len(docs)
+
+
+def _doc_name_size(doc_id: str) -> int:
+    """Firestore storage size of a document name (collection path segments + 16)"""
+    return _string_size(TOPN_COLLECTION) + _string_size(doc_id) + 16
+
+
+def _string_size(value: str) -> int:
+    """Firestore storage size of a string (UTF-8 bytes + 1)"""
+    return len(value.encode('utf-8')) + 1
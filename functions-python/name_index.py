@@ -0,0 +1,337 @@
+"""
+Name Index - "Is this OSM place already in destinationData?" per city
+
+SIMPLE EXPLANATION:
+- The old name fallback lowercased every stored name and checked
+  `name in doc_name or doc_name in name` for every candidate:
+    * slow: candidates x documents comparisons
+    * wrong: "Park" matched "Central Park Mall"
+- This module builds ONE index per city from its destinationData docs:
+    * normalized names (accents removed, punctuation dropped, lowercase)
+    * `name_local` transliterated to Latin letters (needs the optional
+      `unidecode` package for non-Latin scripts, accents work without it)
+    * token postings   → word → names containing it
+    * trigram postings → 3-letter piece → names containing it
+    * a coordinate grid → places near a point
+- A candidate matches when:
+    1. its normalized name (or name_local) equals a stored one, and the
+       two places are within SAME_NAME_MAX_M (same name far away = a
+       different place), or
+    2. the names are similar enough (trigram Dice >= FUZZY_THRESHOLD),
+       their numbers agree ("Block 15" is not "Block 150") and the places
+       are within FUZZY_MAX_M
+- Indexes are kept per process for INDEX_TTL seconds (up to MAX_CITIES
+  cities), so warm function instances skip the Firestore read entirely
+
+USAGE:
+    index = get_city_index(db, 'Kuala Lumpur')
+    matches = index.match_many(destinations)   # {osm_id: doc_id}
+"""
+
+import re
+import time
+import threading
+import logging
+import unicodedata
+from collections import OrderedDict
+from math import ceil, cos, radians
+from typing import Dict, List, Optional, Tuple
+
+import destination_cache
+from geo import haversine
+
+try:
+    from unidecode import unidecode
+except ImportError:  # Optional: without it only Latin scripts are transliterated
+    unidecode = None
+
+logger = logging.getLogger(__name__)
+
+CITY_INDEX_LIMIT = 5000   # Max destinationData docs loaded per city
+INDEX_TTL = 600           # Seconds a city index is reused before a rebuild
+MAX_CITIES = 50           # City indexes kept per process (least recently used dropped)
+FUZZY_THRESHOLD = 0.75    # Min trigram Dice similarity for a fuzzy match
+SAME_NAME_MAX_M = 2000    # Same normalized name further apart = different place
+FUZZY_MAX_M = 300         # Fuzzy name matches must be this close
+NO_COORDS_THRESHOLD = 0.9 # Stricter similarity when one side has no coordinates
+MAX_TOKEN_POSTING = 50    # Tokens in more names than this ("park", "taman") don't select candidates
+MAX_TRIGRAM_POSTING = 200 # Same for trigrams
+GRID_DEG = 0.005          # Proximity grid cell (~550m north-south, less east-west away from the equator)
+METERS_PER_DEG = 111320   # Meters per degree of latitude (and of longitude at the equator)
+MIN_COS_LAT = 0.01        # Caps the east-west scan near the poles
+
+_NON_WORD = re.compile(r'[^\w]+', re.UNICODE)
+_DIGITS = re.compile(r'\d+')
+
+
+def normalize(text: str) -> str:
+    """'Petronas Twin Towers (KLCC)' → 'petronas twin towers klcc'"""
+    if not text:
+        return ''
+    text = transliterate(text).lower()
+    return ' '.join(_NON_WORD.sub(' ', text).replace('_', ' ').split())
+
+
+def transliterate(text: str) -> str:
+    """Latin letters for `text`: 'Café' → 'Cafe', '北京' → 'Bei Jing' (with unidecode)"""
+    if text.isascii():
+        return text
+    if unidecode is not None:
+        return unidecode(text)
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def trigrams(key: str) -> frozenset:
+    padded = f"  {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class CityNameIndex:
+    """Normalized names of one city's destinationData docs, with postings"""
+
+    def __init__(self):
+        # One "entry" per name variant (name, name_local) of a document
+        self.entry_doc: List[int] = []
+        self.entry_trigrams: List[frozenset] = []
+        self.entry_digits: List[frozenset] = []
+        self.doc_ids: List[str] = []
+        self.doc_coords: List[Optional[Tuple[float, float]]] = []
+        self.exact: Dict[str, List[int]] = {}
+        self.tokens: Dict[str, List[int]] = {}
+        self.trigram_postings: Dict[str, List[int]] = {}
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        self.no_coords_entries = 0
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def add(self, doc_id: str, data: Dict):
+        """Index one destinationData document"""
+        doc = len(self.doc_ids)
+        coords = _doc_coords(data)
+        self.doc_ids.append(doc_id)
+        self.doc_coords.append(coords)
+
+        for key in {normalize(data.get('name') or ''), normalize(data.get('name_local') or '')}:
+            if not key:
+                continue
+            entry = len(self.entry_doc)
+            grams = trigrams(key)
+            self.entry_doc.append(doc)
+            self.entry_trigrams.append(grams)
+            self.entry_digits.append(frozenset(_DIGITS.findall(key)))
+            self.exact.setdefault(key, []).append(entry)
+            for token in set(key.split()):
+                self.tokens.setdefault(token, []).append(entry)
+            for gram in grams:
+                self.trigram_postings.setdefault(gram, []).append(entry)
+            if coords:
+                self.grid.setdefault(_cell(coords), []).append(entry)
+            else:
+                self.no_coords_entries += 1
+
+    def match(self, dest: Dict) -> Optional[str]:
+        """Document ID of the stored place `dest` (a parsed OSM destination) is, or None"""
+        coords = _dest_coords(dest)
+        keys = [k for k in dict.fromkeys((normalize(dest.get('name') or ''),
+                                          normalize(dest.get('name_local') or ''))) if k]
+
+        # 1. Same normalized name, not far apart
+        for key in keys:
+            for entry in self.exact.get(key, ()):
+                doc = self.entry_doc[entry]
+                if _within(coords, self.doc_coords[doc], SAME_NAME_MAX_M, default=True):
+                    return self.doc_ids[doc]
+
+        # 2. Similar name, same numbers, close by
+        best_doc, best_score = None, 0.0
+        for key in keys:
+            grams = trigrams(key)
+            digits = frozenset(_DIGITS.findall(key))
+
+            # Dice >= FUZZY_THRESHOLD is impossible outside this length window
+            min_len = len(grams) * FUZZY_THRESHOLD / (2 - FUZZY_THRESHOLD)
+            max_len = len(grams) * (2 - FUZZY_THRESHOLD) / FUZZY_THRESHOLD
+
+            for entry in self._candidates(key, grams, coords):
+                other = self.entry_trigrams[entry]
+                if not min_len <= len(other) <= max_len:
+                    continue
+                score = 2 * len(grams & other) / (len(grams) + len(other))
+                if score < FUZZY_THRESHOLD or score <= best_score or self.entry_digits[entry] != digits:
+                    continue
+
+                doc = self.entry_doc[entry]
+                if coords and self.doc_coords[doc]:
+                    if not _within(coords, self.doc_coords[doc], FUZZY_MAX_M):
+                        continue
+                elif score < NO_COORDS_THRESHOLD:
+                    continue
+                best_doc, best_score = doc, score
+
+        return self.doc_ids[best_doc] if best_doc is not None else None
+
+    def match_many(self, dests: List[Dict]) -> Dict[str, str]:
+        """{osm_id: doc_id} for the destinations that are already stored"""
+        matches = {}
+        for dest in dests:
+            doc_id = self.match(dest)
+            if doc_id:
+                matches[dest.get('osm_id', '')] = doc_id
+        return matches
+
+    def _candidates(self, key: str, grams: frozenset, coords) -> set:
+        """
+        Entries worth scoring: stored places near `coords` (grid), plus -
+        when needed - entries sharing a selective word or trigram
+        """
+        found = set()
+        if coords:
+            row, col = _cell(coords)
+            rows, cols = _grid_reach(coords[0])
+            for d_row in range(-rows, rows + 1):
+                for d_col in range(-cols, cols + 1):
+                    found.update(self.grid.get((row + d_row, col + d_col), ()))
+            if not self.no_coords_entries:
+                return found  # Every stored place has coordinates: far ones can't match
+
+        by_name = set()
+        for token in key.split():
+            posting = self.tokens.get(token, ())
+            if len(posting) <= MAX_TOKEN_POSTING:
+                by_name.update(posting)
+
+        if not by_name:
+            # No shared word (spelling / spacing variants): fall back to trigrams
+            for gram in grams:
+                posting = self.trigram_postings.get(gram, ())
+                if len(posting) <= MAX_TRIGRAM_POSTING:
+                    by_name.update(posting)
+
+        if coords:
+            # Places with coordinates were covered by the grid
+            by_name = {e for e in by_name if self.doc_coords[self.entry_doc[e]] is None}
+        return found | by_name
+
+
+# ============================================================
+# PER-CITY CACHE (reused across warm invocations)
+# ============================================================
+
+_indexes: 'OrderedDict[str, CityNameIndex]' = OrderedDict()
+_indexes_lock = threading.Lock()
+_stats = {'hits': 0, 'builds': 0}
+
+
+def get_city_index(db, city: str) -> CityNameIndex:
+    """The name index for `city`, built from Firestore on first use (or after INDEX_TTL)"""
+    with _indexes_lock:
+        index = _indexes.get(city)
+        if index is not None and time.time() - index.built_at < INDEX_TTL:
+            _indexes.move_to_end(city)
+            _stats['hits'] += 1
+            return index
+
+    index = build_city_index(db, city)
+
+    with _indexes_lock:
+        _indexes[city] = index
+        _indexes.move_to_end(city)
+        while len(_indexes) > MAX_CITIES:
+            _indexes.popitem(last=False)
+        _stats['builds'] += 1
+
+    return index
+
+
+def build_city_index(db, city: str) -> CityNameIndex:
+    """Index the city's destinationData docs (live cache, else names + coordinates from Firestore)"""
+    start = time.perf_counter()
+    index = CityNameIndex()
+
+    city_docs = destination_cache.get_city_docs(db, city)
+    if city_docs is not None:
+        # Already in memory (and kept current by a snapshot listener)
+        for doc_id, data in city_docs.items():
+            index.add(doc_id, data)
+        return index
+
+    for doc in (db.collection('destinationData')
+                .where('city', '==', city)
+                .select(['name', 'name_local', 'latitude', 'longitude'])
+                .limit(CITY_INDEX_LIMIT)
+                .stream()):
+        index.add(doc.id, doc.to_dict())
+
+    logger.info(f"   Name index for {city}: {len(index)} places in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return index
+
+
+def add_document(city: str, doc_id: str, data: Dict):
+    """Add a just-saved document to the city's cached index (if one is cached)"""
+    with _indexes_lock:
+        index = _indexes.get(city)
+        if index is not None:
+            index.add(doc_id, data)
+
+
+def invalidate(city: str = None):
+    """Drop one city's index (or all) so the next lookup rebuilds it"""
+    with _indexes_lock:
+        if city is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(city, None)
+
+
+def get_index_stats() -> Dict:
+    with _indexes_lock:
+        return {
+            'cities': len(_indexes),
+            'places': sum(len(index) for index in _indexes.values()),
+            'hits': _stats['hits'],
+            'builds': _stats['builds'],
+        }
+
+
+def _dest_coords(dest: Dict) -> Optional[Tuple[float, float]]:
+    coords = dest.get('coordinates') or {}
+    if coords.get('lat') is None or coords.get('lng') is None:
+        return None
+    return coords['lat'], coords['lng']
+
+
+def _doc_coords(data: Dict) -> Optional[Tuple[float, float]]:
+    lat = data.get('latitude')
+    lon = data.get('longitude')
+    if lat is None or lon is None:
+        coords = data.get('coordinates') or {}
+        lat, lon = coords.get('lat'), coords.get('lng')
+    if lat is None or lon is None:
+        return None
+    return float(lat), float(lon)
+
+
+def _cell(coords: Tuple[float, float]) -> Tuple[int, int]:
+    return int(coords[0] // GRID_DEG), int(coords[1] // GRID_DEG)
+
+
+def _grid_reach(lat: float) -> Tuple[int, int]:
+    """
+    Neighbour cells to scan (rows, cols) so FUZZY_MAX_M is covered both ways:
+    a degree of longitude shrinks with cos(lat), so away from the equator
+    more columns are needed (2 at 60°)
+    """
+    cell_m = GRID_DEG * METERS_PER_DEG
+    rows = ceil(FUZZY_MAX_M / cell_m)
+    cols = ceil(FUZZY_MAX_M / (cell_m * max(cos(radians(lat)), MIN_COS_LAT)))
+    return rows, cols
+
+
+def _within(a, b, max_m: float, default: bool = False) -> bool:
+    """True if both points are known and within max_m meters (`default` if one is unknown)"""
+    if not a or not b:
+        return default
+    return haversine(a[0], a[1], b[0], b[1]) * 1000 <= max_m
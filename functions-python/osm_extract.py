@@ -0,0 +1,258 @@
+"""
+OSM Extract - Answer "places around a point" from a local OSM extract
+
+SIMPLE EXPLANATION:
+- For load tests and for regions we serve heavily we don't want to depend
+  on the public Overpass mirrors
+- This backend loads a regional OSM extract ONCE per process:
+    * GeoJSON (e.g. `osmium export region.osm.pbf -o region.geojson`)
+    * or PBF directly (needs the optional `osmium` package)
+- Only nodes that match one of our query classes are kept, with their
+  tags trimmed to KEEP_TAGS
+- Points are stored in flat arrays as 3D unit-sphere coordinates and
+  indexed with a KD-tree, so an "around" query takes microseconds to a
+  few milliseconds (see benchmarks/osm_extract_benchmark.py), no network
+- Results have the same shape as Overpass elements
+  ({type, id, lat, lon, tags}), so the existing parsers keep working
+
+SELECTING IT (per deployment):
+    OSM_BACKEND=extract
+    OSM_EXTRACT_PATH=/path/to/malaysia.geojson   (or .osm.pbf)
+Everything else (default) keeps using Overpass through poi_cache.
+"""
+
+import json
+import os
+import threading
+import logging
+from array import array
+from math import radians, cos, sin
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from geo import EARTH_RADIUS_M, haversine
+from osm_queries import QUERY_CLASSES, classify_element
+from osm_stream import KEEP_TAGS
+
+logger = logging.getLogger(__name__)
+
+# Bit per query class for the compact class column
+CLASS_BITS = {query_class: 1 << i for i, query_class in enumerate(QUERY_CLASSES)}
+
+
+class OsmExtractIndex:
+    """
+    KD-tree over unit-sphere (x, y, z) points, stored in flat arrays
+
+    Arrays (one slot per place):
+        ids, lat, lon   → OSM node id and position
+        xyz             → 3 floats per place, unit-sphere coordinates
+        classes         → bitmask of CLASS_BITS
+        tags            → trimmed tag dicts (Python list)
+    The tree itself is implicit: `order` is a permutation of the places,
+    and the median of every range is that range's split node.
+    """
+
+    def __init__(self, nodes: Iterable[Tuple[int, float, float, Dict]]):
+        self.ids = array('q')
+        self.lat = array('d')
+        self.lon = array('d')
+        self.xyz = array('d')
+        self.classes = array('B')
+        self.tags: List[Dict] = []
+
+        for osm_id, lat, lon, tags in nodes:
+            mask = 0
+            for query_class in classify_element(tags):
+                mask |= CLASS_BITS[query_class]
+            if not mask:
+                continue
+
+            self.ids.append(osm_id)
+            self.lat.append(lat)
+            self.lon.append(lon)
+            self.xyz.extend(_to_xyz(lat, lon))
+            self.classes.append(mask)
+            self.tags.append({k: v for k, v in tags.items() if k in KEEP_TAGS})
+
+        self.order = array('l', range(len(self.ids)))
+        self._build()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def around(self, query_class: str, lat: float, lon: float, radius: float) -> List[Dict]:
+        """Overpass-shaped elements of one class within `radius` meters"""
+        mask = CLASS_BITS[query_class]
+        cx, cy, cz = _to_xyz(lat, lon)
+        chord = 2 * sin(min(radius / EARTH_RADIUS_M, 3.14159) / 2)
+        chord_sq = chord * chord
+
+        xyz = self.xyz
+        order = self.order
+        found = []
+        stack = [(0, len(order), 0)]
+
+        while stack:
+            lo, hi, axis = stack.pop()
+            if lo >= hi:
+                continue
+
+            mid = (lo + hi) // 2
+            p = order[mid]
+            px, py, pz = xyz[3 * p], xyz[3 * p + 1], xyz[3 * p + 2]
+
+            if self.classes[p] & mask:
+                if (px - cx) ** 2 + (py - cy) ** 2 + (pz - cz) ** 2 <= chord_sq:
+                    found.append(p)
+
+            diff = (cx, cy, cz)[axis] - (px, py, pz)[axis]
+            next_axis = (axis + 1) % 3
+            if diff <= chord:
+                stack.append((lo, mid, next_axis))
+            if diff >= -chord:
+                stack.append((mid + 1, hi, next_axis))
+
+        return [self._element(p) for p in found]
+
+    def within_bbox(self, query_class: str, bbox: Tuple[float, float, float, float]) -> List[Dict]:
+        """Overpass-shaped elements of one class inside (south, west, north, east)"""
+        south, west, north, east = bbox
+        center_lat = (south + north) / 2
+        center_lon = (west + east) / 2
+        # Circle through the box corners, then trim to the box
+        radius = max(
+            haversine(center_lat, center_lon, lat, lon) * 1000
+            for lat in (south, north) for lon in (west, east)
+        )
+        return [
+            el for el in self.around(query_class, center_lat, center_lon, radius)
+            if south <= el['lat'] <= north and west <= el['lon'] <= east
+        ]
+
+    def _element(self, p: int) -> Dict:
+        return {
+            'type': 'node',
+            'id': self.ids[p],
+            'lat': self.lat[p],
+            'lon': self.lon[p],
+            'tags': self.tags[p],
+        }
+
+    def _build(self):
+        """Arrange `order` into an implicit balanced KD-tree (median splits)"""
+        xyz = self.xyz
+        stack = [(0, len(self.order), 0)]
+
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= 1:
+                continue
+
+            segment = sorted(self.order[lo:hi], key=lambda p: xyz[3 * p + axis])
+            self.order[lo:hi] = array('l', segment)
+
+            mid = (lo + hi) // 2
+            next_axis = (axis + 1) % 3
+            stack.append((lo, mid, next_axis))
+            stack.append((mid + 1, hi, next_axis))
+
+
+# ============================================================
+# LOADERS
+# ============================================================
+
+def load_extract(path: str) -> OsmExtractIndex:
+    """Build an index from a .geojson/.json or .pbf extract"""
+    logger.info(f"📂 Loading OSM extract {path}...")
+
+    if path.endswith('.pbf'):
+        index = OsmExtractIndex(_read_pbf(path))
+    else:
+        index = OsmExtractIndex(_read_geojson(path))
+
+    logger.info(f"   OSM extract ready: {len(index)} places")
+    return index
+
+
+def _read_geojson(path: str) -> Iterable[Tuple[int, float, float, Dict]]:
+    """Point features of a GeoJSON FeatureCollection as (id, lat, lon, tags)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    for feature in data.get('features', []):
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') != 'Point':
+            continue  # Our Overpass queries only ask for nodes
+
+        lon, lat = geometry['coordinates'][:2]
+        props = feature.get('properties') or {}
+        raw_id = feature.get('id') or props.get('@id') or props.get('id') or 0
+
+        try:
+            osm_id = int(str(raw_id).split('/')[-1])  # "node/123" → 123
+        except ValueError:
+            continue
+
+        tags = props.get('tags') if isinstance(props.get('tags'), dict) else props
+        tags = {k: v for k, v in tags.items() if not k.startswith('@') and isinstance(v, str)}
+        yield osm_id, lat, lon, tags
+
+
+def _read_pbf(path: str) -> List[Tuple[int, float, float, Dict]]:
+    """Tagged nodes of a PBF file (needs `pip install osmium`)"""
+    try:
+        import osmium
+    except ImportError:
+        raise RuntimeError("Reading .pbf extracts needs the 'osmium' package (or convert to GeoJSON)")
+
+    nodes = []
+
+    class _NodeHandler(osmium.SimpleHandler):
+        def node(self, n):
+            if not n.tags or 'name' not in n.tags:
+                return
+            tags = {t.k: t.v for t in n.tags}
+            if classify_element(tags):
+                nodes.append((n.id, n.location.lat, n.location.lon, tags))
+
+    _NodeHandler().apply_file(path)
+    return nodes
+
+
+# ============================================================
+# PROCESS-WIDE BACKEND
+# ============================================================
+
+_index: Optional[OsmExtractIndex] = None
+_index_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    """True when this deployment answers OSM queries from a local extract"""
+    return os.environ.get('OSM_BACKEND', 'overpass').lower() == 'extract'
+
+
+def get_index() -> OsmExtractIndex:
+    """The loaded extract (loaded on first use, once per process)"""
+    global _index
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = os.environ.get('OSM_EXTRACT_PATH')
+                if not path:
+                    raise RuntimeError("OSM_BACKEND=extract needs OSM_EXTRACT_PATH")
+                _index = load_extract(path)
+
+    return _index
+
+
+def set_index(index: Optional[OsmExtractIndex]):
+    """Use an already-built index (tests, load-test harnesses)"""
+    global _index
+    _index = index
+
+
+def _to_xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    lat_r, lon_r = radians(lat), radians(lon)
+    return (cos(lat_r) * cos(lon_r), cos(lat_r) * sin(lon_r), sin(lat_r))
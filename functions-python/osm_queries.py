@@ -0,0 +1,118 @@
+"""
+OSM Queries - What we ask OpenStreetMap for, in one place
+
+SIMPLE EXPLANATION:
+- Every OSM lookup belongs to a "query class":
+    'attractions' → museums, parks, temples, viewpoints... (destination_service)
+    'eating'      → restaurants, cafes, fast food, bakeries (restaurant_service)
+    'lodging'     → hotels, hostels, guest houses (accommodation_service)
+- Each class has a list of Overpass selectors
+- The same selectors can be asked "around a point" or "inside a box",
+  which is what the tile cache (poi_cache.py) needs
+- Several classes can be asked in ONE union query (trip_area.py); the
+  answer is split back per class with classify_element()
+
+EXAMPLE:
+    build_query('lodging', around_filter(5000, 3.14, 101.69), limit=30)
+    →  [out:json][timeout:12];
+       (
+         node["tourism"~"hotel|hostel|guest_house"]["name"](around:5000,3.14,101.69);
+       );
+       out 30;
+"""
+
+from typing import Dict, List, Tuple
+from overpass_client import QUERY_TIMEOUT
+
+# Tourism types that are NOT attractions (hotels etc.)
+EXCLUDE_TYPES = ['hotel', 'hostel', 'guest_house', 'motel', 'apartment', 'camp_site']
+
+_EXCLUDE = ''.join([f'["tourism"!="{t}"]' for t in EXCLUDE_TYPES])
+
+QUERY_CLASSES: Dict[str, List[str]] = {
+    'attractions': [
+        f'node["tourism"]["name"]{_EXCLUDE}',
+        'node["leisure"~"park|garden"]["name"]',
+        'node["amenity"="place_of_worship"]["name"]',
+        'node["historic"]["name"]',
+        'node["natural"~"peak|beach|cave_entrance"]["name"]',
+    ],
+    'eating': [
+        'node["amenity"~"restaurant|cafe|fast_food|bakery"]["name"]',
+    ],
+    'lodging': [
+        'node["tourism"~"hotel|hostel|guest_house"]["name"]',
+    ],
+}
+
+
+def around_filter(radius: int, lat: float, lon: float) -> str:
+    """Overpass spatial filter: within `radius` meters of a point"""
+    return f'(around:{radius},{lat},{lon})'
+
+
+def bbox_filter(bbox: Tuple[float, float, float, float]) -> str:
+    """Overpass spatial filter: inside (south, west, north, east)"""
+    south, west, north, east = bbox
+    return f'({south},{west},{north},{east})'
+
+
+def build_query(query_class: str, spatial: str, limit: int = None) -> str:
+    """
+    Build the Overpass QL for one query class
+
+    Args:
+        query_class: Key of QUERY_CLASSES
+        spatial: around_filter(...) or bbox_filter(...)
+        limit: Max elements (None = no limit)
+    """
+    return build_union_query([query_class], spatial, limit)
+
+
+def build_union_query(query_classes: List[str], spatial: str, limit: int = None) -> str:
+    """Build ONE Overpass query covering the selectors of several classes"""
+    selectors = '\n'.join(
+        f'  {sel}{spatial};'
+        for query_class in query_classes
+        for sel in QUERY_CLASSES[query_class]
+    )
+    out = f'out {limit};' if limit else 'out;'
+
+    return f'''
+[out:json][timeout:{QUERY_TIMEOUT}];
+(
+{selectors}
+);
+{out}
+'''
+
+
+def classify_element(tags: Dict) -> List[str]:
+    """
+    Which query classes an element belongs to (mirrors QUERY_CLASSES)
+
+    Overpass "~" is an unanchored regex, so values are matched as substrings.
+    """
+    if not tags.get('name'):
+        return []
+
+    classes = []
+    tourism = tags.get('tourism', '')
+    amenity = tags.get('amenity', '')
+
+    if (
+        (tourism and tourism not in EXCLUDE_TYPES)
+        or any(x in tags.get('leisure', '') for x in ('park', 'garden'))
+        or amenity == 'place_of_worship'
+        or tags.get('historic')
+        or any(x in tags.get('natural', '') for x in ('peak', 'beach', 'cave_entrance'))
+    ):
+        classes.append('attractions')
+
+    if any(x in amenity for x in ('restaurant', 'cafe', 'fast_food', 'bakery')):
+        classes.append('eating')
+
+    if any(x in tourism for x in ('hotel', 'hostel', 'guest_house')):
+        classes.append('lodging')
+
+    return classes
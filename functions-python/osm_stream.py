@@ -0,0 +1,102 @@
+"""
+OSM Stream - Decode Overpass JSON one element at a time
+
+SIMPLE EXPLANATION:
+- response.json() loads the WHOLE answer into memory before we look at it;
+  a 15km query in a dense city is the biggest allocation of the request
+- Here the 'elements' array is read straight from the socket, one element
+  at a time (needs the optional `ijson` package)
+- Each element is filtered on the fly (name / duplicate / hotel checks from
+  the calling service) and only the tags in KEEP_TAGS are kept
+- Once enough elements were collected we stop reading
+
+Without ijson installed the same filters run on response.json() instead,
+so behaviour is identical - only peak memory differs.
+"""
+
+import json
+import logging
+from typing import Callable, Dict, Iterable, IO, List
+
+try:
+    import ijson
+except ImportError:  # Optional dependency - fall back to json.load
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+STREAMING_AVAILABLE = ijson is not None
+
+# OSM tags our parsers actually read - everything else is dropped while
+# decoding so cached elements and returned records stay small
+KEEP_TAGS = frozenset([
+    'name', 'name:en', 'int_name',
+    'tourism', 'leisure', 'amenity', 'historic', 'natural', 'shop',
+    'description', 'opening_hours', 'website', 'phone',
+    'cuisine', 'cost', 'price', 'price_level', 'price_range',
+    'stars',
+])
+
+
+def iter_elements(fp: IO[bytes]) -> Iterable[Dict]:
+    """Yield the items of the top-level 'elements' array of an Overpass answer"""
+    if ijson is not None:
+        return ijson.items(fp, 'elements.item', use_float=True)
+    return iter(json.load(fp).get('elements', []))
+
+
+def collect_elements(
+    elements: Iterable[Dict],
+    element_filter: Callable[[Dict], bool] = None,
+    dedup_key: Callable[[Dict], str] = None,
+    max_elements: int = None,
+    tag_keys: frozenset = KEEP_TAGS
+) -> List[Dict]:
+    """
+    Filter, deduplicate and trim elements as they arrive
+
+    Args:
+        elements: Any iterable of raw elements (a stream or a list)
+        element_filter: Keep only elements where this returns True
+        dedup_key: Skip elements whose key was already seen (e.g. the name)
+        max_elements: Stop once this many elements were kept
+        tag_keys: Tags to keep on each element (None = keep all)
+
+    Returns:
+        Compact elements: id, lat, lon and the kept tags
+    """
+    kept = []
+    seen = set()
+
+    for el in elements:
+        el = project_element(el, tag_keys)
+
+        if element_filter and not element_filter(el):
+            continue
+
+        if dedup_key:
+            key = dedup_key(el)
+            if key in seen:
+                continue
+            seen.add(key)
+
+        kept.append(el)
+        if max_elements and len(kept) >= max_elements:
+            break
+
+    return kept
+
+
+def project_element(el: Dict, tag_keys: frozenset = KEEP_TAGS) -> Dict:
+    """Copy of an element with only the useful fields and tags"""
+    tags = el.get('tags') or {}
+    if tag_keys is not None:
+        tags = {k: v for k, v in tags.items() if k in tag_keys}
+
+    return {
+        'type': el.get('type', 'node'),
+        'id': el.get('id'),
+        'lat': el.get('lat'),
+        'lon': el.get('lon'),
+        'tags': tags,
+    }
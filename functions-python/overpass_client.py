@@ -0,0 +1,308 @@
+"""
+Overpass Client - One shared connection to the OpenStreetMap Overpass API
+
+SIMPLE EXPLANATION:
+- destination_service, restaurant_service and accommodation_service all
+  ask Overpass for places near a point
+- Opening a new HTTPS connection costs a TCP + TLS handshake every time
+- This module keeps ONE pooled session per Overpass server alive, so later
+  queries on a warm function instance reuse the open connection
+- All timeouts and pool sizes live here, in one place
+
+HEDGED MODE (hedge=True):
+- Sequential failover waits up to REQUEST_TIMEOUT on a slow mirror before
+  trying the next one - with 4 mirrors that can pass a minute
+- Hedged mode fires the query at the primary, then launches the next mirror
+  if no answer arrived within HEDGE_DELAY seconds (at most HEDGE_FANOUT in flight)
+- The first valid 200 JSON answer wins, the rest are cancelled
+- HEDGE_DELAY = 0 means "race HEDGE_FANOUT mirrors at once"
+
+MIRROR HEALTH (overpass_health.py):
+- Every answer updates the mirror's latency / error rate
+- Mirrors are tried best-first instead of in the fixed list order
+- A mirror that keeps failing is skipped for a while (circuit breaker)
+- get_server_health() returns the numbers for dashboards
+
+STREAMING (osm_stream.py):
+- Answers are decoded element by element straight from the socket when
+  `ijson` is installed, with the caller's filters applied on the fly
+- max_elements stops reading as soon as enough candidates were collected
+
+USAGE:
+    from overpass_client import run_query
+    elements = run_query(query)               # list of OSM elements, or None if every server failed
+    elements = run_query(query, hedge=True)   # same, but hedged across mirrors
+"""
+
+import requests
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, List, Dict, Optional
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from overpass_health import HealthTracker
+from osm_stream import STREAMING_AVAILABLE, iter_elements, collect_elements
+
+logger = logging.getLogger(__name__)
+
+# Multiple Overpass API servers - if one is slow/down, try next
+OVERPASS_SERVERS = [
+    "https://overpass-api.de/api/interpreter",
+    "https://overpass.kumi.systems/api/interpreter",
+    "https://maps.mail.ru/osm/tools/overpass/api/interpreter",
+    "https://overpass.openstreetmap.ru/api/interpreter",
+]
+
+CONNECT_TIMEOUT = 5   # Max wait to open a connection (handshake)
+REQUEST_TIMEOUT = 15  # Max wait time for server response
+QUERY_TIMEOUT = 12    # Max time server should spend processing query
+
+# Connection pool sizing (per server)
+# POOL_CONNECTIONS = how many host pools the adapter keeps
+# POOL_MAXSIZE = how many open keep-alive sockets per host
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+# Status codes that mean "server busy, try the next one"
+RETRYABLE_STATUS = [429, 502, 503, 504]
+
+# Hedged requests
+HEDGE_DELAY = 2.0       # Seconds to wait on a mirror before also asking the next one
+HEDGE_FANOUT = 2        # Max mirrors in flight at once for one query
+HEDGE_MAX_WORKERS = 16  # Threads shared by all hedged queries in this process
+
+HEADERS = {
+    'Content-Type': 'application/x-www-form-urlencoded',
+    'User-Agent': 'wandry-trip-planner/1.0',
+}
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix='overpass-hedge')
+_health = HealthTracker()
+
+
+def get_session(server: str) -> requests.Session:
+    """
+    Get the pooled session for one Overpass server
+
+    Sessions are created lazily and kept for the life of the process,
+    so every query after the first one skips the TCP + TLS handshake.
+    """
+    session = _sessions.get(server)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(server)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=0,  # Failover is handled here, not by urllib3
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update(HEADERS)
+            _sessions[server] = session
+    return session
+
+
+def configure_pool(pool_connections: int = None, pool_maxsize: int = None):
+    """
+    Change pool sizes and drop existing sessions so new ones pick them up
+
+    Mostly useful for benchmarks and for tuning on high-concurrency instances.
+    """
+    global POOL_CONNECTIONS, POOL_MAXSIZE
+
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+    close_sessions()
+
+
+def close_sessions():
+    """Close every pooled session (e.g. on shutdown or in tests)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            try:
+                session.close()
+            except Exception:
+                pass
+        _sessions.clear()
+
+
+def run_query(
+    query: str,
+    servers: List[str] = None,
+    hedge: bool = False,
+    element_filter: Callable[[Dict], bool] = None,
+    dedup_key: Callable[[Dict], str] = None,
+    max_elements: int = None
+) -> Optional[List[Dict]]:
+    """
+    Run an Overpass QL query, failing over between servers
+
+    Args:
+        query: Overpass QL text
+        servers: Optional server list (defaults to OVERPASS_SERVERS)
+        hedge: If True, race mirrors (see HEDGED MODE above) instead of
+               waiting for each one to fail before trying the next
+        element_filter, dedup_key, max_elements: Applied while decoding
+               (see osm_stream.collect_elements)
+
+    Returns:
+        List of raw OSM elements from the first server that answered,
+        or None if every server failed
+
+    Servers are tried healthiest first; mirrors with an open circuit
+    breaker are skipped (see overpass_health.py).
+    """
+    servers = _health.ordered(servers or OVERPASS_SERVERS)
+    collect = {'element_filter': element_filter, 'dedup_key': dedup_key, 'max_elements': max_elements}
+
+    if hedge and len(servers) > 1:
+        elements = _run_hedged(query, servers, collect)
+    else:
+        elements = None
+        for server in servers:
+            elements = _post_once(server, query, collect)
+            if elements is not None:
+                break
+
+    if elements is None:
+        logger.warning("   All Overpass servers failed")
+    return elements
+
+
+def _run_hedged(query: str, servers: List[str], collect: Dict) -> Optional[List[Dict]]:
+    """
+    Hedged failover: start the next mirror after HEDGE_DELAY, or at once
+    when an in-flight mirror fails. Returns the first valid answer.
+    """
+    cancel = threading.Event()
+    pending = {}
+    next_idx = 0
+
+    def launch():
+        nonlocal next_idx
+        future = _hedge_executor.submit(_post_once, servers[next_idx], query, collect, cancel)
+        pending[future] = next_idx
+        next_idx += 1
+
+    try:
+        while True:
+            # Nothing in flight (start, or every mirror so far failed) -> next mirror now
+            if not pending:
+                if next_idx >= len(servers):
+                    return None
+                launch()
+                continue
+
+            can_hedge = next_idx < len(servers) and len(pending) < HEDGE_FANOUT
+            done, _ = wait(
+                pending,
+                timeout=HEDGE_DELAY if can_hedge else None,
+                return_when=FIRST_COMPLETED
+            )
+
+            if not done:
+                logger.info(f"   Overpass {_host(servers[next_idx - 1])} slow, hedging to {_host(servers[next_idx])}...")
+                launch()
+                continue
+
+            for future in done:
+                pending.pop(future)
+                elements = future.result()
+                if elements is not None:
+                    return elements
+
+            # A mirror failed outright - replace it now instead of waiting
+            if next_idx < len(servers):
+                launch()
+
+    finally:
+        # Losers: skip those not started yet, abandon the ones in flight
+        cancel.set()
+        for future in pending:
+            future.cancel()
+
+
+def get_server_health() -> Dict[str, Dict]:
+    """
+    Health numbers per mirror (for dashboards / logs)
+
+    Example:
+        {'https://overpass-api.de/api/interpreter': {
+            'state': 'closed', 'ewma_latency_ms': 840.2, 'error_rate': 0.036, ...}}
+    """
+    return _health.stats()
+
+
+def _post_once(server: str, query: str, collect: Dict, cancel: threading.Event = None) -> Optional[List[Dict]]:
+    """
+    Send the query to one server
+
+    `collect` holds the osm_stream.collect_elements options.
+    Returns the element list on a 200 JSON answer, None on any failure.
+    If `cancel` is set by the time headers arrive, the body is not read.
+    Every outcome is reported to the health tracker.
+    """
+    if not _health.begin(server):
+        return None  # Circuit open, or another request is already probing it
+
+    host = _host(server)
+    start = time.perf_counter()
+
+    try:
+        response = get_session(server).post(
+            server,
+            data=query,
+            timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT),
+            stream=STREAMING_AVAILABLE or cancel is not None
+        )
+
+        if cancel is not None and cancel.is_set():
+            response.close()  # Another mirror already won
+            if response.status_code == 200:
+                _health.record_success(server, time.perf_counter() - start)
+            else:
+                _health.release(server)
+            return None
+
+        if response.status_code == 200:
+            if STREAMING_AVAILABLE:
+                response.raw.decode_content = True  # Let urllib3 un-gzip while we read
+                elements = collect_elements(iter_elements(response.raw), **collect)
+                response.close()  # Stops the download if we finished early
+            else:
+                elements = collect_elements(response.json().get('elements', []), **collect)
+            _health.record_success(server, time.perf_counter() - start)
+            return elements
+
+        elif response.status_code in RETRYABLE_STATUS:
+            logger.info(f"   Overpass {host} busy ({response.status_code}), trying next...")
+        else:
+            logger.info(f"   Overpass {host} returned {response.status_code}, trying next...")
+
+        response.close()
+        _health.record_failure(server, time.perf_counter() - start, f"http_{response.status_code}")
+
+    except requests.exceptions.Timeout:
+        logger.info(f"   Overpass {host} timeout, trying next...")
+        _health.record_failure(server, time.perf_counter() - start, 'timeout')
+    except Exception as e:
+        logger.info(f"   Overpass {host} error ({type(e).__name__}), trying next...")
+        _health.record_failure(server, time.perf_counter() - start, type(e).__name__)
+
+    return None
+
+
+def _host(server: str) -> str:
+    """Short server name for logs"""
+    return urlparse(server).netloc or server
@@ -0,0 +1,172 @@
+"""
+Overpass Health - Latency tracking and circuit breaker per Overpass mirror
+
+SIMPLE EXPLANATION:
+- The mirror list used to be tried in a fixed order, so we kept hitting a
+  mirror that returned 429/503 or timed out a few seconds ago
+- Now every answer updates that mirror's health:
+    * EWMA latency (recent answers count more than old ones)
+    * EWMA error rate (0 = always works, 1 = always fails)
+- Mirrors are tried best-first (fast and reliable)
+- Circuit breaker: after FAILURE_THRESHOLD failures in a row a mirror is
+  "open" (skipped) for OPEN_COOLDOWN seconds, then "half open": ONE probe
+  request is let through - success closes it, failure opens it again
+
+STATES:
+    closed    → normal, requests allowed
+    open      → skipped until the cooldown ends
+    half_open → one probe request at a time
+"""
+
+import time
+import threading
+from typing import Dict, List
+
+FAILURE_THRESHOLD = 3   # Consecutive failures that open the circuit
+OPEN_COOLDOWN = 30.0    # Seconds a mirror stays open before a probe
+LATENCY_ALPHA = 0.3     # EWMA weight of the newest latency sample
+ERROR_ALPHA = 0.2       # EWMA weight of the newest success/failure
+DEFAULT_LATENCY = 1.0   # Assumed latency (s) for a mirror we never used
+ERROR_PENALTY = 5.0     # Seconds an error "costs" when ranking mirrors
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class MirrorHealth:
+    """Health numbers for one mirror"""
+
+    def __init__(self):
+        self.state = CLOSED
+        self.latency = None          # EWMA seconds (None = no sample yet)
+        self.error_rate = 0.0        # EWMA 0..1
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.requests = 0
+        self.failures = 0
+        self.last_error = None
+
+    def score(self) -> float:
+        """Expected cost in seconds - lower is better"""
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY
+        return latency + ERROR_PENALTY * self.error_rate
+
+    def to_dict(self) -> Dict:
+        return {
+            'state': self.state,
+            'ewma_latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'consecutive_failures': self.consecutive_failures,
+            'requests': self.requests,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'score': round(self.score(), 3),
+        }
+
+
+class HealthTracker:
+    """Thread-safe health table for all mirrors"""
+
+    def __init__(self):
+        self._mirrors: Dict[str, MirrorHealth] = {}
+        self._lock = threading.Lock()
+
+    def ordered(self, servers: List[str]) -> List[str]:
+        """
+        Mirrors to try, best first
+
+        Open mirrors are left out. If every mirror is open, the one that
+        opened longest ago is returned alone so it can be probed.
+        """
+        now = time.time()
+        with self._lock:
+            available = [s for s in servers if self._available(self._get(s), now)]
+
+            if not available:
+                # Last resort: probe the mirror that opened longest ago now,
+                # rather than failing every request until a cooldown ends
+                oldest = min(servers, key=lambda s: self._get(s).opened_at)
+                health = self._get(oldest)
+                if health.state == OPEN:
+                    health.state = HALF_OPEN
+                return [oldest]
+
+            # sorted() is stable: equal scores keep the configured order
+            return sorted(available, key=lambda s: self._get(s).score())
+
+    def begin(self, server: str) -> bool:
+        """
+        Call right before sending. False = don't send (circuit open, or a
+        half-open probe is already running).
+        """
+        now = time.time()
+        with self._lock:
+            health = self._get(server)
+
+            if health.state == OPEN:
+                if now - health.opened_at < OPEN_COOLDOWN:
+                    return False
+                health.state = HALF_OPEN
+
+            if health.state == HALF_OPEN:
+                if health.probe_in_flight:
+                    return False
+                health.probe_in_flight = True
+
+            health.requests += 1
+            return True
+
+    def record_success(self, server: str, latency: float):
+        with self._lock:
+            health = self._get(server)
+            health.latency = latency if health.latency is None else \
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * health.latency
+            health.error_rate = (1 - ERROR_ALPHA) * health.error_rate
+            health.consecutive_failures = 0
+            health.probe_in_flight = False
+            health.state = CLOSED
+
+    def record_failure(self, server: str, latency: float, reason: str):
+        with self._lock:
+            health = self._get(server)
+            # A timeout's latency is a lower bound, but still tells us it is slow
+            health.latency = latency if health.latency is None else \
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * health.latency
+            health.error_rate = ERROR_ALPHA + (1 - ERROR_ALPHA) * health.error_rate
+            health.consecutive_failures += 1
+            health.failures += 1
+            health.last_error = reason
+
+            if health.state == HALF_OPEN or health.consecutive_failures >= FAILURE_THRESHOLD:
+                health.state = OPEN
+                health.opened_at = time.time()
+            health.probe_in_flight = False
+
+    def release(self, server: str):
+        """Request abandoned (another mirror won) - not a success or failure"""
+        with self._lock:
+            self._get(server).probe_in_flight = False
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {server: health.to_dict() for server, health in self._mirrors.items()}
+
+    def reset(self):
+        with self._lock:
+            self._mirrors.clear()
+
+    def _get(self, server: str) -> MirrorHealth:
+        health = self._mirrors.get(server)
+        if health is None:
+            health = self._mirrors[server] = MirrorHealth()
+        return health
+
+    @staticmethod
+    def _available(health: MirrorHealth, now: float) -> bool:
+        if health.state == OPEN:
+            return now - health.opened_at >= OPEN_COOLDOWN
+        if health.state == HALF_OPEN:
+            return not health.probe_in_flight
+        return True
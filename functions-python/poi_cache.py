@@ -0,0 +1,501 @@
+"""
+POI Cache - Process-level tile cache for OpenStreetMap places
+
+SIMPLE EXPLANATION:
+- Two users planning Kuala Lumpur in the same minute used to send the
+  same Overpass queries twice
+- Here the world is cut into geohash tiles (~4.9km x 4.9km at precision 5)
+- Each (query class, tile) pair is fetched from Overpass ONCE and kept in
+  memory until its TTL runs out
+- An "around" request is answered by collecting the tiles that cover the
+  circle and keeping only places within the exact distance
+- So overlapping requests from different users share the same tiles
+
+SECOND LEVEL (tile_store.py):
+- On a memory miss we look in the durable tile store before Overpass
+- Fresh stored tiles are used directly; stale ones are served immediately
+  and refreshed in the background (stale-while-revalidate)
+- So requests only wait on Overpass for tiles that were NEVER fetched
+
+STREAMING:
+- Tile answers are decoded with the same tag projection as direct queries
+  (osm_stream.KEEP_TAGS), and decoding stops at TILE_FETCH_LIMIT elements
+- A caller's element_filter / limit are NOT applied while a tile streams
+  in: tiles are shared by every caller, so they must hold every element.
+  They run afterwards, on the assembled circle (select_nearest). Only
+  direct mode (POI_CACHE_ENABLED = False) stops early at the caller's limit
+
+LIMITS:
+- Memory is bounded by MAX_CACHE_BYTES (least recently used tiles go first)
+- Each query class has its own TTL (restaurants change faster than temples)
+- Hit / miss counters are available through get_cache_stats()
+
+With OSM_BACKEND=extract the cache is bypassed: osm_extract.py answers
+from a local in-memory index instead of Overpass.
+
+EXAMPLE:
+    elements = get_elements_around('eating', 3.1478, 101.6953, 2000, limit=60)
+    → raw OSM elements, nearest first, from cache when possible
+"""
+
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from math import radians, cos, floor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from geo import haversine
+from overpass_client import run_query
+from osm_queries import build_query, around_filter, bbox_filter
+from tile_store import get_tile_store
+import osm_extract
+
+logger = logging.getLogger(__name__)
+
+# Set to False to send every "around" request straight to Overpass
+POI_CACHE_ENABLED = True
+
+TILE_PRECISION = 5                 # Geohash length (5 ≈ 4.9km x 4.9km)
+MAX_CACHE_BYTES = 64 * 1024 * 1024 # Rough memory cap for cached elements
+TILE_FETCH_LIMIT = 5000            # Max elements per tile fetch query
+
+# How long tiles stay fresh, per query class (seconds)
+CLASS_TTL = {
+    'attractions': 24 * 3600,
+    'eating': 6 * 3600,
+    'lodging': 12 * 3600,
+}
+DEFAULT_TTL = 6 * 3600
+
+STALE_SERVE_TTL = 300   # Keep a stale tile in memory this long while it refreshes
+BACKGROUND_WORKERS = 2  # Threads for refreshes and tile store writes
+
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+class TileCache:
+    """
+    LRU cache of OSM elements per (query_class, tile)
+
+    Size is tracked in bytes (JSON length of the elements), not entries,
+    because a city-centre restaurant tile can be 100x a rural one.
+    """
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[Dict], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def get(self, query_class: str, tile: str) -> Optional[List[Dict]]:
+        """Cached elements for a tile, or None if missing/expired"""
+        key = (query_class, tile)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._count(query_class, 'misses')
+                return None
+
+            elements, size, expires_at = entry
+            if time.time() >= expires_at:
+                self._remove(key)
+                self._count(query_class, 'expired')
+                self._count(query_class, 'misses')
+                return None
+
+            self._entries.move_to_end(key)
+            self._count(query_class, 'hits')
+            return elements
+
+    def put(self, query_class: str, tile: str, elements: List[Dict], ttl: float = None):
+        """Store a tile, evicting least recently used tiles if over budget"""
+        key = (query_class, tile)
+        ttl = ttl if ttl is not None else CLASS_TTL.get(query_class, DEFAULT_TTL)
+        size = _estimate_size(elements)
+
+        if size > self.max_bytes:
+            return  # Would evict everything else - not worth it
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (elements, size, time.time() + ttl)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and self._entries:
+                old_key = next(iter(self._entries))
+                self._remove(old_key)
+                self._count(old_key[0], 'evictions')
+
+    def clear(self):
+        """Drop every tile (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters per class plus current size"""
+        with self._lock:
+            per_class = {}
+            for query_class, counts in self._stats.items():
+                lookups = counts.get('hits', 0) + counts.get('misses', 0)
+                per_class[query_class] = {
+                    **counts,
+                    'hit_ratio': round(counts.get('hits', 0) / lookups, 3) if lookups else 0.0,
+                }
+
+            return {
+                'tiles': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'classes': per_class,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _count(self, query_class: str, name: str):
+        counts = self._stats.setdefault(query_class, {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0})
+        counts[name] += 1
+
+
+_cache = TileCache()
+_background = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix='poi-cache')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def get_elements_around(
+    query_class: str,
+    lat: float,
+    lon: float,
+    radius: int,
+    limit: int = None,
+    element_filter: Callable[[Dict], bool] = None,
+    hedge: bool = False,
+    dedup_key: Callable[[Dict], str] = None
+) -> Optional[List[Dict]]:
+    """
+    Raw OSM elements of one query class within `radius` meters of a point
+
+    Args:
+        query_class: 'attractions', 'eating' or 'lodging'
+        lat, lon: Search center
+        radius: Search radius in meters
+        limit: Max elements to return (nearest first)
+        element_filter: Optional extra filter on raw elements
+                        (e.g. breakfast only wants cafes/restaurants/bakeries)
+        hedge: Passed to overpass_client.run_query
+        dedup_key: Optional key; only the nearest element per key is kept
+                   (e.g. the normalized name)
+
+    Returns:
+        Elements sorted by distance, or None if Overpass failed and
+        nothing was cached
+    """
+    if osm_extract.is_enabled():
+        elements = osm_extract.get_index().around(query_class, lat, lon, radius)
+        return select_nearest(elements, lat, lon, radius, limit, element_filter, dedup_key)
+
+    if not POI_CACHE_ENABLED:
+        # Direct mode: filters run while the answer streams in, and we stop
+        # reading once `limit` candidates were collected
+        elements = run_query(
+            build_query(query_class, around_filter(radius, lat, lon)),
+            hedge=hedge,
+            element_filter=element_filter,
+            dedup_key=dedup_key,
+            max_elements=limit
+        )
+        if elements is None:
+            return None
+        return select_nearest(elements, lat, lon, radius, limit)
+
+    tiles = covering_tiles(lat, lon, radius)
+    tile_elements = {}
+    missing = []
+
+    for tile in tiles:
+        elements = _cache.get(query_class, tile)
+        if elements is None:
+            missing.append(tile)
+        else:
+            tile_elements[tile] = elements
+
+    if missing:
+        stored = _load_from_store(query_class, missing)
+        tile_elements.update(stored)
+        missing = [tile for tile in missing if tile not in stored]
+
+    if missing:
+        fetched = _fetch_tiles(query_class, missing, hedge)
+        if fetched is None and not tile_elements:
+            return None
+        tile_elements.update(fetched or {})
+
+    logger.info(f"   POI cache [{query_class}]: {len(tiles) - len(missing)}/{len(tiles)} tiles cached")
+
+    all_elements = [el for elements in tile_elements.values() for el in elements]
+    return select_nearest(all_elements, lat, lon, radius, limit, element_filter, dedup_key)
+
+
+def get_cache_stats() -> Dict:
+    """Hit/miss counters and memory use of the POI tile cache"""
+    return _cache.stats()
+
+
+def clear_cache():
+    """Drop every cached tile"""
+    _cache.clear()
+
+
+def _fetch_tiles(query_class: str, tiles: List[str], hedge: bool) -> Optional[Dict[str, List[Dict]]]:
+    """
+    Fetch several missing tiles with ONE Overpass bbox query
+
+    The box covers all missing tiles; elements are then split back into
+    their tiles. Tiles with no elements are cached too (as empty lists).
+    """
+    bounds = [geohash_bounds(tile) for tile in tiles]
+    bbox = (
+        min(b[0] for b in bounds),
+        min(b[1] for b in bounds),
+        max(b[2] for b in bounds),
+        max(b[3] for b in bounds),
+    )
+
+    elements = run_query(
+        build_query(query_class, bbox_filter(bbox), limit=TILE_FETCH_LIMIT),
+        hedge=hedge,
+        max_elements=TILE_FETCH_LIMIT
+    )
+    if elements is None:
+        return None
+
+    wanted = set(tiles)
+    by_tile = {tile: [] for tile in tiles}
+
+    for el in elements:
+        lat, lon = el.get('lat'), el.get('lon')
+        if lat is None or lon is None:
+            continue
+        tile = geohash_encode(lat, lon, TILE_PRECISION)
+        if tile in wanted:
+            by_tile[tile].append(el)
+
+    # A capped answer means some tiles are incomplete - use it, don't cache it
+    if len(elements) >= TILE_FETCH_LIMIT:
+        logger.warning(f"   POI cache [{query_class}]: tile fetch hit {TILE_FETCH_LIMIT} elements, not caching")
+        return by_tile
+
+    for tile, tile_els in by_tile.items():
+        _cache.put(query_class, tile, tile_els)
+
+    if get_tile_store() is not None:
+        _background.submit(_save_to_store, query_class, by_tile, time.time())
+
+    return by_tile
+
+
+def _load_from_store(query_class: str, tiles: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Read missing tiles from the durable tile store
+
+    Fresh tiles go into memory for the rest of their TTL. Stale tiles are
+    returned anyway and refreshed in the background.
+    """
+    store = get_tile_store()
+    if store is None:
+        return {}
+
+    try:
+        records = store.get_many(query_class, tiles)
+    except Exception as e:
+        logger.warning(f"   Tile store read failed: {e}")
+        return {}
+
+    ttl = CLASS_TTL.get(query_class, DEFAULT_TTL)
+    now = time.time()
+    found = {}
+    stale = []
+
+    for tile, (elements, fetched_at) in records.items():
+        age = now - fetched_at
+        if age < ttl:
+            _cache.put(query_class, tile, elements, ttl=ttl - age)
+        else:
+            _cache.put(query_class, tile, elements, ttl=STALE_SERVE_TTL)
+            stale.append(tile)
+        found[tile] = elements
+
+    if records:
+        logger.info(f"   POI tile store [{query_class}]: {len(records)} tiles ({len(stale)} stale)")
+
+    if stale:
+        _schedule_refresh(query_class, stale)
+
+    return found
+
+
+def _schedule_refresh(query_class: str, tiles: List[str]):
+    """Refetch stale tiles in the background (once per tile at a time)"""
+    with _refreshing_lock:
+        tiles = [tile for tile in tiles if (query_class, tile) not in _refreshing]
+        _refreshing.update((query_class, tile) for tile in tiles)
+
+    if tiles:
+        _background.submit(_refresh_tiles, query_class, tiles)
+
+
+def _refresh_tiles(query_class: str, tiles: List[str]):
+    try:
+        _fetch_tiles(query_class, tiles, hedge=False)
+    except Exception as e:
+        logger.warning(f"   Background tile refresh failed: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.difference_update((query_class, tile) for tile in tiles)
+
+
+def _save_to_store(query_class: str, tiles: Dict[str, List[Dict]], fetched_at: float):
+    try:
+        get_tile_store().put_many(query_class, tiles, fetched_at)
+    except Exception as e:
+        logger.warning(f"   Tile store write failed: {e}")
+
+
+def select_nearest(
+    elements: List[Dict],
+    lat: float,
+    lon: float,
+    radius: int,
+    limit: int = None,
+    element_filter: Callable[[Dict], bool] = None,
+    dedup_key: Callable[[Dict], str] = None
+) -> List[Dict]:
+    """Keep elements inside the circle, nearest first, up to `limit`"""
+    radius_km = radius / 1000
+    nearby = []
+
+    for el in elements:
+        el_lat, el_lon = el.get('lat'), el.get('lon')
+        if el_lat is None or el_lon is None:
+            continue
+        if element_filter and not element_filter(el):
+            continue
+
+        dist = haversine(lat, lon, el_lat, el_lon)
+        if dist <= radius_km:
+            nearby.append((dist, el))
+
+    nearby.sort(key=lambda x: x[0])
+
+    if dedup_key:
+        seen = set()
+        unique = []
+        for dist, el in nearby:
+            key = dedup_key(el)
+            if key not in seen:
+                seen.add(key)
+                unique.append((dist, el))
+        nearby = unique
+
+    if limit:
+        nearby = nearby[:limit]
+
+    return [el for _, el in nearby]
+
+
+# ============================================================
+# GEOHASH HELPERS
+# ============================================================
+
+def geohash_encode(lat: float, lon: float, precision: int = TILE_PRECISION) -> str:
+    """Encode a point as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # Geohash starts with a longitude bit
+
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Bounding box (south, west, north, east) of a geohash"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = _GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return (lat_range[0], lon_range[0], lat_range[1], lon_range[1])
+
+
+def covering_tiles(lat: float, lon: float, radius: int, precision: int = TILE_PRECISION) -> List[str]:
+    """Geohash tiles covering the bounding box of a circle"""
+    lat_bits = precision * 5 // 2
+    lon_bits = precision * 5 - lat_bits
+    tile_h = 180.0 / (2 ** lat_bits)
+    tile_w = 360.0 / (2 ** lon_bits)
+
+    dlat = (radius / 1000) / 111.32
+    dlon = dlat / max(cos(radians(lat)), 0.01)
+
+    south, north = max(lat - dlat, -89.999), min(lat + dlat, 89.999)
+    west, east = max(lon - dlon, -179.999), min(lon + dlon, 179.999)
+
+    tiles = []
+    # Walk tile centres from the south-west tile to the north-east tile
+    row = floor((south + 90) / tile_h)
+    while row * tile_h - 90 <= north:
+        col = floor((west + 180) / tile_w)
+        while col * tile_w - 180 <= east:
+            center_lat = row * tile_h - 90 + tile_h / 2
+            center_lon = col * tile_w - 180 + tile_w / 2
+            tiles.append(geohash_encode(center_lat, center_lon, precision))
+            col += 1
+        row += 1
+
+    return tiles
+
+
+def _estimate_size(elements: List[Dict]) -> int:
+    """Rough memory cost of a tile (compact JSON length)"""
+    return len(json.dumps(elements, separators=(',', ':'), ensure_ascii=False)) + 100
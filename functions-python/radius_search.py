@@ -0,0 +1,186 @@
+"""
+Radius Search - Pick the search radius in ONE query instead of expanding circles
+
+SIMPLE EXPLANATION:
+- The services used to search 2km, then 5km, then 8-15km until they found
+  enough places - one Overpass round trip (plus a pause) per circle
+- Here we remember how many places per km² earlier queries found in each
+  area ("density"), separately for attractions / restaurants / hotels
+- Next time we predict the smallest circle that should have enough places
+  and ask Overpass ONCE at that radius
+- The smaller circles are then applied locally by distance, so the result
+  still prefers the nearest circle that had enough places
+
+EXAMPLE:
+    Rural area, earlier query found 6 attractions in 10km
+    → density ≈ 0.02 per km², need 200 → jump straight to 15km (1 query, not 4)
+"""
+
+import time
+import threading
+import logging
+from collections import OrderedDict
+from math import pi
+from typing import Callable, Dict, List, Optional, Tuple
+
+from geo import haversine
+
+logger = logging.getLogger(__name__)
+
+# Set to False to go back to the classic expanding-circle loop
+ADAPTIVE_SEARCH_ENABLED = True
+
+DENSITY_CELL_DEG = 0.1      # Density stats are kept per ~11km grid cell
+DENSITY_ALPHA = 0.3         # EWMA weight of the newest observation
+SAFETY_FACTOR = 1.3         # Aim for 30% more places than needed
+MAX_DENSITY_CELLS = 5000    # Bound the stats table on long-lived instances
+
+# (query_class, cell_lat, cell_lon) -> places per km²
+_density: "OrderedDict[Tuple[str, int, int], float]" = OrderedDict()
+_density_lock = threading.Lock()
+
+
+def search(
+    fetch: Callable[[int, int], Optional[List[Dict]]],
+    query_class: str,
+    lat: float,
+    lon: float,
+    count: int,
+    tiers: List[int],
+    accept: Callable[[Dict], bool] = None,
+    pause: float = 0.3
+) -> List[Dict]:
+    """
+    Find at least `count` places around (lat, lon)
+
+    Args:
+        fetch: function(radius_m, tiers_covered) → parsed places, or None
+               when the query failed (then nothing is learned about the area).
+               Each place needs 'osm_id' and 'coordinates' {lat, lng}.
+               tiers_covered tells the caller how many classic circles this
+               one query replaces, so it can raise its result limit.
+        query_class: 'attractions', 'eating' or 'lodging' (density is per class)
+        lat, lon: Search center
+        count: How many places we want
+        tiers: Classic radius tiers in meters, smallest first
+        accept: Optional filter (e.g. skip restaurants already used)
+        pause: Pause between round trips (be nice to servers)
+
+    Returns:
+        Deduplicated places, nearest tiers first
+    """
+    accept = accept or (lambda place: True)
+
+    start_idx = _predict_tier(query_class, lat, lon, count, tiers) if ADAPTIVE_SEARCH_ENABLED else 0
+    if start_idx > 0:
+        logger.info(f"   Adaptive radius: starting at {tiers[start_idx]}m")
+
+    places = []
+    seen_ids = set()
+    idx = start_idx
+
+    for idx in range(start_idx, len(tiers)):
+        radius = tiers[idx]
+        results = fetch(radius, idx + 1 if ADAPTIVE_SEARCH_ENABLED else 1)
+        if results is None:
+            results = []   # Overpass failed: an empty answer says nothing about density
+        else:
+            record_density(query_class, lat, lon, radius, len(results))
+
+        for place in results:
+            if place['osm_id'] not in seen_ids and accept(place):
+                seen_ids.add(place['osm_id'])
+                places.append(place)
+
+        logger.info(f"   Radius {radius}m: found {len(results)}, total: {len(places)}")
+
+        if len(places) >= count:
+            break
+
+        if idx + 1 < len(tiers):
+            time.sleep(pause)
+
+    if not ADAPTIVE_SEARCH_ENABLED:
+        return places
+
+    return _apply_tiers_locally(places, lat, lon, count, tiers[:idx + 1])
+
+
+def record_density(query_class: str, lat: float, lon: float, radius_m: int, found: int):
+    """Remember how many places a query found (places per km²)"""
+    area_km2 = pi * (radius_m / 1000) ** 2
+    observed = found / area_km2
+    key = _cell_key(query_class, lat, lon)
+
+    with _density_lock:
+        previous = _density.pop(key, None)
+        if previous is None:
+            _density[key] = observed
+        else:
+            _density[key] = DENSITY_ALPHA * observed + (1 - DENSITY_ALPHA) * previous
+
+        while len(_density) > MAX_DENSITY_CELLS:
+            _density.popitem(last=False)
+
+
+def get_density_stats() -> Dict:
+    """Summary of the density table (for logs / debugging)"""
+    with _density_lock:
+        return {
+            'cells': len(_density),
+            'classes': sorted({key[0] for key in _density}),
+        }
+
+
+def _predict_tier(query_class: str, lat: float, lon: float, count: int, tiers: List[int]) -> int:
+    """
+    Index of the smallest tier expected to hold count * SAFETY_FACTOR places
+
+    Unknown area → 0 (the classic first circle).
+    """
+    with _density_lock:
+        density = _density.get(_cell_key(query_class, lat, lon))
+
+    if density is None:
+        return 0
+
+    needed = count * SAFETY_FACTOR
+    for i, radius in enumerate(tiers):
+        if density * pi * (radius / 1000) ** 2 >= needed:
+            return i
+
+    return len(tiers) - 1
+
+
+def _apply_tiers_locally(places: List[Dict], lat: float, lon: float, count: int, tiers: List[int]) -> List[Dict]:
+    """
+    Replay the expanding-circle logic on data we already have
+
+    Places are grouped into the classic circles by real distance; we keep
+    adding circles until there are enough places, exactly like the old loop.
+    """
+    bands = [[] for _ in tiers]
+
+    for place in places:
+        coords = place['coordinates']
+        dist_m = haversine(lat, lon, coords['lat'], coords['lng']) * 1000
+
+        band = len(tiers) - 1
+        for i, radius in enumerate(tiers):
+            if dist_m <= radius:
+                band = i
+                break
+        bands[band].append(place)
+
+    result = []
+    for band in bands:
+        result.extend(band)
+        if len(result) >= count:
+            break
+
+    return result
+
+
+def _cell_key(query_class: str, lat: float, lon: float) -> Tuple[str, int, int]:
+    """Grid cell for density stats"""
+    return (query_class, int(lat // DENSITY_CELL_DEG), int(lon // DENSITY_CELL_DEG))
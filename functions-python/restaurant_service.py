@@ -15,43 +15,40 @@ PRICING SYSTEM:
 4. Fall back to country/budget-based estimation
 """
 
-import requests
-import time
 import logging
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
 import random
 from urllib.parse import quote
+from candidate_pool import CandidatePool
+from geo import haversine
+import radius_search
+import tag_rules
+import trip_area
 
 logger = logging.getLogger(__name__)
 
-# Multiple Overpass API servers - if one is slow/down, try next
-OVERPASS_SERVERS = [
-    "https://overpass-api.de/api/interpreter",
-    "https://overpass.kumi.systems/api/interpreter",
-    "https://maps.mail.ru/osm/tools/overpass/api/interpreter",
-    "https://overpass.openstreetmap.ru/api/interpreter",
-]
-
-REQUEST_TIMEOUT = 15  # Max wait time for server response
-QUERY_TIMEOUT = 12    # Max time server should spend processing query
-
-# Base prices per meal in different countries (in Malaysian Ringgit)
-# These are rough averages for a typical meal
-COUNTRY_BASE_PRICES = {
-    'malaysia': {'cheap': 15, 'moderate': 35, 'expensive': 80},
-    'singapore': {'cheap': 25, 'moderate': 55, 'expensive': 120},
-    'thailand': {'cheap': 12, 'moderate': 30, 'expensive': 70},
-    'indonesia': {'cheap': 10, 'moderate': 25, 'expensive': 60},
-    'vietnam': {'cheap': 8, 'moderate': 22, 'expensive': 55},
-    'japan': {'cheap': 35, 'moderate': 75, 'expensive': 180},
-    'korea': {'cheap': 30, 'moderate': 60, 'expensive': 140},
-    'china': {'cheap': 15, 'moderate': 40, 'expensive': 100},
-    'usa': {'cheap': 45, 'moderate': 90, 'expensive': 200},
-    'uk': {'cheap': 40, 'moderate': 80, 'expensive': 180},
-    # ... more countries omitted for brevity
-}
+RADIUS_TIERS = [2000, 5000, 8000]  # Search circles: 2km, 5km, 8km
+OSM_RESULT_LIMIT = 60              # Max restaurants per circle
 
-DEFAULT_PRICES = {'cheap': 25, 'moderate': 50, 'expensive': 110}
+# Which OSM amenity values count for each meal
+MEAL_AMENITIES = {
+    'breakfast': ('cafe', 'restaurant', 'bakery'),
+}
+DEFAULT_MEAL_AMENITIES = ('restaurant', 'cafe', 'fast_food')
+
+# Country base prices, price levels and cuisine rules live in tag_rules
+COUNTRY_BASE_PRICES = tag_rules.COUNTRY_BASE_PRICES
+DEFAULT_PRICES = tag_rules.DEFAULT_PRICES
+
+# Adjust by meal type (breakfast cheaper, dinner more expensive)
+MEAL_MULTIPLIERS = {
+    'breakfast': 0.6,  # Breakfast 40% cheaper
+    'lunch': 1.0,
+    'dinner': 1.3,     # Dinner 30% more expensive
+    'snack': 0.4,
+    'cafe': 0.5,
+}
+BUDGET_MULTIPLIERS = {'Low': 0.7, 'Medium': 1.0, 'High': 1.5}
 
 
 def get_restaurants_with_fallback(
@@ -63,7 +60,8 @@ def get_restaurants_with_fallback(
     count: int = 8,
     current_location: tuple = None,
     max_travel_time: float = 30,
-    city_center_coords: tuple = None
+    city_center_coords: tuple = None,
+    area_bundle: 'trip_area.TripAreaBundle' = None
 ) -> List[Dict]:
     """
     Main function to find restaurants near a location
@@ -78,6 +76,8 @@ def get_restaurants_with_fallback(
         current_location: (lat, lon) - where you are now
         max_travel_time: Not used in current implementation
         city_center_coords: (lat, lon) - fallback location if current_location is None
+        area_bundle: Optional trip_area.prefetch_trip_area() result - restaurants
+                     are then read from it instead of the network
 
     Returns:
         List of restaurant dictionaries with:
@@ -88,9 +88,10 @@ def get_restaurants_with_fallback(
 
     How it works:
     1. Search in expanding circles (2km → 5km → 8km) until we find enough
-    2. Enrich with pricing, distance, and Google Maps links
-    3. Sort by distance (closest first)
-    4. Filter out already-used restaurants
+       (radius_search skips straight to the right circle for known areas)
+    2. Filter out already-used restaurants and keep the `count` closest
+       (candidate_pool.py - on arrays, before any output dict is built)
+    3. Enrich only those with pricing, distance, and Google Maps links
     """
 
     if used_osm_ids is None:
@@ -106,111 +107,91 @@ def get_restaurants_with_fallback(
 
     logger.info(f"🍽️ {meal_type} restaurants near ({lat:.4f}, {lon:.4f})")
 
-    restaurants = []
-
-    # Try increasing search radii until we find enough restaurants
-    for radius in [2000, 5000, 8000]:  # 2km, 5km, 8km
-        results = _fetch_restaurants(lat, lon, radius, meal_type)
-
-        # Add new (non-duplicate) restaurants
-        for r in results:
-            if r['osm_id'] not in used_osm_ids and r['osm_id'] not in [x['osm_id'] for x in restaurants]:
-                restaurants.append(r)
-
-        logger.info(f"   Radius {radius}m: {len(results)} found (total: {len(restaurants)})")
-
-        if len(restaurants) >= count:
-            break  # Found enough
-
-        time.sleep(0.3)  # Brief pause between API calls (be nice to servers)
+    # One query at the predicted radius (or 2km → 5km → 8km if this area is new)
+    restaurants = radius_search.search(
+        lambda radius, tiers_covered: _fetch_restaurants(
+            lat, lon, radius, meal_type,
+            limit=OSM_RESULT_LIMIT * tiers_covered, area_bundle=area_bundle
+        ),
+        'eating',
+        lat, lon,
+        count,
+        RADIUS_TIERS,
+        accept=lambda r: r['osm_id'] not in used_osm_ids,
+    )
 
     if not restaurants:
         logger.warning("   No restaurants found")
         return []
 
-    # Enrich restaurants with pricing, distance, etc.
-    restaurants = _enrich_restaurants(restaurants, city, country, budget_level, meal_type, lat, lon)
+    # Nearest `count` not-yet-used restaurants, picked on columns
+    pool = CandidatePool(restaurants)
+    unused = pool.mask_where(lambda r: r['osm_id'] not in used_osm_ids)
+    nearest = pool.top_k(pool.distances_km(lat, lon), count, mask=unused, descending=False)
 
-    # Sort by distance (nearest first)
-    restaurants.sort(key=lambda x: x.get('distance_km', 999))
+    # Only those get pricing, distance, links etc.
+    available = _enrich_restaurants(pool.items(nearest), city, country, budget_level, meal_type, lat, lon)
 
-    # Filter out already-used restaurants
-    available = [r for r in restaurants if r['osm_id'] not in used_osm_ids]
+    logger.info(f"✅ Returning {len(available)} restaurants")
+    return available
 
-    logger.info(f"✅ Returning {min(len(available), count)} restaurants")
-    return available[:count]
 
-
-def _fetch_restaurants(lat: float, lon: float, radius: int, meal_type: str) -> List[Dict]:
+def _fetch_restaurants(lat: float, lon: float, radius: int, meal_type: str, limit: int = None,
+                       area_bundle: 'trip_area.TripAreaBundle' = None) -> Optional[List[Dict]]:
     """
     Query OpenStreetMap for restaurants near a location
 
-    Uses Overpass API - a query language for OSM data
+    Uses the shared POI tile cache (poi_cache.py), which asks the Overpass
+    API only for tiles nobody has fetched recently
 
     Args:
         lat, lon: Center point
         radius: Search radius in meters
         meal_type: Type of meal to search for
+        limit: Max results (defaults to OSM_RESULT_LIMIT)
+        area_bundle: Prefetched trip area to read from (optional)
 
     Returns:
-        Raw list of restaurants from OSM
+        Raw list of restaurants from OSM, nearest first
+        (None if every Overpass server failed)
 
     Query logic:
     - Breakfast: Look for cafes, restaurants, bakeries
     - Other meals: Look for restaurants, cafes, fast_food
     """
 
-    # Customize query based on meal type
-    if meal_type == 'breakfast':
-        amenity = '["amenity"~"cafe|restaurant|bakery"]'
-    else:
-        amenity = '["amenity"~"restaurant|cafe|fast_food"]'
-
-    # Overpass QL query
-    # [out:json] = return JSON
-    # node{amenity}["name"] = find nodes with this amenity and a name
-    # (around:{radius},{lat},{lon}) = within radius of location
-    # out 60 = return max 60 results
-    query = f'''
-[out:json][timeout:{QUERY_TIMEOUT}];
-node{amenity}["name"](around:{radius},{lat},{lon});
-out 60;
-'''
-
-    restaurants = []
-
-    # Try each server until one works
-    for i, server in enumerate(OVERPASS_SERVERS):
-        try:
-            response = requests.post(
-                server,
-                data=query,
-                headers={'Content-Type': 'application/x-www-form-urlencoded'},
-                timeout=REQUEST_TIMEOUT
-            )
+    limit = limit or OSM_RESULT_LIMIT
 
-            if response.status_code == 200:
-                data = response.json()
-                elements = data.get('elements', [])
+    # The cache holds every eating place - pick the ones for this meal type
+    amenities = MEAL_AMENITIES.get(meal_type, DEFAULT_MEAL_AMENITIES)
 
-                # Parse each result
-                for el in elements:
-                    r = _parse_restaurant(el)
-                    if r:
-                        restaurants.append(r)
+    def is_meal_candidate(el: Dict) -> bool:
+        tags = el.get('tags', {})
+        name = tags.get('name:en') or tags.get('name')
+        if not name or len(name) < 2:
+            return False
+        amenity = tags.get('amenity', '')
+        return any(a in amenity for a in amenities)
 
-                return restaurants  # Success!
+    restaurants = []
 
-            elif response.status_code in [429, 503, 504]:
-                # Server overloaded or rate limited - try next server
-                continue
+    elements = trip_area.get_elements(
+        'eating', lat, lon, radius,
+        limit=limit,
+        element_filter=is_meal_candidate,
+        hedge=True,
+        area_bundle=area_bundle
+    )
+    if elements is None:
+        return None
 
-        except requests.exceptions.Timeout:
-            continue  # Server too slow - try next
-        except Exception:
-            continue  # Any other error - try next
+    # Parse each result
+    for el in elements:
+        r = _parse_restaurant(el)
+        if r:
+            restaurants.append(r)
 
-    return restaurants  # Return whatever we got (might be empty)
+    return restaurants
 
 
 def _parse_restaurant(el: Dict) -> Dict:
@@ -299,7 +280,7 @@ def _enrich_restaurants(
             lat, lon = coords['lat'], coords['lng']
 
             # Calculate distance from current location
-            dist = _haversine(current_lat, current_lon, lat, lon)
+            dist = haversine(current_lat, current_lon, lat, lon)
             # Estimate travel time (assuming 25 km/h + 10 min buffer)
             travel = (dist / 25) * 60 + 10
 
@@ -374,23 +355,8 @@ def _extract_price_from_osm(tags: Dict, country: str, budget_level: str, meal_ty
         }
     """
 
-    # Get country-specific base prices
-    country_lower = country.lower()
-    base_prices = DEFAULT_PRICES.copy()
-    for key, prices in COUNTRY_BASE_PRICES.items():
-        if key in country_lower:
-            base_prices = prices
-            break
-
-    # Adjust by meal type (breakfast cheaper, dinner more expensive)
-    meal_multipliers = {
-        'breakfast': 0.6,  # Breakfast 40% cheaper
-        'lunch': 1.0,
-        'dinner': 1.3,     # Dinner 30% more expensive
-        'snack': 0.4,
-        'cafe': 0.5,
-    }
-    meal_mult = meal_multipliers.get(meal_type, 1.0)
+    base_prices = tag_rules.country_base_prices(country)
+    meal_mult = MEAL_MULTIPLIERS.get(meal_type, 1.0)
 
     verified = False
     source = 'estimated'
@@ -399,86 +365,34 @@ def _extract_price_from_osm(tags: Dict, country: str, budget_level: str, meal_ty
 
     # 1. Check for explicit cost tags (rare but best)
     if tags.get('cost') or tags.get('price'):
-        cost_str = tags.get('cost') or tags.get('price')
-        import re
-        numbers = re.findall(r'[\d.]+', str(cost_str))
-        if numbers:
-            try:
-                cost_myr = float(numbers[0])
-                # If too small, might be in local currency - convert roughly
-                if cost_myr < 5:
-                    cost_myr = cost_myr * 4.5  # Rough MYR conversion
-                verified = True
-                source = 'osm_cost_tag'
-            except:
-                pass
+        cost_myr = tag_rules.first_number(tags.get('cost') or tags.get('price'))
+        if cost_myr is not None:
+            # If too small, might be in local currency - convert roughly
+            if cost_myr < 5:
+                cost_myr = cost_myr * 4.5  # Rough MYR conversion
+            verified = True
+            source = 'osm_cost_tag'
 
     # 2. Check for price_level/price_range tags (more common)
     if not verified:
         osm_price = tags.get('price_level') or tags.get('price_range') or tags.get('price')
         if osm_price:
-            osm_price_str = str(osm_price).lower()
-
-            # Map various price indicators to our levels
-            if osm_price_str in ['$', 'cheap', 'budget', 'low', '1', 'inexpensive']:
-                price_level = 'cheap'
-                cost_myr = base_prices['cheap'] * meal_mult
-                verified = True
-                source = 'osm_price_level'
-            elif osm_price_str in ['$$', 'moderate', 'medium', 'mid', '2', 'average']:
-                price_level = 'moderate'
-                cost_myr = base_prices['moderate'] * meal_mult
-                verified = True
-                source = 'osm_price_level'
-            elif osm_price_str in ['$$$', '$$$$', 'expensive', 'high', 'luxury', '3', '4', 'upscale']:
-                price_level = 'expensive'
-                cost_myr = base_prices['expensive'] * meal_mult
+            price_level = tag_rules.osm_price_level(osm_price)
+            if price_level:
+                cost_myr = base_prices[price_level] * meal_mult
                 verified = True
                 source = 'osm_price_level'
 
-    # 3. Estimate based on cuisine type and amenity
+    # 3. Estimate based on cuisine type and amenity (fast food, street food, fine dining...)
     if not verified:
-        cuisine = tags.get('cuisine', '').lower()
-
-        # Fast food is cheap
-        if amenity == 'fast_food' or any(x in cuisine for x in ['fast_food', 'burger', 'pizza', 'kebab', 'sandwich']):
-            price_level = 'cheap'
-            cost_myr = base_prices['cheap'] * meal_mult * random.uniform(0.8, 1.1)
-            source = 'cuisine_fast_food'
-
-        # Street food is very cheap
-        elif any(x in cuisine for x in ['street_food', 'hawker', 'food_court']):
-            price_level = 'cheap'
-            cost_myr = base_prices['cheap'] * meal_mult * random.uniform(0.7, 1.0)
-            source = 'cuisine_street_food'
-
-        # Fine dining is expensive
-        elif any(x in cuisine for x in ['fine_dining', 'french', 'italian', 'japanese', 'sushi', 'seafood', 'steakhouse']):
-            price_level = 'expensive'
-            cost_myr = base_prices['expensive'] * meal_mult * random.uniform(0.8, 1.2)
-            source = 'cuisine_fine_dining'
-
-        # Asian cuisines are moderate
-        elif any(x in cuisine for x in ['chinese', 'thai', 'vietnamese', 'indian', 'korean']):
-            price_level = 'moderate'
-            cost_myr = base_prices['moderate'] * meal_mult * random.uniform(0.7, 1.1)
-            source = 'cuisine_asian'
-
-        # Cafes are cheap
-        elif amenity == 'cafe' or 'coffee' in cuisine or 'cafe' in cuisine:
-            price_level = 'cheap'
-            cost_myr = base_prices['cheap'] * meal_mult * random.uniform(0.8, 1.2)
-            source = 'amenity_cafe'
-
-        # Bakeries are cheap
-        elif amenity == 'bakery' or 'bakery' in cuisine:
-            price_level = 'cheap'
-            cost_myr = base_prices['cheap'] * meal_mult * random.uniform(0.5, 0.8)
-            source = 'amenity_bakery'
+        rule = tag_rules.cuisine_rule(tags.get('cuisine', '').lower(), amenity)
+        if rule:
+            source, price_level, (low, high) = rule
+            cost_myr = base_prices[price_level] * meal_mult * random.uniform(low, high)
 
     # 4. Final fallback - use budget level
     if cost_myr is None:
-        budget_mult = {'Low': 0.7, 'Medium': 1.0, 'High': 1.5}.get(budget_level, 1.0)
+        budget_mult = BUDGET_MULTIPLIERS.get(budget_level, 1.0)
         cost_myr = base_prices['moderate'] * meal_mult * budget_mult * random.uniform(0.85, 1.15)
         price_level = 'moderate'
         source = 'budget_estimate'
@@ -499,16 +413,3 @@ def _extract_price_from_osm(tags: Dict, country: str, budget_level: str, meal_ty
         'source': source,
         'price_level': price_level,
     }
-
-
-def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """
-    Calculate distance between two points on Earth
-    Same Haversine formula as in route_optimizer.py
-    Returns distance in kilometers
-    """
-    from math import radians, cos, sin, asin, sqrt
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat, dlon = lat2 - lat1, lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    return 2 * asin(sqrt(a)) * 6371  # Earth radius = 6371 km
\ No newline at end of file
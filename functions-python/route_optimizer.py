@@ -16,6 +16,8 @@ import logging
 from typing import List, Dict, Tuple
 import math
 
+from geo import haversine
+
 logger = logging.getLogger(__name__)
 
 
@@ -143,24 +145,7 @@ def _calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> f
     Example:
         Distance from Tokyo to Osaka ≈ 400km
     """
-    from math import radians, cos, sin, asin, sqrt
-
-    # Convert degrees to radians (required for trig functions)
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-
-    # Haversine formula
-    # This accounts for the curvature of the Earth
-    dlat = lat2 - lat1  # Difference in latitude
-    dlon = lon2 - lon1  # Difference in longitude
-
-    # The formula (looks complex but handles spherical geometry)
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-
-    # Earth radius in kilometers
-    r = 6371
-
-    return c * r
+    return haversine(lat1, lon1, lat2, lon2)
 
 
 def _calculate_total_distance(destinations: List[Dict]) -> float:
@@ -0,0 +1,237 @@
+"""
+Tag Rules - OSM tag classification rules, compiled once
+
+SIMPLE EXPLANATION:
+- destination_service and restaurant_service decide things from OSM tags:
+    * is this "attraction" really a hotel?           (name keywords + tourism type)
+    * which category is it? museum, park, temple...  (tag → category rules)
+    * how expensive is this restaurant?              (price tags, cuisine, amenity)
+    * which base prices apply to this country?
+- These used to be if-chains, keyword loops, `any(x in cuisine ...)` scans
+  and a linear country search, repeated for every element
+- Here the rules are DATA (the tables below), compiled at import into:
+    * ONE regex per keyword family (all keywords in a single pattern)
+    * dict lookups keyed by tag value
+    * a cached country → prices lookup
+- classify_attractions() handles a whole batch of elements in one pass
+
+To change a rule, edit the tables - nothing else needs to change.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from osm_queries import EXCLUDE_TYPES
+
+# ============================================================
+# RULE TABLES
+# ============================================================
+
+# A name containing any of these = accommodation (not an attraction)
+HOTEL_KEYWORDS = ['hotel', 'hostel', 'inn', 'motel', 'resort', 'lodge', 'guesthouse',
+                  'homestay', 'chalet', 'villa', 'apartment', 'airbnb', 'penginapan']
+
+# Category rules, first match wins: (tag key, tag values or None = any value, category)
+CATEGORY_RULES = [
+    ('tourism', ['museum'], 'museum'),
+    ('tourism', ['viewpoint'], 'viewpoint'),
+    ('tourism', ['theme_park', 'zoo', 'aquarium'], 'entertainment'),
+    ('leisure', ['park', 'garden', 'nature_reserve'], 'park'),
+    ('natural', ['peak', 'beach', 'cave_entrance', 'waterfall'], 'nature'),
+    ('amenity', ['place_of_worship'], 'temple'),
+    ('historic', None, 'cultural'),
+    ('shop', None, 'shopping'),
+]
+DEFAULT_CATEGORY = 'attraction'
+
+# OSM price_level / price_range values → our price level
+PRICE_LEVELS = {
+    'cheap': ['$', 'cheap', 'budget', 'low', '1', 'inexpensive'],
+    'moderate': ['$$', 'moderate', 'medium', 'mid', '2', 'average'],
+    'expensive': ['$$$', '$$$$', 'expensive', 'high', 'luxury', '3', '4', 'upscale'],
+}
+
+# Cuisine / amenity pricing rules, first match wins:
+# (source, price level, random multiplier range, amenity values, cuisine substrings)
+CUISINE_RULES = [
+    ('cuisine_fast_food', 'cheap', (0.8, 1.1), ['fast_food'], ['fast_food', 'burger', 'pizza', 'kebab', 'sandwich']),
+    ('cuisine_street_food', 'cheap', (0.7, 1.0), [], ['street_food', 'hawker', 'food_court']),
+    ('cuisine_fine_dining', 'expensive', (0.8, 1.2), [],
+     ['fine_dining', 'french', 'italian', 'japanese', 'sushi', 'seafood', 'steakhouse']),
+    ('cuisine_asian', 'moderate', (0.7, 1.1), [], ['chinese', 'thai', 'vietnamese', 'indian', 'korean']),
+    ('amenity_cafe', 'cheap', (0.8, 1.2), ['cafe'], ['coffee', 'cafe']),
+    ('amenity_bakery', 'cheap', (0.5, 0.8), ['bakery'], ['bakery']),
+]
+
+# Base prices per meal in different countries (in Malaysian Ringgit)
+# These are rough averages for a typical meal
+COUNTRY_BASE_PRICES = {
+    'malaysia': {'cheap': 15, 'moderate': 35, 'expensive': 80},
+    'singapore': {'cheap': 25, 'moderate': 55, 'expensive': 120},
+    'thailand': {'cheap': 12, 'moderate': 30, 'expensive': 70},
+    'indonesia': {'cheap': 10, 'moderate': 25, 'expensive': 60},
+    'vietnam': {'cheap': 8, 'moderate': 22, 'expensive': 55},
+    'japan': {'cheap': 35, 'moderate': 75, 'expensive': 180},
+    'korea': {'cheap': 30, 'moderate': 60, 'expensive': 140},
+    'china': {'cheap': 15, 'moderate': 40, 'expensive': 100},
+    'usa': {'cheap': 45, 'moderate': 90, 'expensive': 200},
+    'uk': {'cheap': 40, 'moderate': 80, 'expensive': 180},
+    # ... more countries omitted for brevity
+}
+DEFAULT_PRICES = {'cheap': 25, 'moderate': 50, 'expensive': 110}
+
+# Attraction entrance cost per country (MYR)
+COUNTRY_ENTRANCE_COSTS = {
+    'japan': 50, 'usa': 60, 'singapore': 45, 'thailand': 15,
+    'malaysia': 20, 'indonesia': 12, 'vietnam': 10, 'korea': 35,
+    'china': 25, 'uk': 50, 'france': 45,
+}
+DEFAULT_ENTRANCE_COST = 30
+
+
+# ============================================================
+# COMPILED FORMS (built once at import)
+# ============================================================
+
+def _keyword_pattern(keywords: List[str], overlapping: bool = False) -> re.Pattern:
+    """
+    One regex for a whole keyword list. search() behaves like
+    `any(k in text for k in keywords)`; with overlapping=True, finditer()
+    also reports keywords that overlap each other (group 1)
+    """
+    alternatives = '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    return re.compile(f'(?=({alternatives}))' if overlapping else alternatives)
+
+
+_HOTEL_NAME = _keyword_pattern(HOTEL_KEYWORDS)
+_EXCLUDED_TOURISM = frozenset(EXCLUDE_TYPES)
+
+
+def _compile_category_rules() -> List[Tuple[str, Optional[Dict[str, str]], Optional[str]]]:
+    """
+    Rules grouped per tag key, in priority order:
+    [(key, {value: category} or None, category for "any value")]
+    """
+    compiled = []
+    for key, values, category in CATEGORY_RULES:
+        if compiled and compiled[-1][0] == key and values is not None and compiled[-1][1] is not None:
+            for value in values:
+                compiled[-1][1].setdefault(value, category)
+        elif values is None:
+            compiled.append((key, None, category))
+        else:
+            compiled.append((key, {value: category for value in values}, None))
+    return compiled
+
+
+_CATEGORY_LOOKUPS = _compile_category_rules()
+
+_PRICE_LEVEL_OF = {value: level for level, values in PRICE_LEVELS.items() for value in values}
+
+# Cuisine keyword → index of the first CUISINE_RULES rule that lists it
+_CUISINE_RULE_OF: Dict[str, int] = {}
+_AMENITY_RULE_OF: Dict[str, int] = {}
+for _i, (_source, _level, _range, _amenities, _cuisines) in enumerate(CUISINE_RULES):
+    for _kw in _cuisines:
+        _CUISINE_RULE_OF.setdefault(_kw, _i)
+    for _amenity in _amenities:
+        _AMENITY_RULE_OF.setdefault(_amenity, _i)
+_CUISINE = _keyword_pattern(list(_CUISINE_RULE_OF), overlapping=True)
+
+_NUMBER = re.compile(r'[\d.]+')
+
+
+# ============================================================
+# CLASSIFICATION
+# ============================================================
+
+def is_accommodation(name: str, tourism: str) -> bool:
+    """Hotel-like place: excluded tourism type, or a hotel keyword in the name"""
+    if tourism and tourism.lower() in _EXCLUDED_TOURISM:
+        return True
+    return _HOTEL_NAME.search(name.lower()) is not None
+
+
+def infer_category(tags: Dict) -> str:
+    """Our category for an attraction, from its OSM tags"""
+    for key, table, any_value in _CATEGORY_LOOKUPS:
+        value = tags.get(key)
+        if not value:
+            continue
+        if table is None:
+            return any_value
+        category = table.get(value)
+        if category:
+            return category
+    return DEFAULT_CATEGORY
+
+
+def classify_attractions(names_and_tags: List[Tuple[str, Dict]]) -> List[Optional[str]]:
+    """
+    Whole batch in one pass: category of every (display name, tags) pair,
+    or None for accommodations (to be dropped)
+    """
+    hotel_name = _HOTEL_NAME.search
+    excluded = _EXCLUDED_TOURISM
+    categories = []
+    for name, tags in names_and_tags:
+        tourism = tags.get('tourism')
+        if (tourism and tourism.lower() in excluded) or hotel_name(name.lower()):
+            categories.append(None)
+        else:
+            categories.append(infer_category(tags))
+    return categories
+
+
+def osm_price_level(value) -> Optional[str]:
+    """'$$' / 'moderate' / '2' ... → 'moderate' (None if not recognised)"""
+    return _PRICE_LEVEL_OF.get(str(value).lower())
+
+
+def first_number(value) -> Optional[float]:
+    """First number in a tag value like '15 MYR' or 'RM12.50', or None"""
+    match = _NUMBER.search(str(value))
+    if not match:
+        return None
+    try:
+        return float(match.group())
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def cuisine_rule(cuisine: str, amenity: str) -> Optional[Tuple[str, str, Tuple[float, float]]]:
+    """
+    (source, price level, random multiplier range) of the first matching
+    CUISINE_RULES rule, or None. Cached: a city has few distinct cuisine
+    strings, so most restaurants are one dict lookup.
+    """
+    best = _AMENITY_RULE_OF.get(amenity, len(CUISINE_RULES))
+    if cuisine:
+        for match in _CUISINE.finditer(cuisine):
+            best = min(best, _CUISINE_RULE_OF[match.group(1)])
+    if best == len(CUISINE_RULES):
+        return None
+    source, level, multiplier_range, _, _ = CUISINE_RULES[best]
+    return source, level, multiplier_range
+
+
+@lru_cache(maxsize=256)
+def country_base_prices(country: str) -> Dict[str, float]:
+    """Meal base prices for a country (first COUNTRY_BASE_PRICES key inside the name)"""
+    country_lower = country.lower()
+    for key, prices in COUNTRY_BASE_PRICES.items():
+        if key in country_lower:
+            return prices
+    return DEFAULT_PRICES
+
+
+@lru_cache(maxsize=256)
+def country_entrance_cost(country: str) -> float:
+    """Typical attraction entrance cost (MYR) for a country"""
+    country_lower = country.lower()
+    for key, cost in COUNTRY_ENTRANCE_COSTS.items():
+        if key in country_lower:
+            return cost
+    return DEFAULT_ENTRANCE_COST
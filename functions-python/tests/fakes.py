@@ -0,0 +1,94 @@
+"""In-memory stand-ins for the Firestore client (only what the tests use)"""
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeQuery:
+    """Equality filters, (mlScore, __name__) DESC ordering, start_after and limit"""
+
+    def __init__(self, db, name, filters=(), ordered=False, after=None, limit=None):
+        self.db, self.name, self.filters = db, name, list(filters)
+        self.ordered, self.after, self._limit = ordered, after, limit
+
+    def _copy(self, **changes):
+        state = dict(db=self.db, name=self.name, filters=self.filters, ordered=self.ordered,
+                     after=self.after, limit=self._limit)
+        state.update(changes)
+        return FakeQuery(**state)
+
+    def where(self, field, op, value):
+        assert op == '=='
+        return self._copy(filters=self.filters + [(field, value)])
+
+    def order_by(self, field, direction=None):
+        return self._copy(ordered=True)
+
+    def start_after(self, values):
+        return self._copy(after=(values['mlScore'], values['__name__']))
+
+    def select(self, fields):
+        return self
+
+    def limit(self, n):
+        return self._copy(limit=n)
+
+    def document(self, doc_id):
+        return FakeRef(self.db, self.name, doc_id)
+
+    def stream(self):
+        if self.ordered and self.db.index_missing:
+            raise RuntimeError('FAILED_PRECONDITION: the query requires an index')
+        rows = [(doc_id, data) for doc_id, data in self.db.data.get(self.name, {}).items()
+                if all(data.get(field) == value for field, value in self.filters)]
+        if self.ordered:
+            rows.sort(key=lambda row: (row[1]['mlScore'], row[0]), reverse=True)
+            if self.after:
+                rows = [row for row in rows if (row[1]['mlScore'], row[0]) < self.after]
+        for doc_id, data in rows[:self._limit]:
+            yield FakeDoc(doc_id, data)
+
+
+class FakeRef:
+    def __init__(self, db, collection, doc_id):
+        self.db, self.collection, self.id = db, collection, doc_id
+
+    def get(self, **kwargs):
+        return FakeDoc(self.id, self.db.data.get(self.collection, {}).get(self.id))
+
+
+class FakeDB:
+    def __init__(self, data, index_missing=False):
+        self.data = data
+        self.index_missing = index_missing
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def get_all(self, refs, field_paths=None):
+        for ref in refs:
+            yield ref.get()
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db, self.operations = db, []
+
+    def set(self, ref, data, merge=False):
+        self.operations.append((ref, data))
+
+    create = set
+
+    def commit(self):
+        for ref, data in self.operations:
+            self.db.data.setdefault(ref.collection, {})[ref.id] = dict(data)
@@ -0,0 +1,53 @@
+import pytest
+
+import firestore_metrics
+from fakes import FakeDB
+
+
+def _enforced(budget):
+    return firestore_metrics.request_scope('test', read_budget=budget, budget_mode='enforce')
+
+
+def test_enforce_mode_blocks_reads_past_the_budget():
+    db = firestore_metrics.metered(FakeDB({'destinationData': {f'd{i}': {'city': 'KL'} for i in range(3)}}))
+
+    with _enforced(3) as usage:
+        list(db.collection('destinationData').stream())
+        with pytest.raises(firestore_metrics.ReadBudgetExceeded):
+            db.collection('destinationData').document('d0').get()
+
+    assert usage.summary()['reads'] == 3
+
+
+def test_warn_mode_only_flags_the_request():
+    db = firestore_metrics.metered(FakeDB({'destinationData': {f'd{i}': {'city': 'KL'} for i in range(3)}}))
+
+    with firestore_metrics.request_scope('test', read_budget=2, budget_mode='warn') as usage:
+        list(db.collection('destinationData').stream())
+        db.collection('destinationData').document('d0').get()
+
+    assert usage.summary()['budget_exceeded'] is True
+
+
+def test_enforced_budget_stops_ml_readers_instead_of_defaulting():
+    pytest.importorskip('firebase_admin')
+    import ml_helper
+
+    db = FakeDB({'mlPredictions': {'u1_d1': {'userID': 'u1', 'mlScore': 0.9}}})
+    with _enforced(1):
+        ml_helper.get_ml_score(db, 'u1', 'd1')
+        with pytest.raises(firestore_metrics.ReadBudgetExceeded):
+            ml_helper.get_ml_recommendations_page(db, 'u1', city='KL')
+
+
+def test_enforced_budget_stops_destination_matching():
+    pytest.importorskip('requests')
+    pytest.importorskip('firebase_admin')
+    import destination_service
+
+    db = firestore_metrics.metered(FakeDB({'destinationData': {}}))
+    dests = [{'osm_id': '1', 'name': 'Batu Caves', 'coordinates': {'lat': 3.2379, 'lng': 101.6840}}]
+    with _enforced(1):
+        db.collection('destinationData').document('x').get()
+        with pytest.raises(firestore_metrics.ReadBudgetExceeded):
+            destination_service._match_in_firestore(db, dests, 'Nowhere')
@@ -0,0 +1,116 @@
+import pytest
+
+pytest.importorskip('firebase_admin')
+
+import ml_helper
+import ml_topn
+from fakes import FakeDB
+
+
+def _predictions(user_id):
+    predictions = {}
+    for i, score in enumerate([0.91, 0.85, 0.85, 0.72, 0.64, 0.40]):
+        data = {
+            'userID': user_id, 'destinationID': f'd{i}', 'destinationName': f'Place {i}',
+            'category': 'Museum' if i % 2 else 'park', 'city': 'Tokyo', 'country': 'Japan', 'mlScore': score,
+        }
+        predictions[f'{user_id}_d{i}'] = {**data, **ml_helper.search_fields(data)}
+    predictions[f'{user_id}_x'] = {'userID': user_id, 'destinationID': 'x', 'city': 'Osaka',
+                                   'country': 'Japan', 'category': 'park', 'mlScore': 0.99,
+                                   **ml_helper.search_fields({'city': 'Osaka', 'country': 'Japan', 'category': 'park'})}
+    return predictions
+
+
+def _pages(db, **filters):
+    pages, cursor = [], None
+    while True:
+        page = ml_helper.get_ml_recommendations_page(db, 'u1', limit=2, cursor=cursor, **filters)
+        pages.append([item['destinationID'] for item in page['items']])
+        cursor = page['next_cursor']
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize('filters', [
+    {'city': 'tokyo'},
+    {'city': 'TOKYO', 'category': 'museum'},
+    {'city': 'Tokyo', 'country': 'japan', 'category': 'PARK'},
+])
+def test_mixed_case_filters_return_the_same_pages_on_every_path(filters):
+    predictions = _predictions('u1')
+    stored = [p for p in predictions.values() if p['city'] == 'Tokyo']
+    top_n = ml_topn.build_top_n_doc('u1', 'Tokyo', stored, model_version='test')
+
+    indexed = _pages(FakeDB({'mlPredictions': predictions}), **filters)
+    scanned = _pages(FakeDB({'mlPredictions': predictions}, index_missing=True), **filters)
+    from_top_n = _pages(FakeDB({
+        'mlPredictions': {},
+        ml_topn.TOPN_COLLECTION: {ml_topn.topn_doc_id('u1', 'tokyo'): top_n},
+    }), **filters)
+
+    assert indexed[0], 'the filters should match something'
+    assert indexed == scanned == from_top_n
+
+
+def test_scores_without_a_city_read_only_the_requested_ids():
+    import firestore_metrics
+    import ml_score_cache
+
+    ml_score_cache.invalidate()
+    db = firestore_metrics.metered(FakeDB({'mlPredictions': _predictions('u1')}))
+    with firestore_metrics.request_scope('test') as usage:
+        scores = ml_helper.get_ml_scores(db, 'u1', ['d0', 'd5', 'nope'])
+
+    assert scores == {'d0': 0.91, 'd5': 0.40, 'nope': ml_helper.DEFAULT_ML_SCORE}
+    assert usage.summary()['reads'] == 3
+
+
+def test_snapshot_completeness_counts_documents_not_scores(monkeypatch):
+    import ml_score_cache
+
+    predictions = {f'u1_{i}': {'userID': 'u1', 'mlScore': 0.5} for i in range(3)}
+    predictions['u1_'] = {'userID': 'u1', 'mlScore': 0.5}   # No destination ID: no score
+    monkeypatch.setattr(ml_score_cache, 'SNAPSHOT_MAX_DOCS', 3)
+
+    snapshot = ml_score_cache._load_snapshot(FakeDB({'mlPredictions': predictions}), 'u1', None)
+    assert len(snapshot.scores) == 3
+    assert not snapshot.complete
+
+
+def test_rebuild_groups_cities_case_insensitively():
+    predictions = _predictions('u1')
+    predictions['u1_d0']['city'] = 'tokyo '
+    db = FakeDB({'mlPredictions': predictions, ml_topn.TOPN_COLLECTION: {}})
+
+    assert ml_topn.rebuild_user(db, 'u1', 'test') == 2
+    top = ml_topn.get_top_n(db, 'u1', 'TOKYO')
+    assert len(top) == 6 and top.complete
+
+
+def test_ids_missing_from_a_complete_top_n_are_still_looked_up():
+    predictions = _predictions('u1')
+    stored = [p for p in predictions.values() if p['city'] == 'Tokyo' and p['destinationID'] != 'd5']
+    db = FakeDB({
+        'mlPredictions': predictions,
+        ml_topn.TOPN_COLLECTION: {ml_topn.topn_doc_id('u1', 'Tokyo'): ml_topn.build_top_n_doc('u1', 'Tokyo', stored, 'test')},
+    })
+    destinations = [{'id': 'd0', 'city': 'Tokyo'}, {'id': 'd5', 'city': 'Tokyo'}]
+
+    ranked = ml_helper.rank_destinations_by_ml(db, 'u1', destinations, category_affinity={})
+    assert [d['mlScoreSource'] for d in ranked] == ['blended', 'blended']
+
+
+def test_only_model_scores_are_recommended_and_profiles_do_not_scan_interactions():
+    import firestore_metrics
+
+    interactions = {f'i{n}': {'userID': 'u1', 'interactionType': 'save', 'category': 'museum'} for n in range(20)}
+    db = firestore_metrics.metered(FakeDB({'mlPredictions': _predictions('u1'), 'userInteractions': interactions}))
+    destinations = [{'id': 'd0', 'city': 'Tokyo', 'category': 'museum', 'rating': 5.0},
+                    {'id': 'new', 'city': 'Tokyo', 'category': 'museum', 'rating': 5.0}]
+
+    with firestore_metrics.request_scope('test') as usage:
+        ranked = {d['id']: d for d in ml_helper.rank_destinations_by_ml(db, 'u1', destinations)}
+
+    assert ranked['d0']['is_ml_recommended'] and ranked['d0']['mlScoreSource'] == 'blended'
+    assert not ranked['new']['is_ml_recommended'] and ranked['new']['mlScoreSource'] == 'fallback'
+    assert usage.summary()['reads'] < len(interactions)
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip('requests')
+
+import trip_area
+
+
+def _element(i, tags):
+    return {'type': 'node', 'id': i, 'lat': 3.1478 + i * 1e-6, 'lon': 101.6953, 'tags': tags}
+
+
+def _no_extract(monkeypatch):
+    monkeypatch.setattr(trip_area.osm_extract, 'is_enabled', lambda: False)
+
+
+def test_capped_answer_is_not_used(monkeypatch):
+    _no_extract(monkeypatch)
+    elements = [_element(i, {'amenity': 'restaurant', 'name': f'R{i}'}) for i in range(trip_area.PREFETCH_LIMIT)]
+    monkeypatch.setattr(trip_area, 'run_query', lambda query, hedge=False: elements)
+
+    assert trip_area.prefetch_trip_area(3.1478, 101.6953) is None
+
+
+def test_answer_under_limit_is_split_per_class(monkeypatch):
+    _no_extract(monkeypatch)
+    elements = [
+        _element(1, {'amenity': 'restaurant', 'name': 'Nasi Kandar'}),
+        _element(2, {'tourism': 'hotel', 'name': 'Hotel A'}),
+    ]
+    monkeypatch.setattr(trip_area, 'run_query', lambda query, hedge=False: elements)
+
+    bundle = trip_area.prefetch_trip_area(3.1478, 101.6953)
+
+    assert bundle.radius == trip_area.PREFETCH_RADIUS
+    assert [el['id'] for el in bundle.elements_by_class['eating']] == [1]
+    assert [el['id'] for el in bundle.elements_by_class['lodging']] == [2]
@@ -0,0 +1,180 @@
+"""
+Tile Store - Durable second-level storage for POI cache tiles
+
+SIMPLE EXPLANATION:
+- poi_cache.py keeps tiles in memory, but function instances get recycled
+  and a cold start used to lose every tile
+- This module saves each tile (query class + geohash → OSM elements) to
+  durable storage, together with the time it was fetched
+- poi_cache reads it back on a cold start: fresh tiles are used as-is,
+  stale tiles are served immediately AND refreshed in the background
+
+BACKENDS (env POI_TILE_STORE):
+- 'firestore' (default) → collection 'osmTiles', one document per tile.
+  firebase_admin automatically talks to the emulator when
+  FIRESTORE_EMULATOR_HOST is set, so the same code runs locally.
+- 'disk' → JSON files under POI_TILE_STORE_DIR (default /tmp/poi_tiles),
+  handy for tests and local runs
+- 'none' → no second level (memory cache only)
+"""
+
+import json
+import os
+import time
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+TILE_COLLECTION = 'osmTiles'
+MAX_DOC_BYTES = 900 * 1024  # Firestore documents are capped at 1 MiB
+MAX_BATCH_BYTES = 8 * 1024 * 1024  # Firestore commit requests are capped at 10 MiB
+FIRESTORE_BATCH_LIMIT = 500
+
+# (elements, fetched_at epoch seconds)
+TileRecord = Tuple[List[Dict], float]
+
+
+class LocalDiskTileStore:
+    """Tiles as JSON files: <directory>/<query_class>/<tile>.json"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def get_many(self, query_class: str, tiles: List[str]) -> Dict[str, TileRecord]:
+        records = {}
+        for tile in tiles:
+            try:
+                with open(self._path(query_class, tile), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                records[tile] = (data['elements'], data['fetched_at'])
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.debug(f"Tile store read error {query_class}/{tile}: {e}")
+        return records
+
+    def put_many(self, query_class: str, tiles: Dict[str, List[Dict]], fetched_at: float = None):
+        fetched_at = fetched_at or time.time()
+        folder = os.path.join(self.directory, query_class)
+        os.makedirs(folder, exist_ok=True)
+
+        for tile, elements in tiles.items():
+            path = self._path(query_class, tile)
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'fetched_at': fetched_at, 'elements': elements}, f, ensure_ascii=False)
+                os.replace(tmp_path, path)  # Atomic: readers never see half a file
+            except Exception as e:
+                logger.debug(f"Tile store write error {query_class}/{tile}: {e}")
+
+    def _path(self, query_class: str, tile: str) -> str:
+        return os.path.join(self.directory, query_class, f"{tile}.json")
+
+
+class FirestoreTileStore:
+    """Tiles as documents in the 'osmTiles' collection (ID: <query_class>_<tile>)"""
+
+    def __init__(self, db=None, collection: str = TILE_COLLECTION):
+        self._db = db
+        self.collection = collection
+
+    @property
+    def db(self):
+        if self._db is None:
+            from firebase_admin import firestore
+            self._db = firestore.client()
+        return self._db
+
+    def get_many(self, query_class: str, tiles: List[str]) -> Dict[str, TileRecord]:
+        if not tiles:
+            return {}
+
+        refs = [self.db.collection(self.collection).document(f"{query_class}_{tile}") for tile in tiles]
+        records = {}
+
+        for doc in self.db.get_all(refs):
+            if not doc.exists:
+                continue
+            data = doc.to_dict()
+            try:
+                # Stored as a JSON string: OSM tags have keys like "name:en"
+                # that Firestore field paths don't like, and it keeps the doc small
+                records[data['tile']] = (json.loads(data['elements_json']), data['fetched_at'])
+            except Exception as e:
+                logger.debug(f"Bad tile document {doc.id}: {e}")
+
+        return records
+
+    def put_many(self, query_class: str, tiles: Dict[str, List[Dict]], fetched_at: float = None):
+        fetched_at = fetched_at or time.time()
+        batch = self.db.batch()
+        pending = pending_bytes = 0
+
+        for tile, elements in tiles.items():
+            payload = json.dumps(elements, separators=(',', ':'), ensure_ascii=False)
+            size = len(payload.encode('utf-8'))
+            if size > MAX_DOC_BYTES:
+                logger.info(f"   Tile {query_class}/{tile} too large for Firestore, memory only")
+                continue
+
+            # A few near-1 MiB tiles would push the commit past the request size limit
+            if pending and pending_bytes + size > MAX_BATCH_BYTES:
+                batch.commit()
+                batch = self.db.batch()
+                pending = pending_bytes = 0
+
+            ref = self.db.collection(self.collection).document(f"{query_class}_{tile}")
+            batch.set(ref, {
+                'query_class': query_class,
+                'tile': tile,
+                'elements_json': payload,
+                'element_count': len(elements),
+                'fetched_at': fetched_at,
+            })
+            pending += 1
+            pending_bytes += size
+
+            if pending == FIRESTORE_BATCH_LIMIT:
+                batch.commit()
+                batch = self.db.batch()
+                pending = pending_bytes = 0
+
+        if pending:
+            batch.commit()
+
+
+_store = None
+_store_loaded = False
+
+
+def get_tile_store():
+    """
+    The configured tile store (created once per process), or None
+
+    Chosen by env POI_TILE_STORE: 'firestore' (default), 'disk' or 'none'.
+    """
+    global _store, _store_loaded
+
+    if not _store_loaded:
+        backend = os.environ.get('POI_TILE_STORE', 'firestore').lower()
+
+        if backend == 'disk':
+            _store = LocalDiskTileStore(os.environ.get('POI_TILE_STORE_DIR', '/tmp/poi_tiles'))
+        elif backend == 'firestore':
+            _store = FirestoreTileStore()
+        else:
+            _store = None
+
+        _store_loaded = True
+        logger.info(f"POI tile store: {backend}")
+
+    return _store
+
+
+def set_tile_store(store):
+    """Replace the tile store (tests, local tools). None disables it."""
+    global _store, _store_loaded
+    _store = store
+    _store_loaded = True
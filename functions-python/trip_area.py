@@ -0,0 +1,143 @@
+"""
+Trip Area - Fetch attractions, food and lodging for a trip in ONE query
+
+SIMPLE EXPLANATION:
+- For one city, trip generation used to send separate Overpass queries for
+  attractions, for every meal's restaurants and for hotels - all around
+  nearly the same point
+- prefetch_trip_area() sends ONE union query for all three and splits the
+  answer per class (osm_queries.classify_element)
+- The result is a TripAreaBundle that can be passed to
+  get_destinations_near_location, get_restaurants_with_fallback and
+  get_accommodation_recommendations (area_bundle=...), which then read from
+  it instead of the network
+
+EXAMPLE:
+    bundle = prefetch_trip_area(3.1478, 101.6953)
+    destinations = get_destinations_near_location(..., area_bundle=bundle)
+    restaurants = get_restaurants_with_fallback(..., area_bundle=bundle)
+    hotels = get_accommodation_recommendations(..., area_bundle=bundle)
+
+Requests that reach outside the prefetched circle fall back to poi_cache.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional
+
+from geo import haversine
+from overpass_client import run_query
+from osm_queries import QUERY_CLASSES, build_union_query, around_filter, classify_element
+import poi_cache
+import osm_extract
+from poi_cache import select_nearest
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_RADIUS = 15000  # Largest circle any service searches (destinations)
+PREFETCH_LIMIT = 5000    # Max elements in the union answer
+
+
+class TripAreaBundle:
+    """Raw OSM elements for one trip area, split by query class"""
+
+    def __init__(self, lat: float, lon: float, radius: int, elements_by_class: Dict[str, List[Dict]]):
+        self.lat = lat
+        self.lon = lon
+        self.radius = radius
+        self.elements_by_class = elements_by_class
+
+    def covers(self, lat: float, lon: float, radius: int) -> bool:
+        """True if the circle (lat, lon, radius) lies inside this bundle's circle"""
+        return haversine(self.lat, self.lon, lat, lon) * 1000 + radius <= self.radius
+
+    def elements_around(
+        self,
+        query_class: str,
+        lat: float,
+        lon: float,
+        radius: int,
+        limit: int = None,
+        element_filter: Callable[[Dict], bool] = None,
+        dedup_key: Callable[[Dict], str] = None
+    ) -> List[Dict]:
+        """Elements of one class within `radius` meters, nearest first"""
+        return select_nearest(
+            self.elements_by_class.get(query_class, []),
+            lat, lon, radius, limit, element_filter, dedup_key
+        )
+
+    def counts(self) -> Dict[str, int]:
+        return {query_class: len(els) for query_class, els in self.elements_by_class.items()}
+
+
+def prefetch_trip_area(lat: float, lon: float, radius: int = PREFETCH_RADIUS,
+                       query_classes: List[str] = None) -> Optional[TripAreaBundle]:
+    """
+    One Overpass round trip for every place class a trip needs
+
+    Args:
+        lat, lon: Trip area center (usually the city center)
+        radius: Prefetch circle in meters
+        query_classes: Classes to include (default: all of QUERY_CLASSES)
+
+    Returns:
+        TripAreaBundle, or None if every Overpass server failed or the
+        answer hit PREFETCH_LIMIT (callers then simply don't pass a bundle)
+    """
+    query_classes = query_classes or list(QUERY_CLASSES)
+
+    if osm_extract.is_enabled():
+        # Local extract: no round trip to save, just slice the index once
+        index = osm_extract.get_index()
+        return TripAreaBundle(lat, lon, radius, {
+            query_class: index.around(query_class, lat, lon, radius) for query_class in query_classes
+        })
+
+    query = build_union_query(query_classes, around_filter(radius, lat, lon), limit=PREFETCH_LIMIT)
+    elements = run_query(query, hedge=True)
+    if elements is None:
+        return None
+
+    if len(elements) >= PREFETCH_LIMIT:
+        # Capped answer: Overpass returns an arbitrary subset (not the nearest
+        # ones), so no smaller circle is known to be complete - don't use it
+        logger.warning(f"   Trip area prefetch capped at {PREFETCH_LIMIT} elements, not using it")
+        return None
+
+    elements_by_class = {query_class: [] for query_class in query_classes}
+    for el in elements:
+        for query_class in classify_element(el.get('tags', {})):
+            if query_class in elements_by_class:
+                elements_by_class[query_class].append(el)
+
+    bundle = TripAreaBundle(lat, lon, radius, elements_by_class)
+    logger.info(f"📦 Trip area prefetch ({lat:.4f}, {lon:.4f}) {radius}m: {bundle.counts()}")
+    return bundle
+
+
+def get_elements(
+    query_class: str,
+    lat: float,
+    lon: float,
+    radius: int,
+    limit: int = None,
+    element_filter: Callable[[Dict], bool] = None,
+    hedge: bool = False,
+    area_bundle: TripAreaBundle = None,
+    dedup_key: Callable[[Dict], str] = None
+) -> Optional[List[Dict]]:
+    """
+    Elements around a point: from the bundle when it covers the circle,
+    otherwise from poi_cache (memory → tile store → Overpass)
+    """
+    if area_bundle is not None and query_class in area_bundle.elements_by_class \
+            and area_bundle.covers(lat, lon, radius):
+        return area_bundle.elements_around(query_class, lat, lon, radius, limit, element_filter, dedup_key)
+
+    return poi_cache.get_elements_around(
+        query_class, lat, lon, radius,
+        limit=limit,
+        element_filter=element_filter,
+        hedge=hedge,
+        dedup_key=dedup_key
+    )
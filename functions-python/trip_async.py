@@ -0,0 +1,207 @@
+"""
+Trip Async - asyncio variants of the service entry points
+
+SIMPLE EXPLANATION:
+- get_destinations_near_location, get_restaurants_with_fallback,
+  get_accommodation_recommendations and get_weather_forecast all block
+- Planning a trip called them one after another: weather, then hotels,
+  then attractions, then every meal slot (3 days x 3 meals = 9 more waits)
+- This module gives each one an `async` variant, and gather_trip_inputs()
+  runs ALL of them at the same time, at most MAX_CONCURRENCY at once
+- Total time is roughly the slowest call instead of the sum of all calls
+
+HOW THE ASYNC VARIANTS WORK:
+- Below every service sits the same synchronous stack: radius search,
+  tile caches, the Firestore admin SDK and the pooled Overpass sessions
+- Each async variant hands the existing sync function to a shared worker
+  pool (WORKER_THREADS) and awaits it, so the event loop never blocks
+- Every worker talks through the SAME keep-alive sessions
+  (overpass_client / weather_service), so concurrency reuses open
+  connections instead of opening new ones
+- The sync functions are unchanged - sync callers keep working, and
+  plan_trip_inputs() is the sync wrapper around gather_trip_inputs()
+- plan_trip_response() also projects the result for the client
+  (summary/detail view, see trip_response)
+
+USAGE:
+    inputs = await gather_trip_inputs(
+        city, country, lat, lon, start_date, end_date, 'Medium', num_nights,
+        meal_slots=[{'key': 'day1_lunch', 'meal_type': 'lunch', 'location': (lat, lon)}, ...],
+    )
+    inputs['weather'], inputs['accommodation'], inputs['destinations'],
+    inputs['restaurants']['day1_lunch']
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Set
+
+import destination_service
+import restaurant_service
+import accommodation_service
+import firestore_metrics
+import trip_response
+import weather_service
+from overpass_client import POOL_MAXSIZE
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = POOL_MAXSIZE  # Service calls in flight per trip (one keep-alive socket each)
+WORKER_THREADS = 32             # Shared by all trips planned in this process
+RESTAURANT_OVERFETCH = 2        # Extra candidates per meal slot, for cross-slot de-duplication
+
+_executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix='trip-async')
+
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run a blocking service call on the shared worker pool (in this task's context)"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()  # Keeps the firestore_metrics request scope
+    return await loop.run_in_executor(_executor, partial(context.run, func, *args, **kwargs))
+
+
+# ============================================================
+# ASYNC VARIANTS (same arguments and results as the sync ones)
+# ============================================================
+
+async def get_destinations_near_location_async(*args, **kwargs) -> List[Dict]:
+    """Async destination_service.get_destinations_near_location"""
+    return await _run_blocking(destination_service.get_destinations_near_location, *args, **kwargs)
+
+
+async def get_restaurants_with_fallback_async(*args, **kwargs) -> List[Dict]:
+    """Async restaurant_service.get_restaurants_with_fallback"""
+    return await _run_blocking(restaurant_service.get_restaurants_with_fallback, *args, **kwargs)
+
+
+async def get_accommodation_recommendations_async(*args, **kwargs) -> Dict:
+    """Async accommodation_service.get_accommodation_recommendations"""
+    return await _run_blocking(accommodation_service.get_accommodation_recommendations, *args, **kwargs)
+
+
+async def get_weather_forecast_async(*args, **kwargs) -> Dict[str, Dict]:
+    """Async weather_service.get_weather_forecast"""
+    return await _run_blocking(weather_service.get_weather_forecast, *args, **kwargs)
+
+
+# ============================================================
+# TRIP FAN-OUT
+# ============================================================
+
+async def gather_trip_inputs(
+    city: str,
+    country: str,
+    lat: float,
+    lon: float,
+    start_date: str,
+    end_date: str,
+    budget_level: str,
+    num_nights: int,
+    meal_slots: List[Dict] = None,
+    destination_count: int = 100,
+    category_weights: Dict[str, float] = None,
+    preferred_categories: List[str] = None,
+    restaurants_per_slot: int = 8,
+    used_osm_ids: Set[str] = None,
+    area_bundle=None,
+    max_concurrency: int = MAX_CONCURRENCY
+) -> Dict:
+    """
+    Fetch everything a trip needs concurrently
+
+    Args:
+        meal_slots: [{'key': 'day1_lunch', 'meal_type': 'lunch',
+                      'location': (lat, lon)}, ...] - location defaults to
+                    the city center
+        used_osm_ids: Restaurants that must not be suggested again
+        area_bundle: Optional trip_area.prefetch_trip_area() result, shared
+                     by every call
+        max_concurrency: Max service calls in flight at once
+
+    Returns:
+        {'weather': {...}, 'accommodation': {...}, 'destinations': [...],
+         'restaurants': {slot_key: [...]}, 'timing_ms': float}
+
+    Meal slots run at the same time, so they can't see each other's picks.
+    Each slot asks for RESTAURANT_OVERFETCH x more candidates, then slots
+    are de-duplicated in the order given (earlier slots pick first).
+    A failing call is logged and returns an empty result; it doesn't sink the others.
+    """
+    meal_slots = meal_slots or []
+    used_osm_ids = set(used_osm_ids or ())
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    start = time.perf_counter()
+
+    async def bounded(label, call, empty):
+        async with semaphore:
+            try:
+                return await call
+            except firestore_metrics.ReadBudgetExceeded:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Trip fan-out: {label} failed ({type(e).__name__}: {e})")
+                return empty
+
+    # One Firestore usage summary per trip (unless the caller already opened a request scope)
+    scope = (firestore_metrics.request_scope('plan_trip') if firestore_metrics.current_request() is None
+             else contextlib.nullcontext())
+
+    with scope:
+        tasks = [
+            bounded('weather', get_weather_forecast_async(lat, lon, start_date, end_date), {}),
+            bounded('accommodation', get_accommodation_recommendations_async(
+                city, country, lat, lon, budget_level, num_nights,
+                checkin_date=start_date, checkout_date=end_date, area_bundle=area_bundle
+            ), {}),
+            bounded('destinations', get_destinations_near_location_async(
+                city, country, lat, lon, destination_count, category_weights, preferred_categories,
+                area_bundle=area_bundle
+            ), []),
+        ]
+
+        for slot in meal_slots:
+            tasks.append(bounded(f"restaurants {slot['key']}", get_restaurants_with_fallback_async(
+                city, country, slot['meal_type'], budget_level,
+                used_osm_ids=set(used_osm_ids),
+                count=restaurants_per_slot * RESTAURANT_OVERFETCH,
+                current_location=slot.get('location'),
+                city_center_coords=(lat, lon),
+                area_bundle=area_bundle
+            ), []))
+
+        results = await asyncio.gather(*tasks)
+
+    weather, accommodation, destinations = results[:3]
+
+    restaurants = {}
+    for slot, candidates in zip(meal_slots, results[3:]):
+        picked = [r for r in candidates if r['osm_id'] not in used_osm_ids][:restaurants_per_slot]
+        used_osm_ids.update(r['osm_id'] for r in picked)
+        restaurants[slot['key']] = picked
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"⚡ Trip inputs: {len(tasks)} calls in {elapsed_ms:.0f}ms (max {max_concurrency} at once)")
+
+    return {
+        'weather': weather,
+        'accommodation': accommodation,
+        'destinations': destinations,
+        'restaurants': restaurants,
+        'timing_ms': round(elapsed_ms, 1),
+    }
+
+
+def plan_trip_inputs(*args, **kwargs) -> Dict:
+    """Sync wrapper around gather_trip_inputs() for sync callers"""
+    return asyncio.run(gather_trip_inputs(*args, **kwargs))
+
+
+def plan_trip_response(*args, view: str = trip_response.DEFAULT_VIEW,
+                       fields: Dict[str, List[str]] = None, **kwargs) -> Dict:
+    """plan_trip_inputs() projected for the client (see trip_response)"""
+    return trip_response.build_trip_response(plan_trip_inputs(*args, **kwargs), view, fields)
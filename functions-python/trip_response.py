@@ -0,0 +1,151 @@
+"""
+Trip Response - Compact projection of trip data for the Flutter client
+
+SIMPLE EXPLANATION:
+- The services return everything they know about a place: raw OSM `tags`,
+  two Maps links, description, tips, cost_myr AND estimated_cost_myr...
+- Sent as-is, the callable response gets large and slow over mobile links
+- This module picks only the fields the client asked for:
+    * view='summary' → what list screens show (name, category, cost, ...)
+    * view='detail'  → everything a detail screen needs
+    * fields=[...]   → exactly these fields (overrides the view)
+- Raw OSM `tags` are never included unless asked for by name
+- Aliases are dropped (estimated_cost_myr is always the same as cost_myr)
+- Values that are the same for every item (default tips, data_source,
+  'Check locally' opening hours, standard amenities) are sent once in
+  `shared`; the client uses shared[kind][field] when an item lacks a field
+- meta.payload_bytes reports the serialized size of every response
+
+USAGE:
+    inputs = plan_trip_inputs(...)
+    response = build_trip_response(inputs, view='summary')
+    response['meta']['payload_bytes']   # e.g. 38120
+"""
+
+import copy
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VIEW = 'summary'
+
+# Fields sent per kind and view ('detail' includes everything in 'summary')
+SUMMARY_FIELDS = {
+    'destination': ['id', 'osm_id', 'name', 'category', 'coordinates', 'rating', 'avg_cost',
+                    'mlScore', 'is_preferred'],
+    'restaurant': ['osm_id', 'name', 'cuisine', 'coordinates', 'distance_km', 'travel_time_minutes',
+                   'cost_myr', 'cost_display', 'price_level', 'rating'],
+    'accommodation': ['id', 'osm_id', 'name', 'type', 'stars', 'rating', 'coordinates', 'distance_km',
+                      'price_per_night_myr', 'total_cost_myr'],
+}
+DETAIL_FIELDS = {
+    'destination': ['name_local', 'city', 'country', 'description', 'opening_hours', 'tips',
+                    'maps_link', 'maps_link_direct', 'website', 'phone', 'data_source',
+                    'preference_score', 'ml_source', 'mlScoreSource'],
+    'restaurant': ['phone', 'website', 'opening_hours', 'amenity', 'address', 'price_verified',
+                   'price_source', 'maps_link', 'maps_link_direct', 'data_source'],
+    'accommodation': ['address', 'city', 'country', 'amenities', 'phone', 'website', 'booking_links',
+                      'maps_link', 'maps_link_direct', 'data_source', 'checkin_date', 'checkout_date'],
+}
+VIEWS = {
+    'summary': SUMMARY_FIELDS,
+    'detail': {kind: SUMMARY_FIELDS[kind] + DETAIL_FIELDS[kind] for kind in SUMMARY_FIELDS},
+}
+
+# Same value as another field - never sent
+ALIASES = {'estimated_cost_myr': 'cost_myr'}
+
+# Values shared by (almost) every item - sent once in response['shared']
+SHARED_DEFAULTS = {
+    'destination': {
+        'tips': ['Check opening hours before visiting', 'Arrive early to avoid crowds'],
+        'opening_hours': 'Check locally',
+        'data_source': 'OpenStreetMap',
+    },
+    'restaurant': {'data_source': 'OpenStreetMap'},
+    'accommodation': {'amenities': ['WiFi', 'Air conditioning'], 'data_source': 'OpenStreetMap'},
+}
+
+
+def view_fields(kind: str, view: str = DEFAULT_VIEW, fields: List[str] = None) -> List[str]:
+    """Field names sent for one kind of item"""
+    if fields:
+        return [f for f in fields if f not in ALIASES]
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view '{view}' (expected one of {sorted(VIEWS)})")
+    return VIEWS[view][kind]
+
+
+def project_items(items: List[Dict], kind: str, view: str = DEFAULT_VIEW,
+                  fields: List[str] = None) -> List[Dict]:
+    """
+    Only the selected fields of each item; fields equal to SHARED_DEFAULTS
+    (and missing ones) are left out
+    """
+    selected = view_fields(kind, view, fields)
+    shared = SHARED_DEFAULTS.get(kind, {})
+    projected = []
+    for item in items:
+        out = {}
+        for field in selected:
+            if field not in item:
+                continue
+            value = item[field]
+            if field in shared and value == shared[field]:
+                continue
+            out[field] = value
+        projected.append(out)
+    return projected
+
+
+def expand_item(item: Dict, kind: str) -> Dict:
+    """Inverse of the shared-default step: fill in what the projection left out"""
+    return {**SHARED_DEFAULTS.get(kind, {}), **item}
+
+
+def build_trip_response(trip_inputs: Dict, view: str = DEFAULT_VIEW,
+                        fields: Optional[Dict[str, List[str]]] = None) -> Dict:
+    """
+    Client payload from trip_async.gather_trip_inputs() output
+
+    Args:
+        view: 'summary' or 'detail'
+        fields: Optional per-kind field lists, e.g. {'destination': ['id', 'name']}
+
+    Returns:
+        {'weather', 'destinations', 'restaurants': {slot_key: [...]},
+         'accommodation': {...}, 'shared': {...}, 'meta': {'view', 'payload_bytes'}}
+    """
+    fields = fields or {}
+    accommodation = dict(trip_inputs.get('accommodation') or {})
+    options = accommodation.pop('accommodations', [])
+    recommended = accommodation.pop('recommendedAccommodation', None)
+
+    accommodation['accommodations'] = project_items(options, 'accommodation', view, fields.get('accommodation'))
+    # Sent once: the client finds it in accommodations by id
+    accommodation['recommended_id'] = recommended.get('id') if recommended else None
+
+    response = {
+        'weather': trip_inputs.get('weather') or {},
+        'destinations': project_items(trip_inputs.get('destinations') or [], 'destination',
+                                      view, fields.get('destination')),
+        'restaurants': {
+            slot: project_items(options, 'restaurant', view, fields.get('restaurant'))
+            for slot, options in (trip_inputs.get('restaurants') or {}).items()
+        },
+        'accommodation': accommodation,
+        'shared': copy.deepcopy(SHARED_DEFAULTS),   # Callers may edit the response
+        'meta': {'view': 'custom' if fields else view},
+    }
+
+    response['meta']['payload_bytes'] = payload_bytes(response)
+    logger.info(f"📦 Trip response ({response['meta']['view']}): "
+                f"{response['meta']['payload_bytes'] / 1024:.1f} KB")
+    return response
+
+
+def payload_bytes(payload) -> int:
+    """Size of `payload` serialized as compact JSON (what goes over the wire)"""
+    return len(json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8'))
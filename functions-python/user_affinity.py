@@ -0,0 +1,241 @@
+"""
+User Affinity - One maintained "what does this user like" document per user
+
+SIMPLE EXPLANATION:
+- get_user_preferred_categories used to stream EVERY add_to_trip / save
+  interaction of the user and count categories, on every trip: heavy
+  users paid more each time
+- Now each user has one small document in 'userCategoryAffinity':
+      counts:           {'museum': 12, 'park': 3}     (add_to_trip + save)
+      decayed:          {'museum': ..., 'park': ...}   (recency-decayed, see below)
+      interactionCount: 57                             (all interaction types)
+      lastEventAt:      when the latest interaction happened
+- It is updated as interactions are recorded (record_interaction, run by
+  a trigger on new userInteractions documents) in one small transaction:
+  counters use Increment, lastEventAt only ever moves forward
+- Readers need ONE document read (get_affinity)
+
+RECENCY DECAY:
+- A save from today should count more than one from last year: a weight
+  halves every DECAY_HALF_LIFE_DAYS
+- Decaying every weight on every write would need a read-modify-write, so
+  weights are stored "forward decayed": an event at time t adds
+  2^((t - DECAY_EPOCH) / half_life), and readers scale the sum back by
+  2^(-(now - DECAY_EPOCH) / half_life) → the same as decaying each event
+- Order of events doesn't matter (late events just add)
+
+REBUILD / BACKFILL:
+    rebuild_user(db, user_id)    # recompute one user from userInteractions
+    backfill(db)                 # every user (run once after deploying, or after
+                                 # changing DECAY_HALF_LIFE_DAYS)
+
+TRIGGER:
+    @firestore_fn.on_document_created(document='userInteractions/{interactionId}')
+    def on_interaction_created(event):
+        record_interaction(db, event.data.to_dict())
+
+A retried trigger counts its interaction twice; rebuild_user() fixes a user exactly.
+"""
+
+import os
+import math
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from firebase_admin import firestore
+
+logger = logging.getLogger(__name__)
+
+AFFINITY_COLLECTION = 'userCategoryAffinity'
+AFFINITY_SCHEMA_VERSION = 1
+POSITIVE_TYPES = ['add_to_trip', 'save']     # Interactions that count toward a category
+DEFAULT_CATEGORY = 'attraction'
+DECAY_HALF_LIFE_DAYS = float(os.environ.get('AFFINITY_HALF_LIFE_DAYS', '90'))
+DECAY_EPOCH = 1704067200.0                   # 2024-01-01 UTC: forward-decay reference time
+FIRESTORE_BATCH_LIMIT = 500
+
+
+class CategoryAffinity:
+    """A user's aggregate document"""
+
+    def __init__(self, data: Dict):
+        self.user_id = data.get('userID')
+        self.counts: Dict[str, int] = dict(data.get('counts') or {})
+        self.decayed: Dict[str, float] = dict(data.get('decayed') or {})
+        self.interaction_count = int(data.get('interactionCount') or 0)
+        self.last_event_at = data.get('lastEventAt')
+        # Decayed sums made with another half-life don't mean anything now
+        self.decay_valid = data.get('halfLifeDays') == DECAY_HALF_LIFE_DAYS
+
+    def weights(self, now: float = None) -> Dict[str, float]:
+        """Recency-decayed weight per category, as of `now` (falls back to counts)"""
+        if not self.decay_valid:
+            return {category: float(count) for category, count in self.counts.items()}
+        scale = _forward_weight(now if now is not None else _now())
+        return {category: value / scale for category, value in self.decayed.items()}
+
+    def preferred(self, limit: int = 5) -> List[str]:
+        """Top categories: recent activity first, all-time count on ties"""
+        weights = self.weights()
+        ranked = sorted(self.counts, key=lambda c: (weights.get(c, 0.0), self.counts[c]), reverse=True)
+        return ranked[:limit]
+
+
+# ============================================================
+# REQUEST SIDE
+# ============================================================
+
+def get_affinity(db, user_id: str) -> Optional[CategoryAffinity]:
+    """The user's aggregate - one read. None if it doesn't exist (yet) or has another layout."""
+    if not user_id:
+        return None
+    doc = db.collection(AFFINITY_COLLECTION).document(user_id).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict() or {}
+    if data.get('schemaVersion') != AFFINITY_SCHEMA_VERSION:
+        return None
+    return CategoryAffinity(data)
+
+
+# ============================================================
+# INCREMENTAL UPDATES
+# ============================================================
+
+def record_interaction(db, interaction: Dict):
+    """
+    Add one userInteractions document to its user's aggregate (one read +
+    one write, in a transaction). Meant for an on-create trigger on userInteractions.
+    """
+    user_id = interaction.get('userID')
+    if not user_id:
+        return
+
+    event_time = _to_seconds(interaction.get('timestamp'))
+    if event_time is None:
+        event_time = _now()   # serverTimestamp not resolved in the event payload
+    update = {
+        'userID': user_id,
+        'schemaVersion': AFFINITY_SCHEMA_VERSION,
+        'halfLifeDays': DECAY_HALF_LIFE_DAYS,
+        'interactionCount': firestore.Increment(1),
+        'updatedAt': firestore.SERVER_TIMESTAMP,
+    }
+    if interaction.get('interactionType') in POSITIVE_TYPES:
+        category = interaction.get('category') or DEFAULT_CATEGORY
+        update['counts'] = {category: firestore.Increment(1)}
+        update['decayed'] = {category: firestore.Increment(_forward_weight(event_time))}
+
+    ref = db.collection(AFFINITY_COLLECTION).document(user_id)
+    _apply_update(db.transaction(), ref, update, event_time)
+
+
+@firestore.transactional
+def _apply_update(transaction, ref, update: Dict, event_time: float):
+    """Merge `update`; lastEventAt only moves forward (late / retried events keep the stored one)"""
+    snapshot = ref.get(transaction=transaction)
+    stored = _to_seconds((snapshot.to_dict() or {}).get('lastEventAt')) if snapshot.exists else None
+    if stored is None or event_time > stored:
+        update = {**update, 'lastEventAt': _to_datetime(event_time)}
+    transaction.set(ref, update, merge=True)
+
+
+# ============================================================
+# REBUILD / BACKFILL JOB
+# ============================================================
+
+def build_affinity_doc(user_id: str, interactions: Iterable[Dict]) -> Dict:
+    """The full aggregate document of one user from their interactions"""
+    counts: Dict[str, int] = {}
+    decayed: Dict[str, float] = {}
+    total = 0
+    last = None
+
+    for interaction in interactions:
+        total += 1
+        event_time = _to_seconds(interaction.get('timestamp'))
+        if event_time is not None and (last is None or event_time > last):
+            last = event_time
+        if interaction.get('interactionType') in POSITIVE_TYPES:
+            category = interaction.get('category') or DEFAULT_CATEGORY
+            counts[category] = counts.get(category, 0) + 1
+            decayed[category] = decayed.get(category, 0.0) + _forward_weight(
+                event_time if event_time is not None else DECAY_EPOCH
+            )
+
+    return {
+        'userID': user_id,
+        'schemaVersion': AFFINITY_SCHEMA_VERSION,
+        'halfLifeDays': DECAY_HALF_LIFE_DAYS,
+        'counts': counts,
+        'decayed': decayed,
+        'interactionCount': total,
+        'lastEventAt': _to_datetime(last) if last is not None else None,
+        'updatedAt': firestore.SERVER_TIMESTAMP,
+    }
+
+
+def scan_interactions(db, user_id: str = None):
+    """userInteractions documents (one user, or everyone) - only the fields the aggregate needs"""
+    query = db.collection('userInteractions')
+    if user_id:
+        query = query.where('userID', '==', user_id)
+    for doc in query.select(['userID', 'interactionType', 'category', 'timestamp']).stream():
+        yield doc.to_dict() or {}
+
+
+def rebuild_user(db, user_id: str) -> Dict:
+    """Recompute one user's aggregate from userInteractions and overwrite it. Returns it."""
+    doc = build_affinity_doc(user_id, scan_interactions(db, user_id))
+    db.collection(AFFINITY_COLLECTION).document(user_id).set(doc)
+    return doc
+
+
+def backfill(db) -> int:
+    """
+    Recompute every user's aggregate in one pass over userInteractions.
+    Returns users written.
+
+    Interactions recorded while this runs may be counted twice or missed
+    for their user; rebuild_user() that user if it matters.
+    """
+    by_user: Dict[str, List[Dict]] = {}
+    for interaction in scan_interactions(db):
+        if interaction.get('userID'):
+            by_user.setdefault(interaction['userID'], []).append(interaction)
+
+    users = list(by_user)
+    for i in range(0, len(users), FIRESTORE_BATCH_LIMIT):
+        batch = db.batch()
+        for user_id in users[i:i + FIRESTORE_BATCH_LIMIT]:
+            doc = build_affinity_doc(user_id, by_user.pop(user_id))
+            batch.set(db.collection(AFFINITY_COLLECTION).document(user_id), doc)
+        batch.commit()
+
+    logger.info(f"🎯 Category affinity backfilled for {len(users)} users")
+    return len(users)
+
+
+def _forward_weight(seconds: float) -> float:
+    """2^((t - DECAY_EPOCH) / half_life): an event's weight, scaled up to DECAY_EPOCH terms"""
+    return math.pow(2.0, (seconds - DECAY_EPOCH) / (DECAY_HALF_LIFE_DAYS * 86400))
+
+
+def _to_seconds(value) -> Optional[float]:
+    """Firestore timestamp / datetime / number → epoch seconds (None if missing)"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def _to_datetime(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def _now() -> float:
+    return datetime.now(timezone.utc).timestamp()
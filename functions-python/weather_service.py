@@ -10,6 +10,8 @@ SIMPLE EXPLANATION:
 
 import requests
 import logging
+import threading
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 
@@ -17,6 +19,7 @@ logger = logging.getLogger(__name__)
 
 # Open-Meteo is a free weather API
 OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+POOL_MAXSIZE = 8  # Keep-alive sockets to Open-Meteo (concurrent trips share them)
 
 # Weather codes from World Meteorological Organization
 # Maps numbers to human-readable descriptions
@@ -27,6 +30,23 @@ WMO_CODES = {
 }
 
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Pooled session, so every forecast after the first skips the TLS handshake"""
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_maxsize=POOL_MAXSIZE))
+                _session = session
+    return _session
+
+
 def get_weather_forecast(lat: float, lon: float, start_date: str, end_date: str) -> Dict[str, Dict]:
     """
     Main function to get weather forecast
@@ -79,7 +99,7 @@ def get_weather_forecast(lat: float, lon: float, start_date: str, end_date: str)
             'end_date': api_end,
         }
 
-        response = requests.get(OPEN_METEO_URL, params=params, timeout=10)
+        response = _get_session().get(OPEN_METEO_URL, params=params, timeout=10)
 
         # Step 5: Process response
         if response.status_code == 200:
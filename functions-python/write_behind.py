@@ -0,0 +1,350 @@
+"""
+Write Behind - Background, batched Firestore writes off the request path
+
+SIMPLE EXPLANATION:
+- New destinations are saved to Firestore only to feed future ML training,
+  yet users waited for those writes before they saw their trip
+- Now the request puts the records in an in-process queue and returns at once
+  (document IDs are deterministic, so they are known before the write)
+- A background worker drains the queue in batches of up to BATCH_SIZE
+- The queue is bounded (MAX_ITEMS): when it is full, new records go to a
+  spool file instead of growing memory (backpressure)
+- On shutdown the queue is flushed; if there is no time left (SIGTERM,
+  instance being torn down) the rest is written to the spool file
+- Spool files are replayed by the worker when the queue is idle, on this
+  instance or the next one that shares SPOOL_DIR
+
+SPOOL_DIR comes from env WRITE_BEHIND_SPOOL_DIR (default /tmp/write_behind).
+On Cloud Functions / Cloud Run /tmp is in-memory and goes away with the
+instance, so spooled records are lost there: point SPOOL_DIR at a
+persistent volume (e.g. a mounted bucket) before turning write-behind on.
+Callers keep it off by default (DESTINATION_WRITE_BEHIND).
+
+The SIGTERM hook can only be installed from the main thread, so it is
+installed when this module is imported (import it at startup, not from
+a request thread).
+
+USAGE:
+    queue = get_queue('destinations', write_records)   # write_records(items) -> failed items
+    queue.submit([{...}, {...}])                        # returns immediately
+    queue.stats()                                       # depth, written, spilled, ...
+"""
+
+import atexit
+import json
+import os
+import signal
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+MAX_ITEMS = 5000                # Records held in memory before spilling to the spool file
+BATCH_SIZE = 500                # Records per write (Firestore batch limit)
+FLUSH_INTERVAL = 0.5            # Seconds the worker waits for a batch to fill up
+MAX_ATTEMPTS = 3                # Write attempts before a record is spooled
+SHUTDOWN_FLUSH_TIMEOUT = 5.0    # Seconds to keep writing at exit before spooling the rest
+DEFAULT_SPOOL_DIR = '/tmp/write_behind'
+SPOOL_DIR = os.environ.get('WRITE_BEHIND_SPOOL_DIR', DEFAULT_SPOOL_DIR)
+
+# writer(items) → items that failed (empty list = all written)
+Writer = Callable[[List[Dict]], List[Dict]]
+
+
+class WriteBehindQueue:
+    """Bounded in-process queue with one background writer thread"""
+
+    def __init__(self, name: str, writer: Writer, max_items: int = MAX_ITEMS,
+                 batch_size: int = BATCH_SIZE, spool_dir: str = SPOOL_DIR):
+        self.name = name
+        self.writer = writer
+        self.max_items = max_items
+        self.batch_size = batch_size
+        self.spool_dir = os.path.join(spool_dir, name)
+
+        self._items = deque()         # (enqueued_at, attempts, item)
+        self._lock = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._worker = None
+        self._metrics = {
+            'enqueued': 0, 'written': 0, 'batches': 0, 'failed_batches': 0,
+            'retried': 0, 'spilled': 0, 'replayed': 0, 'corrupt_lines': 0,
+            'quarantined_files': 0, 'high_watermark': 0, 'last_batch_ms': 0.0,
+        }
+
+    # ---------- producer side ----------
+
+    def submit(self, items: List[Dict]) -> int:
+        """
+        Queue records for writing. Never blocks on the network.
+        Returns how many went to memory; the rest (queue full or closed)
+        were spooled to disk.
+        """
+        if not items:
+            return 0
+
+        now = time.time()
+        with self._lock:
+            room = 0 if self._closed else max(0, self.max_items - len(self._items))
+            accepted, overflow = items[:room], items[room:]
+
+            self._items.extend((now, 0, item) for item in accepted)
+            self._metrics['enqueued'] += len(accepted)
+            self._metrics['high_watermark'] = max(self._metrics['high_watermark'], len(self._items))
+            self._lock.notify()
+
+        if overflow:
+            logger.warning(f"⚠️ Write-behind '{self.name}' full, spooling {len(overflow)} records")
+            self._spool(overflow)
+
+        self._ensure_worker()
+        return len(accepted)
+
+    # ---------- worker side ----------
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._closed or (self._worker is not None and self._worker.is_alive()):
+                return
+            self._worker = threading.Thread(target=self._run, name=f'write-behind-{self.name}', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._items and not self._closed:
+                    self._lock.wait(FLUSH_INTERVAL)
+                if len(self._items) < self.batch_size and not self._closed:
+                    self._lock.wait(FLUSH_INTERVAL)  # Give the batch a moment to fill
+                if self._closed:
+                    return
+                batch = self._take_batch()
+
+            if batch:
+                self._write(batch)
+            else:
+                self._replay_spool()
+
+    def _take_batch(self) -> List:
+        batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+        self._in_flight += len(batch)
+        return batch
+
+    def _write(self, batch: List):
+        start = time.perf_counter()
+        try:
+            failed = self.writer([item for _, _, item in batch])
+        except Exception as e:
+            logger.warning(f"⚠️ Write-behind '{self.name}' batch failed: {e}")
+            failed = [item for _, _, item in batch]
+
+        failed_ids = {id(item) for item in failed}
+        retry, give_up = [], []
+        for enqueued_at, attempts, item in batch:
+            if id(item) not in failed_ids:
+                continue
+            if attempts + 1 < MAX_ATTEMPTS:
+                retry.append((enqueued_at, attempts + 1, item))
+            else:
+                give_up.append(item)
+
+        with self._lock:
+            self._in_flight -= len(batch)
+            self._metrics['batches'] += 1
+            self._metrics['written'] += len(batch) - len(failed_ids)
+            self._metrics['last_batch_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            if failed_ids:
+                self._metrics['failed_batches'] += 1
+                self._metrics['retried'] += len(retry)
+            self._items.extendleft(reversed(retry))
+            self._lock.notify_all()
+
+        if give_up:
+            self._spool(give_up)
+
+    # ---------- spool file ----------
+
+    def _spool(self, items: List[Dict]):
+        """Append records to a new spool file (JSON lines, atomic rename)"""
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = os.path.join(self.spool_dir, f"{time.time():.0f}-{uuid.uuid4().hex[:8]}.jsonl")
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                for item in items:
+                    f.write(json.dumps(item, ensure_ascii=False, default=str) + '\n')
+            os.replace(f"{path}.tmp", path)
+            with self._lock:
+                self._metrics['spilled'] += len(items)
+        except Exception as e:
+            logger.error(f"❌ Write-behind '{self.name}' could not spool {len(items)} records: {e}")
+
+    def _replay_spool(self):
+        """
+        Move ONE spool file back into the queue when there is room.
+        Unreadable lines are skipped and their file is kept aside as
+        '<name>.bad' for inspection; errors never stop the worker.
+        """
+        try:
+            names = sorted(n for n in os.listdir(self.spool_dir) if n.endswith('.jsonl'))
+        except OSError:
+            return
+
+        for name in names:
+            path = os.path.join(self.spool_dir, name)
+            claimed = f"{path}.replaying"
+            try:
+                os.replace(path, claimed)  # Only one worker gets the file
+            except OSError:
+                continue
+
+            items, corrupt = [], 0
+            try:
+                with open(claimed, 'r', encoding='utf-8', errors='replace') as f:
+                    for line_no, line in enumerate(f, 1):
+                        if not line.strip():
+                            continue
+                        try:
+                            items.append(json.loads(line))
+                        except ValueError as e:
+                            corrupt += 1
+                            logger.warning(f"⚠️ Write-behind '{self.name}' skipped line {line_no} of {name}: {e}")
+            except OSError as e:
+                logger.error(f"❌ Write-behind '{self.name}' could not read spool file {name}: {e}")
+                corrupt += 1
+
+            self._retire_spool_file(claimed, quarantine=corrupt > 0)
+
+            now = time.time()
+            with self._lock:
+                room = max(0, self.max_items - len(self._items))
+                self._items.extend((now, 0, item) for item in items[:room])
+                self._metrics['replayed'] += min(room, len(items))
+                self._metrics['corrupt_lines'] += corrupt
+            if len(items) > room:
+                self._spool(items[room:])
+
+            logger.info(f"   Write-behind '{self.name}' replayed {len(items)} spooled records"
+                        f"{f' ({corrupt} unreadable lines)' if corrupt else ''}")
+            return
+
+    def _retire_spool_file(self, claimed: str, quarantine: bool):
+        """Delete a replayed spool file, or keep it as '.bad' when some of it was unreadable"""
+        try:
+            if quarantine:
+                os.replace(claimed, claimed[:-len('.replaying')] + '.bad')
+                with self._lock:
+                    self._metrics['quarantined_files'] += 1
+            else:
+                os.remove(claimed)
+        except OSError as e:
+            logger.error(f"❌ Write-behind '{self.name}' could not remove spool file {claimed}: {e}")
+
+    # ---------- shutdown ----------
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything queued so far is written. True if drained."""
+        self._ensure_worker()
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            self._lock.notify_all()
+            while self._items or self._in_flight:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining if remaining is not None else FLUSH_INTERVAL)
+        return True
+
+    def close(self, flush_timeout: float = SHUTDOWN_FLUSH_TIMEOUT):
+        """Flush for up to `flush_timeout` seconds, then spool what is left"""
+        if flush_timeout > 0:
+            self.flush(flush_timeout)
+
+        with self._lock:
+            self._closed = True
+            leftovers = [item for _, _, item in self._items]
+            self._items.clear()
+            self._lock.notify_all()
+
+        if leftovers:
+            logger.warning(f"⚠️ Write-behind '{self.name}' shutting down, spooling {len(leftovers)} records")
+            self._spool(leftovers)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            oldest = self._items[0][0] if self._items else None
+            return {
+                **self._metrics,
+                'depth': len(self._items),
+                'in_flight': self._in_flight,
+                'max_items': self.max_items,
+                'utilization': round(len(self._items) / self.max_items, 3),
+                'oldest_age_s': round(time.time() - oldest, 2) if oldest else 0.0,
+            }
+
+
+# ============================================================
+# PROCESS-WIDE QUEUES + SHUTDOWN HOOKS
+# ============================================================
+
+_queues: Dict[str, WriteBehindQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue(name: str, writer: Writer) -> WriteBehindQueue:
+    """The process-wide queue called `name` (created on first use)"""
+    queue = _queues.get(name)
+    if queue is not None:
+        return queue
+
+    with _queues_lock:
+        queue = _queues.get(name)
+        if queue is None:
+            queue = _queues[name] = WriteBehindQueue(name, writer)
+            if SPOOL_DIR == DEFAULT_SPOOL_DIR:
+                logger.warning(f"⚠️ Write-behind '{name}' spools to {SPOOL_DIR}, which does not outlive "
+                               f"the instance: set WRITE_BEHIND_SPOOL_DIR to a persistent volume")
+    return queue
+
+
+def get_queue_stats() -> Dict[str, Dict]:
+    return {name: queue.stats() for name, queue in list(_queues.items())}
+
+
+def flush_all(timeout: float = None) -> bool:
+    return all(queue.flush(timeout) for queue in list(_queues.values()))
+
+
+def close_all(flush_timeout: float = SHUTDOWN_FLUSH_TIMEOUT):
+    for queue in list(_queues.values()):
+        queue.close(flush_timeout)
+
+
+def _install_shutdown_hooks():
+    """Flush at normal exit; on SIGTERM spool immediately (no time for network)"""
+    atexit.register(close_all)
+
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def on_sigterm(signum, frame):
+            close_all(flush_timeout=0)
+            if callable(previous):
+                previous(signum, frame)
+            elif previous == signal.SIG_DFL:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                os.kill(os.getpid(), signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, on_sigterm)
+    except ValueError as e:
+        logger.error(f"❌ Write-behind SIGTERM hook not installed ({e}): queued records are lost "
+                     f"if the instance is stopped - import write_behind from the main thread")
+
+
+_install_shutdown_hooks()